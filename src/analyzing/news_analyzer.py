@@ -1,14 +1,15 @@
-import os
+import asyncio
 from pathlib import Path
 
 from scipy.special.cython_special import fdtri
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
-from langchain_core.output_parsers import PydanticOutputParser
 
 from src.utils.grist_client import GristClient
+from src.utils.logger import logger
+from src.utils.tokens import estimate_call_tokens
+from src.utils.llm_factory import get_chain, get_prompt
 from src.analyzing.prompts import NEWS_ANALYSIS_PROMPT_TEMPLATE
+from src.utils.llm_concurrency import llm_slot, llm_slot_sync
 
 
 DEFAULT_MODEL_NAME = "gpt-4o-mini"
@@ -23,27 +24,38 @@ class NewsAnalyzerOutput(BaseModel):
 class NewsAnalyzer:
     def __init__(self, grist_client: GristClient):
         self.grist_client = grist_client
-        self.llm = ChatOpenAI(
-            model=DEFAULT_MODEL_NAME,
-            temperature=DEFAULT_TEMPERATURE,
-            api_key=os.environ.get("OPENAI_API_KEY"),
+        self.prompt = get_prompt(NEWS_ANALYSIS_PROMPT_TEMPLATE)
+        self.chain = get_chain(
+            NEWS_ANALYSIS_PROMPT_TEMPLATE,
+            NewsAnalyzerOutput,
+            DEFAULT_MODEL_NAME,
+            DEFAULT_TEMPERATURE,
         )
-        self.prompt = PromptTemplate(
-            input_variables=["title", "content"],
-            template=NEWS_ANALYSIS_PROMPT_TEMPLATE,
-        )
-        self.output_parser = PydanticOutputParser(pydantic_object=NewsAnalyzerOutput)
-
-        self.chain = self.prompt | self.llm | self.output_parser
 
     def _analyze(self, title, content) -> tuple:
-        results = self.chain.invoke({
-            "title": title,
-            "content": content,
-        })
+        with llm_slot_sync(DEFAULT_MODEL_NAME, self._estimate_tokens(title, content)):
+            results = self.chain.invoke({
+                "title": title,
+                "content": content,
+            })
+        status = "approved" if results.approved else "not approved"
+        return status, results.score
+
+    async def _aanalyze(self, title, content) -> tuple:
+        async with llm_slot(DEFAULT_MODEL_NAME, self._estimate_tokens(title, content)):
+            results = await self.chain.ainvoke({
+                "title": title,
+                "content": content,
+            })
         status = "approved" if results.approved else "not approved"
         return status, results.score
 
+    def _estimate_tokens(self, title, content) -> int:
+        return estimate_call_tokens(
+            self.prompt.format(title=title, content=content),
+            DEFAULT_MODEL_NAME,
+        )
+
     def analyze_all(self):
         news_df = self.grist_client.fetch_table()
         df_not_approved = news_df[news_df["status"] == "not approved"]
@@ -53,18 +65,46 @@ class NewsAnalyzer:
             title = row[1]["title"]
             content = row[1]["content"]
 
-            is_approved, score = self._analyze(title, content)
-            if is_approved:
-                updates = [
-                    {
-                        "id": index + 1,
-                        "fields": {
-                            "status": "approved",
-                            "score": score
-                        }
-                    }
-                ]
-                self.grist_client.update_rows(updates)
+            try:
+                status, score = self._analyze(title, content)
+            except Exception as e:
+                logger.error(f"Failed to analyze row {index + 1}: {e}")
+                continue
+            if status == "approved":
+                self.grist_client.update_rows([self._approval_update(index, score)])
+
+    async def aanalyze_all(self):
+        """Async variant of `analyze_all`; all posts are analyzed concurrently within the LLM budget."""
+        news_df = await asyncio.to_thread(self.grist_client.fetch_table)
+        df_not_approved = news_df[news_df["status"] == "not approved"]
+
+        indices = list(df_not_approved.index)
+        results = await asyncio.gather(
+            *(self._aanalyze(row["title"], row["content"]) for _, row in df_not_approved.iterrows()),
+            return_exceptions=True,
+        )
+
+        updates = []
+        for index, result in zip(indices, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to analyze row {index + 1}: {result}")
+                continue
+            status, score = result
+            if status == "approved":
+                updates.append(self._approval_update(index, score))
+
+        if updates:
+            await asyncio.to_thread(self.grist_client.update_rows, updates)
+
+    @staticmethod
+    def _approval_update(index, score) -> dict:
+        return {
+            "id": index + 1,
+            "fields": {
+                "status": "approved",
+                "score": score
+            }
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+import re
+import json
+import os
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+from src.extracting.utils import Transcript
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+from src.utils.tokens import count_tokens
+
+
+DEFAULT_PHRASES_FILENAME = "boilerplate_phrases.json"
+# Word n-grams that appear in this share of a channel's recent videos are boilerplate
+NGRAM_SIZE = 6
+MIN_VIDEO_SHARE = 0.5
+MIN_CHANNEL_VIDEOS = 4
+# Each new video decays older counts, so the table follows the channel's current intro and sponsors
+COUNT_DECAY = 0.95
+MIN_KEPT_COUNT = 0.5
+# Only the opening and closing minutes are learned from, which is where intros,
+# outros and most sponsor reads sit, and keeps the tables small
+LEARN_WINDOW_SECONDS = 180
+MAX_SEEN_VIDEOS = 200
+# Segments with at least this share of words inside boilerplate n-grams are dropped
+SEGMENT_COVERAGE_THRESHOLD = 0.5
+TOKEN_MODEL = "gpt-4o-mini"
+WORD_RE = re.compile(r"\w+")
+
+# Phrases that mark sponsor reads and calls to action on any channel, in English and Polish
+SPONSOR_PATTERNS = re.compile(
+    r"sponsored by|this video is brought to you|thanks to our sponsor|use (?:my |the )?code|"
+    r"link in the description|like and subscribe|subscribe to (?:the|my|our) channel|"
+    r"hit the (?:bell|like button)|support (?:us|the channel) on patreon|"
+    r"sponsorem (?:odcinka|filmu)|partnerem (?:odcinka|filmu)|kod rabatowy|z kodem|"
+    r"link (?:znajdziecie )?w opisie|subskrybuj|zasubskrybuj|łapk[aię] w górę|dzwoneczek|"
+    r"wesprzyj(?:cie)? (?:nas|kanał)|patronite",
+    re.IGNORECASE,
+)
+# A matched sentence up to this long is a sponsor read and dropped whole; in longer ones, e.g.
+# unpunctuated auto-captions stored as one segment, only the words around the phrase are
+MAX_SPONSOR_SENTENCE_WORDS = 40
+SPONSOR_CONTEXT_WORDS = 12
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+SPONSOR_CONTEXT_RE = re.compile(
+    rf"(?:\S+\s+){{0,{SPONSOR_CONTEXT_WORDS}}}\S*(?:{SPONSOR_PATTERNS.pattern})\S*(?:\s+\S+){{0,{SPONSOR_CONTEXT_WORDS}}}",
+    re.IGNORECASE,
+)
+# Caption annotations and disfluencies removed from inside segments
+FILLER_RE = re.compile(
+    r"\[(?:music|applause|laughter|muzyka|oklaski|śmiech)\]|\b(?:um+|uh+|erm|yyy+|eee+|hmm+)\b[,.]?",
+    re.IGNORECASE,
+)
+SPACES_RE = re.compile(r"\s{2,}")
+
+
+@dataclass
+class StripReport:
+    """
+    Tokens saved by stripping boilerplate from one transcript.
+    """
+    video_id: str
+    tokens_before: int
+    tokens_after: int
+    segments_removed: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class BoilerplateStripper:
+    """
+    Removes sponsor reads, channel boilerplate and filler from transcripts before extraction.
+
+    Sentences with sponsor reads and calls to action are matched against a fixed
+    phrase list and removed.
+    Channel boilerplate (recurring intros, outros and sponsor copy) is learned per
+    channel: a word n-gram that shows up in a large share of the channel's recent
+    videos is considered boilerplate, and segments mostly made of such n-grams are
+    dropped. The per-channel phrase tables are persisted to a JSON file.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        """
+        :param path: JSON file with the per-channel phrase tables, defaults to .cache/boilerplate_phrases.json
+        """
+        self.path = Path(path) if path else get_cache_dir() / DEFAULT_PHRASES_FILENAME
+        self._lock = threading.Lock()
+        self._tables: dict[str, dict] = {}
+        self._dirty = False
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._tables = json.load(f)
+
+    def strip(self, transcript: Transcript) -> tuple[Transcript, StripReport]:
+        """
+        Strip boilerplate from a transcript and learn from it.
+
+        :param transcript: Transcript to clean
+        :return: Cleaned transcript and a report of the tokens saved
+        """
+        segments = list(transcript.iter_segments())
+        segment_words = [WORD_RE.findall(text.lower()) for text, _ in segments]
+        ngrams_by_segment = self._segment_ngrams(segment_words)
+        boilerplate = self._boilerplate_ngrams(transcript.channel_name)
+
+        kept = []
+        for (text, start), words, ngrams in zip(segments, segment_words, ngrams_by_segment):
+            if words and boilerplate and self._coverage(words, ngrams, boilerplate) >= SEGMENT_COVERAGE_THRESHOLD:
+                continue
+            text = _remove_sponsor_reads(text)
+            text = SPACES_RE.sub(" ", FILLER_RE.sub("", text)).strip()
+            if text:
+                kept.append((text, start))
+
+        self._learn(transcript, self._learning_ngrams(segments, ngrams_by_segment))
+
+        stripped = Transcript.from_segments(
+            video_id=transcript.video_id,
+            title=transcript.title,
+            segments=kept,
+            channel_name=transcript.channel_name,
+            publish_date=transcript.publish_date,
+        )
+        report = StripReport(
+            video_id=transcript.video_id,
+            tokens_before=count_tokens(transcript.text, TOKEN_MODEL),
+            tokens_after=count_tokens(stripped.text, TOKEN_MODEL),
+            segments_removed=len(segments) - len(kept),
+        )
+        logger.debug(
+            f"Stripped {report.tokens_saved} of {report.tokens_before} tokens "
+            f"({report.segments_removed} segments) from transcript {transcript.video_id}"
+        )
+        return stripped, report
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._tables)
+            self._dirty = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _segment_ngrams(segment_words: list[list[str]]) -> list[list[tuple[int, str]]]:
+        """
+        N-grams starting in each segment, as (word index in the segment, n-gram hash).
+        N-grams may run into the following segments, as sentences span caption lines.
+        """
+        words = [word for seg in segment_words for word in seg]
+        ngrams_by_segment = []
+        position = 0
+        for seg in segment_words:
+            ngrams = []
+            for index in range(len(seg)):
+                window = words[position + index:position + index + NGRAM_SIZE]
+                if len(window) == NGRAM_SIZE:
+                    ngrams.append((index, _hash_ngram(window)))
+            ngrams_by_segment.append(ngrams)
+            position += len(seg)
+        return ngrams_by_segment
+
+    @staticmethod
+    def _learning_ngrams(segments: list[tuple[str, float]], ngrams_by_segment: list[list[tuple[int, str]]]) -> set[str]:
+        if not segments:
+            return set()
+        end = segments[-1][1]
+        return {
+            ngram
+            for (_, start), ngrams in zip(segments, ngrams_by_segment)
+            if start <= LEARN_WINDOW_SECONDS or start >= end - LEARN_WINDOW_SECONDS
+            for _, ngram in ngrams
+        }
+
+    @staticmethod
+    def _coverage(words: list[str], ngrams: list[tuple[int, str]], boilerplate: set[str]) -> float:
+        covered = [False] * len(words)
+        for index, ngram in ngrams:
+            if ngram in boilerplate:
+                for i in range(index, min(index + NGRAM_SIZE, len(words))):
+                    covered[i] = True
+        return sum(covered) / len(words)
+
+    def _boilerplate_ngrams(self, channel: str) -> set[str]:
+        with self._lock:
+            table = self._tables.get(channel)
+            if table is None or len(table["seen_videos"]) < MIN_CHANNEL_VIDEOS:
+                return set()
+            min_count = table["videos"] * MIN_VIDEO_SHARE
+            return {ngram for ngram, count in table["ngrams"].items() if count >= min_count}
+
+    def _learn(self, transcript: Transcript, ngrams: set[str]) -> None:
+        with self._lock:
+            table = self._tables.setdefault(
+                transcript.channel_name,
+                {"videos": 0.0, "seen_videos": [], "ngrams": {}},
+            )
+            # Cached transcripts come back on reruns and must not be counted twice
+            if transcript.video_id in table["seen_videos"]:
+                return
+            table["seen_videos"] = (table["seen_videos"] + [transcript.video_id])[-MAX_SEEN_VIDEOS:]
+
+            counts = table["ngrams"]
+            for ngram in list(counts):
+                counts[ngram] *= COUNT_DECAY
+                if counts[ngram] < MIN_KEPT_COUNT and ngram not in ngrams:
+                    del counts[ngram]
+            for ngram in ngrams:
+                counts[ngram] = counts.get(ngram, 0.0) + 1
+            table["videos"] = table["videos"] * COUNT_DECAY + 1
+            self._dirty = True
+
+
+def _remove_sponsor_reads(text: str) -> str:
+    """Remove the sentences of `text` that contain a sponsor or call-to-action phrase."""
+    if not SPONSOR_PATTERNS.search(text):
+        return text
+    kept = []
+    for sentence in SENTENCE_END_RE.split(text):
+        if not SPONSOR_PATTERNS.search(sentence):
+            kept.append(sentence)
+        elif len(sentence.split()) > MAX_SPONSOR_SENTENCE_WORDS:
+            kept.append(SPONSOR_CONTEXT_RE.sub(" ", sentence))
+    return " ".join(kept)
+
+
+def _hash_ngram(words: list[str]) -> str:
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).hexdigest()
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+import requests
+
+from src.extracting.transcript_api import get_http_session
+from src.extracting.fetch_recording import ReplayedFetchError, get_fetch_recorder
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+from src.utils.tracing import span
+
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml"
+# YouTube feeds only ever contain the newest 15 uploads
+FEED_MAX_ENTRIES = 15
+REQUEST_TIMEOUT = 15
+FEED_NAMESPACES = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "yt": "http://www.youtube.com/xml/schemas/2015",
+}
+CHANNEL_BASE_URL_RE = re.compile(r"^(https?://[^/]+/(?:@[^/?#]+|channel/[^/?#]+|c/[^/?#]+|user/[^/?#]+))")
+CHANNEL_ID_URL_RE = re.compile(r"/channel/(UC[\w-]{22})")
+CHANNEL_ID_PAGE_RES = [
+    re.compile(r'<meta itemprop="identifier" content="(UC[\w-]{22})"'),
+    re.compile(r'<link rel="canonical" href="https://www\.youtube\.com/channel/(UC[\w-]{22})"'),
+    re.compile(r'"externalId":"(UC[\w-]{22})"'),
+]
+
+
+def parse_channel_feed(xml_text: str) -> list[dict]:
+    """
+    Parse a YouTube channel Atom feed into video metadata, newest first.
+
+    :param xml_text: Feed XML
+    :return: List of dicts with video_id, title, published_at (local naive datetime)
+        and is_short, since feeds also list Shorts unlike the channel's "videos" tab
+    """
+    root = ET.fromstring(xml_text)
+    videos = []
+    for entry in root.findall("atom:entry", FEED_NAMESPACES):
+        link = entry.find("atom:link[@rel='alternate']", FEED_NAMESPACES)
+        published = entry.findtext("atom:published", default="", namespaces=FEED_NAMESPACES)
+        published_at = None
+        if published:
+            try:
+                published_at = datetime.fromisoformat(published).astimezone().replace(tzinfo=None)
+            except ValueError:
+                pass
+
+        videos.append({
+            "video_id": entry.findtext("yt:videoId", default="", namespaces=FEED_NAMESPACES),
+            "title": entry.findtext("atom:title", default="", namespaces=FEED_NAMESPACES),
+            "published_at": published_at,
+            "is_short": link is not None and "/shorts/" in link.get("href", ""),
+        })
+
+    videos.sort(key=lambda v: v["published_at"] or datetime.min, reverse=True)
+    return videos
+
+
+class ChannelFeedClient:
+    """
+    Fetches channel uploads from the lightweight Atom feed.
+
+    Feeds are addressed by channel id, so handle URLs are resolved once
+    from the channel page and the result is persisted.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        channel_ids_path: Optional[Union[str, Path]] = None,
+    ):
+        self.session = session
+        self.channel_ids_path = Path(channel_ids_path or get_cache_dir() / "channel_ids.json")
+        self._lock = threading.Lock()
+        self._channel_ids: dict[str, str] = {}
+        if self.channel_ids_path.exists():
+            with open(self.channel_ids_path, "r", encoding="utf-8") as f:
+                self._channel_ids = json.load(f)
+
+    def get_latest_videos(self, channel_url: str) -> Optional[list[dict]]:
+        """
+        Get the newest uploads of a channel from its feed.
+
+        :param channel_url: Channel URL (handle, /channel/ or legacy form)
+        :return: Parsed video metadata, or None if the feed could not be fetched
+        """
+        try:
+            recorder = get_fetch_recorder()
+            if recorder is not None:
+                xml_text = recorder.get_feed(channel_url, self._fetch_channel_feed)
+            else:
+                xml_text = self._fetch_channel_feed(channel_url)
+            if xml_text is None:
+                return None
+            return parse_channel_feed(xml_text)
+        except (requests.RequestException, ET.ParseError, ReplayedFetchError) as e:
+            logger.warning(f"Could not fetch feed for {channel_url}: {e}")
+            return None
+
+    def _fetch_channel_feed(self, channel_url: str) -> Optional[str]:
+        channel_id = self.resolve_channel_id(channel_url)
+        if channel_id is None:
+            logger.warning(f"Could not resolve channel id for {channel_url}")
+            return None
+        return self.fetch_feed(channel_id)
+
+    def fetch_feed(self, channel_id: str) -> str:
+        with span("http.channel_feed"):
+            resp = self._get_session().get(
+                FEED_URL,
+                params={"channel_id": channel_id},
+                timeout=REQUEST_TIMEOUT,
+            )
+            resp.raise_for_status()
+            return resp.text
+
+    def resolve_channel_id(self, channel_url: str) -> Optional[str]:
+        match = CHANNEL_ID_URL_RE.search(channel_url)
+        if match:
+            return match.group(1)
+
+        base_url = self._get_base_url(channel_url)
+        with self._lock:
+            if base_url in self._channel_ids:
+                return self._channel_ids[base_url]
+
+        resp = self._get_session().get(base_url, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
+        channel_id = None
+        for pattern in CHANNEL_ID_PAGE_RES:
+            match = pattern.search(resp.text)
+            if match:
+                channel_id = match.group(1)
+                break
+
+        if channel_id is not None:
+            with self._lock:
+                self._channel_ids[base_url] = channel_id
+                self._save_channel_ids()
+            logger.debug(f"Resolved {base_url} to channel id {channel_id}")
+        return channel_id
+
+    def _get_session(self) -> requests.Session:
+        return self.session or get_http_session()
+
+    def _save_channel_ids(self) -> None:
+        self.channel_ids_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.channel_ids_path.with_suffix(self.channel_ids_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._channel_ids, f, indent=2)
+        os.replace(tmp_path, self.channel_ids_path)
+
+    @staticmethod
+    def _get_base_url(channel_url: str) -> str:
+        match = CHANNEL_BASE_URL_RE.match(channel_url)
+        return match.group(1) if match else channel_url.rstrip("/")
+
+
+_feed_client: Optional[ChannelFeedClient] = None
+_feed_client_lock = threading.Lock()
+
+
+def get_channel_feed_client() -> ChannelFeedClient:
+    """Return the process-wide feed client, building it on first use."""
+    global _feed_client
+    with _feed_client_lock:
+        if _feed_client is None:
+            _feed_client = ChannelFeedClient()
+        return _feed_client
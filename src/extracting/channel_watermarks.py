@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+from src.utils.logger import logger
+
+
+@dataclass
+class ChannelWatermark:
+    """
+    Newest video of a channel that has already been processed.
+    """
+    video_id: str
+    published_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "video_id": self.video_id,
+            "published_at": self.published_at.isoformat() if self.published_at else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChannelWatermark":
+        published_at = data.get("published_at")
+        return cls(
+            video_id=data["video_id"],
+            published_at=datetime.fromisoformat(published_at) if published_at else None,
+        )
+
+
+class ChannelWatermarkStore:
+    """
+    Per-channel watermarks persisted to a JSON file.
+
+    Updates are kept in memory until `save` is called, so a run that fails
+    before its results are stored does not move the watermarks forward.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._watermarks: dict[str, ChannelWatermark] = {}
+        self._dirty = False
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._watermarks = {
+                channel: ChannelWatermark.from_dict(item) for channel, item in data.items()
+            }
+
+    def get(self, channel_url: str) -> Optional[ChannelWatermark]:
+        with self._lock:
+            return self._watermarks.get(channel_url)
+
+    def update(self, channel_url: str, watermark: ChannelWatermark) -> None:
+        with self._lock:
+            self._watermarks[channel_url] = watermark
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {channel: wm.to_dict() for channel, wm in self._watermarks.items()}
+            self._dirty = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+        logger.info(f"Saved watermarks for {len(data)} channels to {self.path}")
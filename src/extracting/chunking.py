@@ -0,0 +1,90 @@
+import re
+from typing import Optional
+
+from src.extracting.utils import Transcript
+from src.utils.tokens import count_tokens
+
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+SENTENCE_END_CHARS = (".", "!", "?")
+# A chunk is cut early at a sentence end only if it is at least this full
+MIN_CHUNK_FILL = 0.5
+
+
+def split_transcript(transcript: Transcript, max_tokens: int, model: str = "gpt-4o-mini") -> list[str]:
+    """
+    Split a transcript into chunks of at most `max_tokens` tokens.
+
+    Chunks are made of whole segments and, where possible, end at a sentence
+    boundary. A single segment longer than the budget is split by sentences
+    and then by words.
+
+    :param transcript: Transcript to split
+    :param max_tokens: Token budget per chunk
+    :param model: Model whose tokenizer is used for counting
+    :return: List of chunk texts in transcript order
+    """
+    chunks = []
+    chunk_start = 0
+    chunk_tokens = 0
+    # Segment index after the last sentence end in the current chunk, and the tokens up to it
+    last_sentence_end: Optional[int] = None
+    tokens_at_sentence_end = 0
+
+    for index, (segment_text, _) in enumerate(transcript.iter_segments()):
+        segment_tokens = count_tokens(segment_text, model) + 1
+
+        if segment_tokens > max_tokens:
+            if index > chunk_start:
+                chunks.append(transcript.slice_text(chunk_start, index))
+            chunks.extend(_split_text(segment_text, max_tokens, model))
+            chunk_start, chunk_tokens, last_sentence_end = index + 1, 0, None
+            continue
+
+        if chunk_tokens + segment_tokens > max_tokens and index > chunk_start:
+            if last_sentence_end is not None and tokens_at_sentence_end >= MIN_CHUNK_FILL * max_tokens:
+                cut = last_sentence_end
+                chunk_tokens -= tokens_at_sentence_end
+            else:
+                cut = index
+                chunk_tokens = 0
+            chunks.append(transcript.slice_text(chunk_start, cut))
+            chunk_start = cut
+            last_sentence_end = None
+            if chunk_tokens + segment_tokens > max_tokens:
+                # The segments carried over past the sentence end still leave no room for this one
+                chunks.append(transcript.slice_text(chunk_start, index))
+                chunk_start, chunk_tokens = index, 0
+
+        chunk_tokens += segment_tokens
+        if segment_text.endswith(SENTENCE_END_CHARS):
+            last_sentence_end = index + 1
+            tokens_at_sentence_end = chunk_tokens
+
+    if chunk_start < transcript.n_segments:
+        chunks.append(transcript.slice_text(chunk_start))
+
+    return [chunk for chunk in chunks if chunk]
+
+
+def _split_text(text: str, max_tokens: int, model: str) -> list[str]:
+    """Split plain text by sentences, falling back to words for overlong sentences."""
+    chunks = []
+    current: list[str] = []
+    current_tokens = 0
+
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        pieces = [sentence]
+        if count_tokens(sentence, model) > max_tokens:
+            pieces = sentence.split()
+        for piece in pieces:
+            piece_tokens = count_tokens(piece, model) + 1
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+import scrapetube
+
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+
+
+FETCH_MODE_ENV_VAR = "YT_FETCH_MODE"
+FIXTURES_DIR_ENV_VAR = "YT_FIXTURES_DIR"
+FETCH_MODES = ("live", "record", "replay")
+# Scrapetube yields about this many videos per page request
+SCRAPETUBE_PAGE_SIZE = 30
+
+
+class ReplayedFetchError(Exception):
+    """
+    Error served in replay mode, either recorded from a live run or simulated.
+
+    :param kind: Error class as returned by `classify_fetch_error` when recorded
+    """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+@dataclass
+class RecordedSnippet:
+    text: str
+    start: float
+    duration: float = 0.0
+
+
+class FetchRecorder:
+    """
+    Records YouTube responses to disk, or replays them without network access.
+
+    In "record" mode live calls pass through and their results (including
+    errors) are saved under `fixtures_dir`. In "replay" mode the saved
+    results are served back with simulated latency and an optional rate of
+    injected retryable failures, which makes fetch throughput measurable offline.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        fixtures_dir: Union[str, Path],
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"FetchRecorder mode must be 'record' or 'replay', got {mode!r}")
+        self.mode = mode
+        self.fixtures_dir = Path(fixtures_dir)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def wrap_transcript_api(self, api, classify_error: Callable[[Exception], str]) -> "RecordingTranscriptApi":
+        return RecordingTranscriptApi(self, api, classify_error)
+
+    def get_channel(self, channel_url: str, limit: Optional[int] = None, sort_by: str = "newest") -> Iterator[dict]:
+        """Drop-in replacement for `scrapetube.get_channel`."""
+        path = self.fixtures_dir / "channels" / f"{_slugify(channel_url)}.json"
+        if self.mode == "replay":
+            videos = self._load_json(path) or []
+            for index, video in enumerate(videos[:limit] if limit else videos):
+                if index % SCRAPETUBE_PAGE_SIZE == 0:
+                    self._simulate_latency()
+                yield video
+            return
+
+        # Only what the consumer actually pulls is recorded, so later replays stop where this run stopped
+        recorded = []
+        try:
+            for video in scrapetube.get_channel(channel_url=channel_url, limit=limit, sort_by=sort_by):
+                recorded.append(video)
+                yield video
+        finally:
+            previous = self._load_json(path) or []
+            if len(recorded) >= len(previous):
+                self._save_json(path, recorded)
+
+    def get_feed(self, channel_url: str, fetch_feed: Callable[[str], Optional[str]]) -> Optional[str]:
+        """
+        Record or replay a channel feed.
+
+        :param channel_url: Channel URL
+        :param fetch_feed: Live fetch returning feed XML or None
+        :return: Feed XML, or None if no feed is available
+        """
+        path = self.fixtures_dir / "feeds" / f"{_slugify(channel_url)}.xml"
+        if self.mode == "replay":
+            self._simulate_latency()
+            self._maybe_fail(channel_url)
+            if not path.exists():
+                return None
+            return path.read_text(encoding="utf-8")
+
+        xml_text = fetch_feed(channel_url)
+        if xml_text is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(xml_text, encoding="utf-8")
+        return xml_text
+
+    def fetch_transcript(self, api, classify_error: Callable[[Exception], str], video_id: str, languages: list[str]):
+        path = self.fixtures_dir / "transcripts" / f"{video_id}.json"
+        if self.mode == "replay":
+            self._simulate_latency()
+            self._maybe_fail(video_id)
+            data = self._load_json(path)
+            if data is None:
+                raise ReplayedFetchError("unknown", f"No recorded transcript for {video_id}")
+            if "error" in data:
+                raise ReplayedFetchError(data["error"]["kind"], data["error"]["message"])
+            return [RecordedSnippet(*segment) for segment in data["segments"]]
+
+        try:
+            snippets = list(api.fetch(video_id, languages=languages))
+        except Exception as e:
+            kind = classify_error(e)
+            # Transient failures are not recorded so a later recording run can fill them in
+            if kind != "retryable":
+                self._save_json(path, {"error": {"kind": kind, "type": type(e).__name__, "message": str(e)}})
+            raise
+        self._save_json(path, {
+            "languages": languages,
+            "segments": [[s.text, s.start, getattr(s, "duration", 0.0)] for s in snippets],
+        })
+        return snippets
+
+    def _simulate_latency(self) -> None:
+        if self.latency <= 0 and self.latency_jitter <= 0:
+            return
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+        time.sleep(delay)
+
+    def _maybe_fail(self, key: str) -> None:
+        if self.failure_rate <= 0:
+            return
+        with self._random_lock:
+            fail = self._random.random() < self.failure_rate
+        if fail:
+            raise ReplayedFetchError("retryable", f"Simulated failure for {key}")
+
+    @staticmethod
+    def _load_json(path: Path):
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save_json(path: Path, data) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class RecordingTranscriptApi:
+    """Transcript API wrapper with the `fetch` interface of `YouTubeTranscriptApi`."""
+
+    def __init__(self, recorder: FetchRecorder, api, classify_error: Callable[[Exception], str]):
+        self.recorder = recorder
+        self.api = api
+        self.classify_error = classify_error
+
+    def fetch(self, video_id: str, languages: list[str]):
+        return self.recorder.fetch_transcript(self.api, self.classify_error, video_id, languages)
+
+
+_recorder: Optional[FetchRecorder] = None
+_recorder_configured = False
+_recorder_lock = threading.Lock()
+
+
+def configure_fetch_recording(
+    mode: str = "live",
+    fixtures_dir: Optional[Union[str, Path]] = None,
+    latency: float = 0.0,
+    latency_jitter: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: Optional[int] = None,
+) -> None:
+    """
+    Set the process-wide fetch mode. Call before any fetcher is created.
+
+    :param mode: "live", "record" or "replay"
+    :param fixtures_dir: Directory holding the recorded responses
+    :param latency: Simulated latency per replayed request, in seconds
+    :param latency_jitter: Random extra latency added on top, in seconds
+    :param failure_rate: Probability of a simulated retryable failure per replayed request
+    :param seed: Seed for the simulated latency and failures
+    """
+    global _recorder, _recorder_configured
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode {mode!r}, expected one of {FETCH_MODES}")
+    with _recorder_lock:
+        _recorder_configured = True
+        _recorder = None
+        if mode != "live":
+            _recorder = FetchRecorder(
+                mode=mode,
+                fixtures_dir=fixtures_dir or get_cache_dir() / "fixtures",
+                latency=latency,
+                latency_jitter=latency_jitter,
+                failure_rate=failure_rate,
+                seed=seed,
+            )
+            logger.info(f"YouTube fetching in {mode} mode using fixtures in {_recorder.fixtures_dir}")
+
+
+def get_fetch_recorder() -> Optional[FetchRecorder]:
+    """
+    Return the active recorder, or None when fetching live.
+
+    Unless `configure_fetch_recording` was called, the mode and fixtures
+    directory are read from the YT_FETCH_MODE and YT_FIXTURES_DIR variables.
+    """
+    if not _recorder_configured:
+        configure_fetch_recording(
+            mode=os.getenv(FETCH_MODE_ENV_VAR, "live"),
+            fixtures_dir=os.getenv(FIXTURES_DIR_ENV_VAR),
+        )
+    return _recorder
+
+
+def _slugify(url: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", url.split("://", 1)[-1]).strip("_")
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+    return f"{slug[:80]}_{digest}"
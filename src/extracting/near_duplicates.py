@@ -0,0 +1,370 @@
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+from src.extracting.utils import Transcript
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+
+
+DEFAULT_INDEX_FILENAME = "near_duplicates.sqlite"
+DEFAULT_TTL = timedelta(days=90)
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows make pairs above ~0.5 Jaccard similarity likely candidates
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+# Candidates are confirmed against the estimated Jaccard similarity of their shingles
+DUPLICATE_SIMILARITY = 0.6
+MIN_SHINGLES = 20
+# A clip has a low Jaccard similarity to the talk it was cut from, so containment is checked
+# too: shingles whose hash is divisible by the rate are sampled, the same ones in every text,
+# and a text whose sampled shingles mostly occur in another is contained in it
+CONTAINMENT_SAMPLE_RATE = 8
+DUPLICATE_CONTAINMENT = 0.8
+MIN_CONTAINMENT_SAMPLES = 8
+# Sampled shingles looked up per SQLite query
+CONTAINMENT_QUERY_SIZE = 500
+MERSENNE_PRIME = (1 << 31) - 1
+WORD_RE = re.compile(r"\w+")
+
+_permutation_rng = np.random.default_rng(20240601)
+# Fixed seed, as signatures persisted by earlier runs must stay comparable
+PERMUTATION_A = _permutation_rng.integers(1, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+PERMUTATION_B = _permutation_rng.integers(0, MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+@dataclass
+class Fingerprint:
+    # MinHash signature, NUM_PERMUTATIONS uint32 values
+    signature: np.ndarray
+    # Hashes of the sampled shingles, for containment checks
+    sample: frozenset[int]
+
+
+def _shingle_hashes(text: str) -> Optional[np.ndarray]:
+    words = WORD_RE.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def _minhash(hashes: np.ndarray) -> np.ndarray:
+    hashes = hashes % MERSENNE_PRIME
+    # (a * x + b) mod p stays within uint64 because a, x < 2^31
+    permuted = (hashes[:, None] * PERMUTATION_A[None, :] + PERMUTATION_B[None, :]) % MERSENNE_PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of the word shingles of `text`.
+
+    :return: Array of NUM_PERMUTATIONS uint32 values, or None for texts too short to fingerprint
+    """
+    hashes = _shingle_hashes(text)
+    return _minhash(hashes) if hashes is not None else None
+
+
+def fingerprint(text: str) -> Optional[Fingerprint]:
+    """
+    MinHash signature and containment sample of the word shingles of `text`.
+
+    :return: Fingerprint, or None for texts too short to fingerprint
+    """
+    hashes = _shingle_hashes(text)
+    if hashes is None:
+        return None
+    sample = frozenset(hashes[hashes % CONTAINMENT_SAMPLE_RATE == 0].tolist())
+    return Fingerprint(signature=_minhash(hashes), sample=sample)
+
+
+def _containment(sample: frozenset[int], other: frozenset[int]) -> float:
+    """Estimated share of the shingles of the smaller text that occur in the other one."""
+    smaller = min(len(sample), len(other))
+    if smaller < MIN_CONTAINMENT_SAMPLES:
+        return 0.0
+    return len(sample & other) / smaller
+
+
+def _band_keys(signature: np.ndarray) -> list[bytes]:
+    return [signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes() for band in range(LSH_BANDS)]
+
+
+@dataclass
+class DeduplicationResult:
+    """
+    Outcome of collapsing near-duplicate transcripts of one run.
+    """
+    # Transcripts to extract, in input order
+    survivors: list[Transcript] = field(default_factory=list)
+    # Duplicates folded into each survivor, by survivor video id
+    duplicates: dict[str, list[Transcript]] = field(default_factory=dict)
+    # Transcripts whose content was already extracted in an earlier run
+    already_extracted: list[Transcript] = field(default_factory=list)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of extracted transcripts, persisted in SQLite across runs.
+
+    `collapse` groups near-duplicate transcripts of a run (re-uploads, clips and
+    cross-posted panels) under one survivor and drops transcripts that duplicate
+    content extracted in earlier runs. Re-uploads are matched by the Jaccard
+    similarity of their shingles, clips by the share of their shingles contained
+    in the longer transcript; an earlier clip does not suppress the whole talk.
+    Survivors are only added to the persisted index by `commit`, and only once
+    extracted, so a run that fails before its results are stored, or a
+    transcript that failed or was skipped, does not hide them from later runs.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        threshold: float = DUPLICATE_SIMILARITY,
+        ttl: timedelta = DEFAULT_TTL,
+        containment: float = DUPLICATE_CONTAINMENT,
+    ):
+        """
+        :param path: SQLite file, defaults to .cache/near_duplicates.sqlite
+        :param threshold: Minimum estimated Jaccard similarity of two duplicates
+        :param containment: Minimum estimated share of the shorter transcript contained in the longer one
+        :param ttl: How long an extracted transcript keeps suppressing its duplicates
+        """
+        self.path = Path(path) if path else get_cache_dir() / DEFAULT_INDEX_FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.containment = containment
+        self.ttl_seconds = ttl.total_seconds()
+
+        self._lock = threading.Lock()
+        self._pending: list[tuple[Transcript, Fingerprint]] = []
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                video_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                band_key BLOB NOT NULL,
+                video_id TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_key ON bands (band, band_key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_video ON bands (video_id)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS samples (
+                hash INTEGER NOT NULL,
+                video_id TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_hash ON samples (hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_video ON samples (video_id)")
+        self._conn.commit()
+
+        with self._lock:
+            self._purge_expired()
+
+    def collapse(self, transcripts: list[Transcript]) -> DeduplicationResult:
+        """
+        Collapse near-duplicates among `transcripts` and against earlier runs.
+
+        Within a run the longest transcript of a group survives and the others
+        are attached to it as duplicates, so their sources stay attributed. A
+        transcript is only dropped against an earlier run when it is a copy or a
+        clip of earlier content, not when it merely contains an earlier clip.
+
+        :param transcripts: Transcripts of all channels, in processing order
+        :return: Survivors, folded duplicates and already extracted transcripts
+        """
+        result = DeduplicationResult()
+        # Fingerprints of this run's survivors, by index in result.survivors
+        run_fingerprints: list[Optional[Fingerprint]] = []
+
+        for transcript in transcripts:
+            print_ = fingerprint(transcript.text)
+            if print_ is None:
+                result.survivors.append(transcript)
+                run_fingerprints.append(None)
+                continue
+
+            earlier = self._find_indexed(transcript.video_id, print_)
+            if earlier is not None:
+                logger.info(
+                    f"Skipping transcript {transcript.video_id}, a near-duplicate of already extracted {earlier}"
+                )
+                result.already_extracted.append(transcript)
+                continue
+
+            match = self._find_in_run(print_, run_fingerprints)
+            if match is None:
+                result.survivors.append(transcript)
+                run_fingerprints.append(print_)
+                continue
+
+            survivor = result.survivors[match]
+            if len(transcript.text) > len(survivor.text):
+                # Keep the fuller copy, e.g. the whole talk rather than a clip or a re-upload with cuts
+                result.survivors[match] = transcript
+                run_fingerprints[match] = print_
+                folded = result.duplicates.pop(survivor.video_id, [])
+                result.duplicates[transcript.video_id] = folded + [survivor]
+                survivor, transcript = transcript, survivor
+            else:
+                result.duplicates.setdefault(survivor.video_id, []).append(transcript)
+            logger.info(f"Collapsing transcript {transcript.video_id} into near-duplicate {survivor.video_id}")
+
+        with self._lock:
+            self._pending = [
+                (transcript, print_)
+                for transcript, print_ in zip(result.survivors, run_fingerprints)
+                if print_ is not None
+            ]
+
+        n_duplicates = sum(len(d) for d in result.duplicates.values())
+        logger.info(
+            f"Near-duplicate check kept {len(result.survivors)} of {len(transcripts)} transcripts "
+            f"({n_duplicates} collapsed, {len(result.already_extracted)} already extracted)"
+        )
+        return result
+
+    def commit(self, extracted_video_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Persist the survivors of the last `collapse` so later runs skip their duplicates.
+
+        :param extracted_video_ids: Survivors whose extraction succeeded; None persists all survivors
+        """
+        extracted = set(extracted_video_ids) if extracted_video_ids is not None else None
+        now = time.time()
+        with self._lock:
+            for transcript, print_ in self._pending:
+                if extracted is not None and transcript.video_id not in extracted:
+                    continue
+                self._conn.execute("DELETE FROM bands WHERE video_id = ?", (transcript.video_id,))
+                self._conn.execute("DELETE FROM samples WHERE video_id = ?", (transcript.video_id,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO signatures (video_id, url, channel, signature, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (transcript.video_id, transcript.url, transcript.channel_name, print_.signature.tobytes(), now),
+                )
+                self._conn.executemany(
+                    "INSERT INTO bands (band, band_key, video_id) VALUES (?, ?, ?)",
+                    [(band, key, transcript.video_id) for band, key in enumerate(_band_keys(print_.signature))],
+                )
+                self._conn.executemany(
+                    "INSERT INTO samples (hash, video_id) VALUES (?, ?)",
+                    [(value, transcript.video_id) for value in print_.sample],
+                )
+            self._conn.commit()
+            self._pending = []
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _find_indexed(self, video_id: str, print_: Fingerprint) -> Optional[str]:
+        signature = print_.signature
+        candidates = set()
+        with self._lock:
+            for band, key in enumerate(_band_keys(signature)):
+                rows = self._conn.execute(
+                    "SELECT video_id FROM bands WHERE band = ? AND band_key = ?", (band, key)
+                ).fetchall()
+                candidates.update(row[0] for row in rows)
+            candidates.discard(video_id)
+
+            for candidate in candidates:
+                row = self._conn.execute(
+                    "SELECT signature FROM signatures WHERE video_id = ?", (candidate,)
+                ).fetchone()
+                if row is None:
+                    continue
+                other = np.frombuffer(row[0], dtype=np.uint32)
+                if np.mean(other == signature) >= self.threshold:
+                    return candidate
+            return self._find_indexed_container(video_id, print_.sample)
+
+    def _find_indexed_container(self, video_id: str, sample: frozenset[int]) -> Optional[str]:
+        """Indexed transcript containing most of `sample`, e.g. the talk a new clip was cut from."""
+        if len(sample) < MIN_CONTAINMENT_SAMPLES:
+            return None
+        values = list(sample)
+        shared: dict[str, int] = {}
+        for start in range(0, len(values), CONTAINMENT_QUERY_SIZE):
+            batch = values[start:start + CONTAINMENT_QUERY_SIZE]
+            rows = self._conn.execute(
+                f"SELECT video_id, COUNT(*) FROM samples WHERE hash IN ({','.join('?' * len(batch))}) "
+                "GROUP BY video_id",
+                batch,
+            ).fetchall()
+            for candidate, count in rows:
+                shared[candidate] = shared.get(candidate, 0) + count
+        shared.pop(video_id, None)
+        if not shared:
+            return None
+        candidate = max(shared, key=shared.get)
+        return candidate if shared[candidate] / len(sample) >= self.containment else None
+
+    def _find_in_run(self, print_: Fingerprint, run_fingerprints: list[Optional[Fingerprint]]) -> Optional[int]:
+        # A run holds at most a few hundred transcripts, so comparing fingerprints directly is cheap
+        best_index, best_similarity = None, self.threshold
+        for index, other in enumerate(run_fingerprints):
+            if other is None:
+                continue
+            similarity = float(np.mean(other.signature == print_.signature))
+            if similarity >= best_similarity:
+                best_index, best_similarity = index, similarity
+        if best_index is not None:
+            return best_index
+
+        best_containment = self.containment
+        for index, other in enumerate(run_fingerprints):
+            if other is None:
+                continue
+            containment = _containment(print_.sample, other.sample)
+            if containment >= best_containment:
+                best_index, best_containment = index, containment
+        return best_index
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            row[0] for row in
+            self._conn.execute("SELECT video_id FROM signatures WHERE indexed_at < ?", (cutoff,)).fetchall()
+        ]
+        for video_id in expired:
+            self._conn.execute("DELETE FROM bands WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM samples WHERE video_id = ?", (video_id,))
+            self._conn.execute("DELETE FROM signatures WHERE video_id = ?", (video_id,))
+        self._conn.commit()
+        if expired:
+            logger.debug(f"Purged {len(expired)} expired near-duplicate index entries")
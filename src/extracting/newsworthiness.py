@@ -0,0 +1,306 @@
+import re
+import json
+import math
+import os
+import random
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+from src.extracting.utils import Transcript
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+
+
+NEWSWORTHINESS_MODES = ("off", "shadow", "enforce")
+DEFAULT_MODE = "shadow"
+# Transcripts scoring below this are skipped in enforce mode
+DEFAULT_THRESHOLD = 0.2
+# The filter passes everything until it has seen this many outcomes of each class
+MIN_TRAINING_DOCS = 50
+# Share of low-scoring transcripts still extracted in enforce mode, so recall stays measurable
+EXPLORATION_RATE = 0.05
+# Scales the mean per-word evidence, so scores do not saturate on long transcripts
+EVIDENCE_WEIGHT = 20.0
+MAX_VOCABULARY = 50000
+# Video ids remembered so a transcript is trained on once, however often it is extracted
+MAX_SEEN_VIDEOS = 20000
+MIN_WORD_LENGTH = 3
+WORD_RE = re.compile(r"\w+")
+CHANNEL_FEATURE_PREFIX = "__channel__:"
+
+
+class NewsworthinessModel:
+    """
+    Naive Bayes model of whether a transcript yields any news items, trained online
+    on past extraction outcomes. Features are the distinct words of the title and
+    transcript plus the channel, which captures the base rate of noisy channels.
+    """
+
+    def __init__(
+        self,
+        doc_counts: Optional[list[int]] = None,
+        word_counts: Optional[dict[str, list[int]]] = None,
+        seen_videos: Optional[list[str]] = None,
+    ):
+        # Index 0 counts transcripts without news, index 1 transcripts with news
+        self.doc_counts = doc_counts or [0, 0]
+        self.word_counts = word_counts or {}
+        # Videos trained on, oldest first
+        self.seen_videos = seen_videos or []
+        self._seen = set(self.seen_videos)
+
+    @staticmethod
+    def features(transcript: Transcript) -> set[str]:
+        words = WORD_RE.findall(f"{transcript.title} {transcript.text}".lower())
+        features = {word for word in words if len(word) >= MIN_WORD_LENGTH and not word.isdigit()}
+        if transcript.channel_name:
+            features.add(CHANNEL_FEATURE_PREFIX + transcript.channel_name)
+        return features
+
+    def is_trained(self, min_docs: int = MIN_TRAINING_DOCS) -> bool:
+        return min(self.doc_counts) >= min_docs
+
+    def score(self, features: set[str]) -> float:
+        """Probability-like score in [0, 1] that the transcript contains news."""
+        negative_docs, positive_docs = self.doc_counts
+        prior = math.log((positive_docs + 1) / (negative_docs + 1))
+
+        evidence = []
+        for feature in features:
+            counts = self.word_counts.get(feature)
+            if counts is None:
+                continue
+            # Laplace-smoothed document frequency of the word in each class
+            p_positive = (counts[1] + 1) / (positive_docs + 2)
+            p_negative = (counts[0] + 1) / (negative_docs + 2)
+            evidence.append(math.log(p_positive / p_negative))
+
+        log_odds = prior
+        if evidence:
+            log_odds += EVIDENCE_WEIGHT * sum(evidence) / len(evidence)
+        return 1 / (1 + math.exp(-max(-50.0, min(50.0, log_odds))))
+
+    def update(self, video_id: str, features: set[str], has_news: bool) -> bool:
+        """
+        Train on the outcome of a transcript, unless it was trained on before, e.g. when
+        its channel is shared by several configs or a rerun is served from the caches.
+
+        :return: Whether the model was updated
+        """
+        if video_id in self._seen:
+            return False
+        self.seen_videos.append(video_id)
+        self._seen.add(video_id)
+        if len(self.seen_videos) > MAX_SEEN_VIDEOS:
+            for old_video_id in self.seen_videos[:-MAX_SEEN_VIDEOS]:
+                self._seen.discard(old_video_id)
+            self.seen_videos = self.seen_videos[-MAX_SEEN_VIDEOS:]
+
+        label = int(has_news)
+        self.doc_counts[label] += 1
+        for feature in features:
+            counts = self.word_counts.setdefault(feature, [0, 0])
+            counts[label] += 1
+        return True
+
+    def prune(self, max_vocabulary: int = MAX_VOCABULARY) -> None:
+        """Keep only the most frequent words, channels are always kept."""
+        if len(self.word_counts) <= max_vocabulary:
+            return
+        words = sorted(
+            (w for w in self.word_counts if not w.startswith(CHANNEL_FEATURE_PREFIX)),
+            key=lambda w: sum(self.word_counts[w]),
+            reverse=True,
+        )
+        dropped = words[max_vocabulary:]
+        for word in dropped:
+            del self.word_counts[word]
+
+    def to_dict(self) -> dict:
+        return {"doc_counts": self.doc_counts, "word_counts": self.word_counts, "seen_videos": self.seen_videos}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NewsworthinessModel":
+        return cls(
+            doc_counts=data["doc_counts"],
+            word_counts=data["word_counts"],
+            seen_videos=data.get("seen_videos", []),
+        )
+
+
+class NewsworthinessFilter:
+    """
+    Local pre-filter in front of LLM extraction.
+
+    In "shadow" mode every transcript is extracted and only the would-be decision
+    is logged, which measures the recall of a threshold before enforcing it. In
+    "enforce" mode transcripts scoring below the threshold are skipped, except for
+    a small random share kept for exploration. The outcome of each transcript
+    trains the model once and is appended to a JSONL log when the run's state is
+    saved, so runs that are never saved leave no outcomes behind.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[Union[str, Path]] = None,
+        outcomes_path: Optional[Union[str, Path]] = None,
+        mode: str = DEFAULT_MODE,
+        threshold: float = DEFAULT_THRESHOLD,
+        min_training_docs: int = MIN_TRAINING_DOCS,
+        exploration_rate: float = EXPLORATION_RATE,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param model_path: JSON file with the model, defaults to .cache/newsworthiness/model.json
+        :param outcomes_path: JSONL log of scores and outcomes, defaults to .cache/newsworthiness/outcomes.jsonl
+        :param mode: "off", "shadow" or "enforce"
+        :param threshold: Minimum score for a transcript to be extracted in enforce mode
+        :param min_training_docs: Outcomes of each class needed before the filter skips anything
+        :param exploration_rate: Share of low-scoring transcripts extracted anyway in enforce mode
+        :param seed: Seed of the exploration sampling
+        """
+        if mode not in NEWSWORTHINESS_MODES:
+            raise ValueError(f"Unknown newsworthiness mode {mode!r}, expected one of {NEWSWORTHINESS_MODES}")
+        cache_dir = get_cache_dir() / "newsworthiness"
+        self.model_path = Path(model_path) if model_path else cache_dir / "model.json"
+        self.outcomes_path = Path(outcomes_path) if outcomes_path else cache_dir / "outcomes.jsonl"
+        self.mode = mode
+        self.threshold = threshold
+        self.min_training_docs = min_training_docs
+        self.exploration_rate = exploration_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._dirty = False
+        # Outcomes of this run, written by `save`
+        self._pending_outcomes: list[dict] = []
+
+        self.model = NewsworthinessModel()
+        if self.model_path.exists():
+            with open(self.model_path, "r", encoding="utf-8") as f:
+                self.model = NewsworthinessModel.from_dict(json.load(f))
+
+    def score(self, transcript: Transcript) -> Optional[float]:
+        """Score of the transcript, or None while the model is not trained yet."""
+        with self._lock:
+            if not self.model.is_trained(self.min_training_docs):
+                return None
+            return self.model.score(NewsworthinessModel.features(transcript))
+
+    def select(self, transcripts: list[Transcript]) -> list[tuple[Transcript, Optional[float]]]:
+        """
+        Decide which transcripts to extract.
+
+        :param transcripts: Fetched transcripts
+        :return: Transcripts to extract with their scores, highest scores first
+        """
+        if self.mode == "off":
+            return [(transcript, None) for transcript in transcripts]
+
+        selected = []
+        for transcript in transcripts:
+            score = self.score(transcript)
+            if self.mode == "enforce" and score is not None and score < self.threshold:
+                if self._random.random() >= self.exploration_rate:
+                    logger.info(
+                        f"Skipping transcript {transcript.video_id} with newsworthiness score {score:.3f}"
+                    )
+                    self._log_outcome(transcript, score, passed=False, n_news=None)
+                    continue
+            selected.append((transcript, score))
+
+        # Unscored transcripts go first, as nothing is known about them
+        selected.sort(key=lambda item: -1 if item[1] is None else -item[1])
+        return selected
+
+    def record(self, transcript: Transcript, score: Optional[float], n_news: int) -> None:
+        """
+        Record the result of extracting a transcript and train on it.
+
+        :param transcript: Extracted transcript
+        :param score: Score returned by `select`
+        :param n_news: Number of news items extracted from it
+        """
+        if self.mode == "off":
+            return
+        features = NewsworthinessModel.features(transcript)
+        with self._lock:
+            if not self.model.update(transcript.video_id, features, n_news > 0):
+                logger.debug(f"Transcript {transcript.video_id} was already recorded")
+                return
+            self._dirty = True
+        passed = score is None or score >= self.threshold
+        self._log_outcome(transcript, score, passed=passed, n_news=n_news)
+
+    def save(self) -> None:
+        with self._lock:
+            outcomes, self._pending_outcomes = self._pending_outcomes, []
+            if outcomes:
+                self.outcomes_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.outcomes_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in outcomes)
+            if not self._dirty:
+                return
+            self.model.prune()
+            data = self.model.to_dict()
+            self._dirty = False
+
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.model_path.with_suffix(self.model_path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.model_path)
+
+        logger.info(f"Saved newsworthiness model trained on {sum(data['doc_counts'])} transcripts")
+
+    def _log_outcome(self, transcript: Transcript, score: Optional[float], passed: bool, n_news: Optional[int]) -> None:
+        record = {
+            "video_id": transcript.video_id,
+            "channel": transcript.channel_name,
+            "score": score,
+            "threshold": self.threshold,
+            "mode": self.mode,
+            "passed": passed,
+            "n_news": n_news,
+            "recorded_at": datetime.now().isoformat(),
+        }
+        with self._lock:
+            # A transcript skipped for several configs is logged once
+            if not any(pending["video_id"] == record["video_id"] for pending in self._pending_outcomes):
+                self._pending_outcomes.append(record)
+
+
+def evaluate_threshold(outcomes_path: Union[str, Path], threshold: float) -> dict:
+    """
+    Measure a threshold against logged outcomes of extracted, scored transcripts.
+
+    :param outcomes_path: JSONL outcomes log
+    :param threshold: Threshold to evaluate
+    :return: Recall of transcripts with news and share of transcripts that would be skipped
+    """
+    n_scored = n_with_news = n_kept_with_news = n_skipped = 0
+    with open(outcomes_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["score"] is None or record["n_news"] is None:
+                continue
+            n_scored += 1
+            kept = record["score"] >= threshold
+            n_skipped += not kept
+            if record["n_news"] > 0:
+                n_with_news += 1
+                n_kept_with_news += kept
+
+    return {
+        "threshold": threshold,
+        "scored": n_scored,
+        "recall": n_kept_with_news / n_with_news if n_with_news else None,
+        "skip_rate": n_skipped / n_scored if n_scored else None,
+    }
+
+
+if __name__ == "__main__":
+    outcomes_path = get_cache_dir() / "newsworthiness" / "outcomes.jsonl"
+    for threshold in (0.05, 0.1, 0.2, 0.3, 0.5):
+        print(evaluate_threshold(outcomes_path, threshold))
@@ -1,19 +1,49 @@
 import json
+import asyncio
 from datetime import datetime
 from typing import Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from src.extracting.transcript_parser import TranscriptParser
-from src.extracting.transcripts_fetcher import ChannelTranscriptsFetcher
-from src.extracting.utils import News
+from src.extracting.transcripts_fetcher import ChannelTranscriptsFetcher, DEFAULT_METADATA_SOURCE
+from src.extracting.transcript_cache import TranscriptCache
+from src.extracting.channel_watermarks import ChannelWatermarkStore
+from src.extracting.newsworthiness import NewsworthinessFilter
+from src.extracting.boilerplate import BoilerplateStripper
+from src.extracting.utils import News, Transcript
 from src.utils.logger import logger
+from src.utils.llm_cache import LLMResponseCache
 
 
 class SimpleNewsExtractor:
-    def __init__(self, channel_url: str):
+    def __init__(
+        self,
+        channel_url: str,
+        transcript_cache: Optional[TranscriptCache] = None,
+        watermarks: Optional[ChannelWatermarkStore] = None,
+        metadata_source: str = DEFAULT_METADATA_SOURCE,
+        llm_cache: Optional[LLMResponseCache] = None,
+        newsworthiness: Optional[NewsworthinessFilter] = None,
+        boilerplate: Optional[BoilerplateStripper] = None,
+    ):
+        """
+        :param newsworthiness: Local pre-filter deciding which transcripts reach the LLM; None extracts all
+        :param boilerplate: Stripper of sponsor reads and channel boilerplate; None sends transcripts as fetched
+        """
         self.channel_id = channel_url
-        self.transcripts_fetcher = ChannelTranscriptsFetcher(channel_url)
-        self.transcript_parser = TranscriptParser()
+        # Transcripts whose extraction succeeded, including those without news
+        self.extracted_video_ids: set[str] = set()
+        # Transcripts deliberately not extracted, e.g. by the newsworthiness filter
+        self.skipped_video_ids: set[str] = set()
+        self.newsworthiness = newsworthiness
+        self.boilerplate = boilerplate
+        self.transcripts_fetcher = ChannelTranscriptsFetcher(
+            channel_url,
+            cache=transcript_cache,
+            watermarks=watermarks,
+            metadata_source=metadata_source,
+        )
+        self.transcript_parser = TranscriptParser(cache=llm_cache)
 
     def run(
         self,
@@ -21,40 +51,168 @@ class SimpleNewsExtractor:
         since_date: Optional[datetime] = None,
         json_save_path: Optional[str] = None,
         max_workers: int = 4,
+        fetch_workers: int = 1,
     ) -> list[News]:
 
-        transcripts = self.transcripts_fetcher.fetch_transcripts(
+        transcripts = self.fetch(n_videos=n_videos, since_date=since_date, fetch_workers=fetch_workers)
+        news = self.extract(transcripts, max_workers=max_workers)
+        self.advance_watermark(self.extracted_video_ids | self.skipped_video_ids)
+
+        if json_save_path:
+            self._save_to_json(news, json_save_path)
+
+        return news
+
+    async def arun(
+        self,
+        n_videos: Optional[int] = None,
+        since_date: Optional[datetime] = None,
+        json_save_path: Optional[str] = None,
+        fetch_workers: int = 1,
+    ) -> list[News]:
+        """
+        Async variant of `run`. Fetching runs in a worker thread, and extraction
+        calls are bounded only by the global LLM concurrency budget.
+        """
+        transcripts = await asyncio.to_thread(
+            self.fetch,
             n_videos=n_videos,
             since_date=since_date,
+            fetch_workers=fetch_workers,
         )
+        news = await self.aextract(transcripts)
+        self.advance_watermark(self.extracted_video_ids | self.skipped_video_ids)
+
+        if json_save_path:
+            self._save_to_json(news, json_save_path)
+
+        return news
 
+    def fetch(
+        self,
+        n_videos: Optional[int] = None,
+        since_date: Optional[datetime] = None,
+        fetch_workers: int = 1,
+    ) -> list[Transcript]:
+        transcripts = self.transcripts_fetcher.fetch_transcripts(
+            n_videos=n_videos,
+            since_date=since_date,
+            max_workers=fetch_workers,
+        )
         logger.info(f"Fetched {len(transcripts)} transcripts")
+        return transcripts
+
+    def advance_watermark(self, settled_video_ids: set[str]) -> None:
+        """Move the channel's watermark past the fetched videos that need no retry."""
+        self.transcripts_fetcher.advance_watermark(settled_video_ids)
 
+    def extract(
+        self,
+        transcripts: list[Transcript],
+        max_workers: int = 4,
+        duplicates: Optional[dict[str, list[Transcript]]] = None,
+    ) -> list[News]:
+        """
+        :param duplicates: Near-duplicates collapsed into each transcript, by video id; their
+            sources are attributed to the news extracted from it
+        """
         news: list[News] = []
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
-                executor.submit(self.transcript_parser.run, transcript): transcript
-                for transcript in transcripts
+                executor.submit(self.transcript_parser.parse, transcript): (transcript, score)
+                for transcript, score in self._select(transcripts)
             }
 
             for future in as_completed(futures):
-                transcript = futures[future]
+                transcript, score = futures[future]
                 try:
                     result = future.result()
+                    self._attribute_duplicates(result, (duplicates or {}).get(transcript.video_id, []))
                     news.extend(result)
+                    self._record(transcript, score, result)
                 except Exception as e:
                     logger.exception(
                         f"Failed to process transcript {getattr(transcript, 'video_id', None)}: {e}"
                     )
 
         logger.info(f"Extracted {len(news)} news items")
+        return news
 
-        if json_save_path:
-            self._save_to_json(news, json_save_path)
+    async def aextract(
+        self,
+        transcripts: list[Transcript],
+        duplicates: Optional[dict[str, list[Transcript]]] = None,
+    ) -> list[News]:
+        selected = self._select(transcripts)
+        results = await asyncio.gather(
+            *(self.transcript_parser.aparse(transcript) for transcript, _ in selected),
+            return_exceptions=True,
+        )
+
+        news: list[News] = []
+        for (transcript, score), result in zip(selected, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to process transcript {transcript.video_id}: {result}")
+                continue
+            self._attribute_duplicates(result, (duplicates or {}).get(transcript.video_id, []))
+            news.extend(result)
+            self._record(transcript, score, result)
 
+        logger.info(f"Extracted {len(news)} news items")
         return news
 
+    def _select(self, transcripts: list[Transcript]) -> list[tuple[Transcript, Optional[float]]]:
+        transcripts = self._strip_boilerplate(transcripts)
+        if self.newsworthiness is None:
+            return [(transcript, None) for transcript in transcripts]
+        selected = self.newsworthiness.select(transcripts)
+        selected_ids = {transcript.video_id for transcript, _ in selected}
+        self.skipped_video_ids.update(t.video_id for t in transcripts if t.video_id not in selected_ids)
+        if len(selected) < len(transcripts):
+            logger.info(
+                f"Newsworthiness filter skipped {len(transcripts) - len(selected)} of {len(transcripts)} transcripts"
+            )
+        return selected
+
+    def _strip_boilerplate(self, transcripts: list[Transcript]) -> list[Transcript]:
+        if self.boilerplate is None or not transcripts:
+            return transcripts
+
+        stripped = []
+        tokens_before = tokens_after = 0
+        for transcript in transcripts:
+            cleaned, report = self.boilerplate.strip(transcript)
+            if cleaned.text:
+                stripped.append(cleaned)
+            else:
+                self.skipped_video_ids.add(transcript.video_id)
+                logger.info(f"Skipping transcript {transcript.video_id}, nothing is left after stripping boilerplate")
+            tokens_before += report.tokens_before
+            tokens_after += report.tokens_after
+            logger.info(
+                f"Boilerplate stripping saved {report.tokens_saved} of {report.tokens_before} tokens "
+                f"in transcript {report.video_id}"
+            )
+
+        if tokens_before:
+            logger.info(
+                f"Boilerplate stripping saved {tokens_before - tokens_after} of {tokens_before} tokens "
+                f"({(tokens_before - tokens_after) / tokens_before:.1%}) for channel {self.channel_id}"
+            )
+        return stripped
+
+    @staticmethod
+    def _attribute_duplicates(news: list[News], duplicates: list[Transcript]) -> None:
+        for item in news:
+            item.duplicate_video_urls = [d.url for d in duplicates]
+            item.duplicate_channels = list(dict.fromkeys(d.channel_name for d in duplicates))
+
+    def _record(self, transcript: Transcript, score: Optional[float], news: list[News]) -> None:
+        self.extracted_video_ids.add(transcript.video_id)
+        if self.newsworthiness is not None:
+            self.newsworthiness.record(transcript, score, len(news))
+
     @staticmethod
     def _save_to_json(news: list[News], path: str) -> None:
         data = {
@@ -0,0 +1,125 @@
+import os
+import threading
+from typing import Iterable, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+from youtube_transcript_api import YouTubeTranscriptApi
+from youtube_transcript_api.proxies import WebshareProxyConfig
+
+from src.utils.logger import logger
+
+
+DEFAULT_POOL_SIZE = 32
+# Webshare gives every new connection a new exit IP, and the API's retries of blocked
+# requests rely on that, so connections are only kept alive when asked for
+DEFAULT_KEEP_ALIVE = False
+
+_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+_keep_alive = DEFAULT_KEEP_ALIVE
+_http_session: Optional[requests.Session] = None
+_transcript_api: Optional["ThreadLocalTranscriptApi"] = None
+
+
+class ThreadLocalTranscriptApi:
+    """
+    Transcript API client usable from any thread.
+
+    `YouTubeTranscriptApi` is not thread-safe and writes its proxy settings onto
+    its session, so each thread gets its own instance with its own proxied session.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def fetch(self, video_id: str, languages: Iterable[str] = ("en",), preserve_formatting: bool = False):
+        return self._get().fetch(video_id, languages=languages, preserve_formatting=preserve_formatting)
+
+    def list(self, video_id: str):
+        return self._get().list(video_id)
+
+    def _get(self) -> YouTubeTranscriptApi:
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._local.api = _build_transcript_api()
+        return api
+
+
+def configure_transcript_api(pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = DEFAULT_KEEP_ALIVE) -> None:
+    """
+    Set connection pooling options for the shared clients. Already created
+    clients are dropped and rebuilt on next use.
+
+    With a rotating proxy every connection gets a new exit IP, so keep-alive
+    trades IP rotation for fewer TLS and proxy handshakes.
+
+    :param pool_size: Maximum number of pooled connections per host
+    :param keep_alive: Whether to reuse proxied transcript connections between requests
+    """
+    global _pool_size, _keep_alive, _http_session, _transcript_api
+    with _lock:
+        _pool_size = pool_size
+        _keep_alive = keep_alive
+        if _http_session is not None:
+            _http_session.close()
+        _http_session = None
+        _transcript_api = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide pooled HTTP session for direct YouTube requests, e.g.
+    channel feeds. Transcript requests use their own proxied sessions.
+    """
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            _http_session = _build_session()
+        return _http_session
+
+
+def get_transcript_api() -> ThreadLocalTranscriptApi:
+    """Return the process-wide transcript API client, building it on first use."""
+    global _transcript_api
+    with _lock:
+        if _transcript_api is None:
+            _transcript_api = ThreadLocalTranscriptApi()
+            logger.debug(
+                "Created shared transcript API client (pool size %s, keep-alive %s)",
+                _pool_size,
+                _keep_alive,
+            )
+        return _transcript_api
+
+
+def get_proxy_key() -> str:
+    """Identify the proxy used for transcript requests, e.g. for per-proxy rate limits."""
+    return f"webshare:{os.getenv('WEBSHARE_PROXY_USERNAME')}"
+
+
+def _build_session(max_retries: Union[Retry, int] = 0) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=_pool_size, pool_maxsize=_pool_size, max_retries=max_retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _build_transcript_api() -> YouTubeTranscriptApi:
+    proxy_config = WebshareProxyConfig(
+        proxy_username=os.getenv("WEBSHARE_PROXY_USERNAME"),
+        proxy_password=os.getenv("WEBSHARE_PROXY_PASSWORD"),
+    )
+    session = requests.Session()
+    api = YouTubeTranscriptApi(proxy_config=proxy_config, http_client=session)
+    # The API mounts unpooled adapters to retry blocked requests; replace them with
+    # pooled ones using the same retries
+    retries = Retry(total=proxy_config.retries_when_blocked, status_forcelist=[429])
+    adapter = HTTPAdapter(pool_connections=_pool_size, pool_maxsize=_pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if _keep_alive:
+        session.headers.pop("Connection", None)
+    return api
@@ -0,0 +1,74 @@
+import zlib
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Union
+
+from src.extracting.utils import Transcript
+from src.utils.path_utils import get_cache_dir
+from src.utils.sqlite_cache import SqliteCache
+
+
+DEFAULT_TTL = timedelta(days=30)
+DEFAULT_NEGATIVE_TTL = timedelta(days=2)
+DEFAULT_MAX_SIZE_BYTES = 512 * 1024 * 1024
+DEFAULT_CACHE_FILENAME = "transcripts.sqlite"
+# Prefix of entries holding an encoded transcript body; older entries are plain zlib text
+BODY_FORMAT_PREFIX = b"\x01"
+
+
+class TranscriptCache:
+    """
+    On-disk cache of fetched transcripts keyed by video id and language.
+
+    Transcript text and segments are stored zlib-compressed. Videos without an available
+    transcript are stored as negative entries with a shorter TTL so they are
+    not re-requested on every run.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ttl: timedelta = DEFAULT_TTL,
+        negative_ttl: timedelta = DEFAULT_NEGATIVE_TTL,
+        max_size_bytes: Optional[int] = DEFAULT_MAX_SIZE_BYTES,
+    ):
+        path = path or get_cache_dir() / DEFAULT_CACHE_FILENAME
+        self.negative_ttl = negative_ttl
+        self._store = SqliteCache(
+            path,
+            ttl_seconds=ttl.total_seconds(),
+            max_size_bytes=max_size_bytes,
+        )
+
+    def get(self, video_id: str, languages: list[str]) -> tuple[bool, Optional[Transcript]]:
+        """
+        Look up a transcript.
+
+        :param video_id: YouTube video ID
+        :param languages: Requested transcript languages
+        :return: Tuple of (found, transcript); the transcript is None for a cached
+            "no transcript" entry and carries no title or publish date
+        """
+        found, value = self._store.lookup(self._key(video_id, languages))
+        if not found or value is None:
+            return found, None
+        if value.startswith(BODY_FORMAT_PREFIX):
+            return True, Transcript.from_body_bytes(zlib.decompress(value[1:]), video_id=video_id)
+        return True, Transcript(video_id=video_id, title="", text=zlib.decompress(value).decode("utf-8"))
+
+    def set(self, transcript: Transcript, languages: list[str]) -> None:
+        self._store.set(
+            self._key(transcript.video_id, languages),
+            BODY_FORMAT_PREFIX + zlib.compress(transcript.body_to_bytes()),
+        )
+
+    def set_unavailable(self, video_id: str, languages: list[str]) -> None:
+        self._store.set(
+            self._key(video_id, languages),
+            None,
+            ttl_seconds=self.negative_ttl.total_seconds(),
+        )
+
+    @staticmethod
+    def _key(video_id: str, languages: list[str]) -> str:
+        return f"{','.join(languages)}:{video_id}"
@@ -1,18 +1,31 @@
-import os
+import re
+import json
+import asyncio
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
 
 from src.extracting.prompts import TRANSCRIPT_PARSING_PROMPT
+from src.extracting.chunking import split_transcript
 from src.extracting.utils import Transcript, News
 from src.utils.logger import logger
+from src.utils.llm_cache import LLMResponseCache
+from src.utils.tokens import count_tokens, estimate_call_tokens
+from src.utils.llm_concurrency import llm_slot, llm_slot_sync
+from src.utils.llm_factory import get_chain, get_prompt, is_repaired
 
 
 DEFAULT_TEMPERATURE = 0.0
 DEFAULT_MODEL_NAME = "gpt-4o-mini"
+# Transcripts above this size are extracted in parallel chunks and merged
+CHUNKING_THRESHOLD_TOKENS = 12000
+CHUNK_MAX_TOKENS = 6000
+MAX_CHUNK_WORKERS = 4
+# Items from different chunks with titles this similar (word Jaccard) are merged
+DUPLICATE_TITLE_SIMILARITY = 0.6
+WORD_RE = re.compile(r"\w+")
 
 
 class NewsItem(BaseModel):
@@ -31,43 +44,212 @@ class NewsExtractionOutput(BaseModel):
 
 
 class TranscriptParser:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=DEFAULT_MODEL_NAME,
-            temperature=DEFAULT_TEMPERATURE,
-            api_key=os.environ.get("OPENAI_API_KEY"),
+    def __init__(self, cache: Optional[LLMResponseCache] = None):
+        """
+        :param cache: Cache of parsed responses; pass None to always call the model
+        """
+        self.cache = cache
+        # Model and chain are shared by all parsers and built on first use
+        self.prompt = get_prompt(TRANSCRIPT_PARSING_PROMPT)
+        self.chain = get_chain(
+            TRANSCRIPT_PARSING_PROMPT,
+            NewsExtractionOutput,
+            DEFAULT_MODEL_NAME,
+            DEFAULT_TEMPERATURE,
         )
-        self.prompt = PromptTemplate(
-            input_variables=["transcript_text"],
-            template=TRANSCRIPT_PARSING_PROMPT,
-        )
-        self.output_parser = PydanticOutputParser(pydantic_object=NewsExtractionOutput)
-
-        self.chain = self.prompt | self.llm | self.output_parser
 
     def run(self, transcript: Transcript):
         try:
-            response = self.chain.invoke({
-                "transcript_text": transcript.text
-            })
+            return self.parse(transcript)
 
-            news_list = []
-            for news_item in response.news_items:
-                news = News(
-                    **news_item.model_dump(),
-                    source_video_title=transcript.title,
-                    source_video_url=transcript.url,
-                    source_channel=transcript.channel_name
-                )
-                news_list.append(news)
+        except Exception as e:
+            logger.error(f"Error extracting news from transcript {transcript.video_id}: {e}")
+            return []
 
-            logger.debug(f"Extracted {len(news_list)} news items from transcript {transcript.video_id}")
-            return news_list
+    async def arun(self, transcript: Transcript):
+        """Async variant of `run`; LLM calls share the global concurrency budget."""
+        try:
+            return await self.aparse(transcript)
 
         except Exception as e:
             logger.error(f"Error extracting news from transcript {transcript.video_id}: {e}")
             return []
 
+    def parse(self, transcript: Transcript) -> list[News]:
+        """Like `run`, but raises on failure so an error is not mistaken for a transcript without news."""
+        if count_tokens(transcript.text, DEFAULT_MODEL_NAME) > CHUNKING_THRESHOLD_TOKENS:
+            response = self._extract_chunked(transcript)
+        else:
+            response = self._extract(transcript.text)
+        return self._to_news(transcript, response)
+
+    async def aparse(self, transcript: Transcript) -> list[News]:
+        if count_tokens(transcript.text, DEFAULT_MODEL_NAME) > CHUNKING_THRESHOLD_TOKENS:
+            response = await self._aextract_chunked(transcript)
+        else:
+            response = await self._aextract(transcript.text)
+        return self._to_news(transcript, response)
+
+    @staticmethod
+    def _to_news(transcript: Transcript, response: NewsExtractionOutput) -> list[News]:
+        news_list = []
+        for news_item in response.news_items:
+            news = News(
+                **news_item.model_dump(),
+                source_video_title=transcript.title,
+                source_video_url=transcript.url,
+                source_channel=transcript.channel_name
+            )
+            news_list.append(news)
+
+        logger.debug(f"Extracted {len(news_list)} news items from transcript {transcript.video_id}")
+        return news_list
+
+    def _extract(self, transcript_text: str) -> NewsExtractionOutput:
+        cache_key = self._cache_key(transcript_text)
+        if self.cache is not None:
+            response = self.cache.get(cache_key, NewsExtractionOutput)
+            if response is not None:
+                logger.debug("Using cached extraction")
+                return response
+
+        with llm_slot_sync(DEFAULT_MODEL_NAME, self._estimate_tokens(transcript_text)):
+            response = self.chain.invoke({
+                "transcript_text": transcript_text
+            })
+        self._store(cache_key, response)
+        return response
+
+    async def _aextract(self, transcript_text: str) -> NewsExtractionOutput:
+        cache_key = self._cache_key(transcript_text)
+        if self.cache is not None:
+            response = self.cache.get(cache_key, NewsExtractionOutput)
+            if response is not None:
+                logger.debug("Using cached extraction")
+                return response
+
+        async with llm_slot(DEFAULT_MODEL_NAME, self._estimate_tokens(transcript_text)):
+            response = await self.chain.ainvoke({
+                "transcript_text": transcript_text
+            })
+        self._store(cache_key, response)
+        return response
+
+    def _store(self, cache_key: str, response: NewsExtractionOutput) -> None:
+        if self.cache is None:
+            return
+        if is_repaired(response):
+            # A repaired response may have lost items, e.g. to the token limit; retry it on the next run
+            logger.debug("Not caching repaired extraction")
+            return
+        self.cache.set(cache_key, response)
+
+    def _extract_chunked(self, transcript: Transcript) -> NewsExtractionOutput:
+        """
+        Extract news from token-bounded chunks in parallel, then merge duplicates.
+        A failed chunk is logged and skipped instead of failing the whole transcript,
+        unless no other chunk yields news.
+        """
+        chunks = split_transcript(transcript, CHUNK_MAX_TOKENS, DEFAULT_MODEL_NAME)
+        logger.info(f"Extracting transcript {transcript.video_id} in {len(chunks)} chunks")
+
+        def extract_chunk(chunk: str) -> Optional[list[NewsItem]]:
+            try:
+                return self._extract(chunk).news_items
+            except Exception as e:
+                logger.warning(f"Error extracting news from a chunk of transcript {transcript.video_id}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(MAX_CHUNK_WORKERS, len(chunks))) as executor:
+            chunk_items = list(executor.map(extract_chunk, chunks))
+
+        return self._merge_chunks(transcript, chunk_items)
+
+    async def _aextract_chunked(self, transcript: Transcript) -> NewsExtractionOutput:
+        chunks = split_transcript(transcript, CHUNK_MAX_TOKENS, DEFAULT_MODEL_NAME)
+        logger.info(f"Extracting transcript {transcript.video_id} in {len(chunks)} chunks")
+
+        async def extract_chunk(chunk: str) -> Optional[list[NewsItem]]:
+            try:
+                return (await self._aextract(chunk)).news_items
+            except Exception as e:
+                logger.warning(f"Error extracting news from a chunk of transcript {transcript.video_id}: {e}")
+                return None
+
+        chunk_items = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks))
+        return self._merge_chunks(transcript, chunk_items)
+
+    @staticmethod
+    def _merge_chunks(transcript: Transcript, chunk_items: list[Optional[list[NewsItem]]]) -> NewsExtractionOutput:
+        """
+        Merge the items of all chunks, None for a failed chunk. Raises when chunks failed
+        and the others found nothing, as that does not show the transcript has no news.
+        """
+        items = [item for chunk in chunk_items if chunk is not None for item in chunk]
+        n_failed = sum(chunk is None for chunk in chunk_items)
+        if n_failed and not items:
+            raise RuntimeError(
+                f"Extraction failed for {n_failed} of {len(chunk_items)} chunks of transcript "
+                f"{transcript.video_id} and found no news in the others"
+            )
+        return NewsExtractionOutput(news_items=merge_news_items(items))
+
+    def _estimate_tokens(self, transcript_text: str) -> int:
+        return estimate_call_tokens(
+            self.prompt.format(transcript_text=transcript_text),
+            DEFAULT_MODEL_NAME,
+        )
+
+    @staticmethod
+    def _cache_key(transcript_text: str) -> str:
+        return LLMResponseCache.make_key(
+            TRANSCRIPT_PARSING_PROMPT,
+            DEFAULT_MODEL_NAME,
+            str(DEFAULT_TEMPERATURE),
+            json.dumps(NewsExtractionOutput.model_json_schema(), sort_keys=True),
+            transcript_text,
+        )
+
+
+def merge_news_items(items: list[NewsItem]) -> list[NewsItem]:
+    """
+    Merge news items describing the same story, e.g. extracted from overlapping chunks.
+
+    Items are considered duplicates when their titles have a word Jaccard
+    similarity of at least DUPLICATE_TITLE_SIMILARITY. The merged item keeps the
+    longer summary and content and the union of keywords and entities.
+
+    :param items: News items in transcript order
+    :return: Deduplicated news items, in order of first appearance
+    """
+    merged: list[NewsItem] = []
+    merged_title_words: list[set[str]] = []
+
+    for item in items:
+        title_words = set(WORD_RE.findall(item.title.lower()))
+        match_index = None
+        for index, words in enumerate(merged_title_words):
+            union = title_words | words
+            if union and len(title_words & words) / len(union) >= DUPLICATE_TITLE_SIMILARITY:
+                match_index = index
+                break
+
+        if match_index is None:
+            merged.append(item.model_copy(deep=True))
+            merged_title_words.append(title_words)
+            continue
+
+        existing = merged[match_index]
+        if len(item.summary) > len(existing.summary):
+            existing.summary = item.summary
+        if len(item.content) > len(existing.content):
+            existing.content = item.content
+        existing.keywords = list(dict.fromkeys(existing.keywords + item.keywords))
+        existing.entities = list(dict.fromkeys(existing.entities + item.entities))
+        existing.category = existing.category or item.category
+
+    return merged
+
 
 if __name__ == "__main__":
     from pathlib import Path
@@ -1,100 +1,289 @@
-import os
 import re
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import WebshareProxyConfig
+import time
+import requests
+from youtube_transcript_api import (
+    AgeRestricted,
+    InvalidVideoId,
+    NoTranscriptFound,
+    RequestBlocked,
+    TranscriptsDisabled,
+    VideoUnavailable,
+    VideoUnplayable,
+    YouTubeRequestFailed,
+)
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Iterable, Iterator, Generator
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import json
+import threading
 import scrapetube
 
 from src.utils.logger import logger
+from src.utils.rate_limiter import RateLimiter
+from src.utils.retrying import CircuitBreaker, backoff_delay
+from src.utils.tracing import span, Span
 from src.extracting.utils import Transcript
+from src.extracting.transcript_cache import TranscriptCache
+from src.extracting.channel_watermarks import ChannelWatermark, ChannelWatermarkStore
+from src.extracting.transcript_api import get_transcript_api, get_proxy_key
+from src.extracting.channel_feed import ChannelFeedClient, FEED_MAX_ENTRIES, get_channel_feed_client
+from src.extracting.fetch_recording import ReplayedFetchError, get_fetch_recorder
 
 
 DEFAULT_N_VIDEOS = 5
+# "rss" reads the channel feed only, "scrapetube" scrapes the channel listing,
+# "auto" reads the feed and continues with scrapetube when a scan goes deeper
+METADATA_SOURCES = ("auto", "rss", "scrapetube")
+DEFAULT_METADATA_SOURCE = "auto"
 LANGUAGES = ["en"]
 RELATIVE_TIME_RE = re.compile(
     r"(?P<value>\d+)\s+(?P<unit>second|minute|hour|day|week|month|year)s?\s+ago"
 )
+# Errors meaning the video has no usable transcript; safe to negative-cache
+TRANSCRIPT_UNAVAILABLE_ERRORS = (
+    NoTranscriptFound,
+    TranscriptsDisabled,
+    VideoUnavailable,
+    VideoUnplayable,
+    InvalidVideoId,
+    AgeRestricted,
+)
+# Errors caused by throttling or the network that are worth retrying
+RETRYABLE_FETCH_ERRORS = (
+    RequestBlocked,
+    YouTubeRequestFailed,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+FETCH_ERROR_UNAVAILABLE = "unavailable"
+FETCH_ERROR_RETRYABLE = "retryable"
+FETCH_ERROR_UNKNOWN = "unknown"
+
+MAX_FETCH_ATTEMPTS = 4
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+
+DEFAULT_GLOBAL_FETCH_CONCURRENCY = 16
+DEFAULT_PROXY_REQUESTS_PER_SECOND = 4.0
+DEFAULT_PROXY_BURST = 4
+
+# Shared by all fetchers in the process: caps in-flight transcript requests and
+# limits the request rate per proxy account
+_global_fetch_semaphore = threading.BoundedSemaphore(DEFAULT_GLOBAL_FETCH_CONCURRENCY)
+_proxy_rate_limiters: dict[str, RateLimiter] = {}
+_proxy_rate_limiters_lock = threading.Lock()
+_proxy_rate = (DEFAULT_PROXY_REQUESTS_PER_SECOND, DEFAULT_PROXY_BURST)
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+
+
+def configure_fetch_limits(
+    global_concurrency: int = DEFAULT_GLOBAL_FETCH_CONCURRENCY,
+    proxy_requests_per_second: float = DEFAULT_PROXY_REQUESTS_PER_SECOND,
+    proxy_burst: int = DEFAULT_PROXY_BURST,
+) -> None:
+    """
+    Set process-wide limits for transcript fetching. Call before fetchers start working.
+
+    :param global_concurrency: Maximum transcript requests in flight across all channels
+    :param proxy_requests_per_second: Sustained request rate allowed per proxy
+    :param proxy_burst: Number of requests a proxy may issue back to back
+    """
+    global _global_fetch_semaphore, _proxy_rate
+    _global_fetch_semaphore = threading.BoundedSemaphore(global_concurrency)
+    with _proxy_rate_limiters_lock:
+        _proxy_rate = (proxy_requests_per_second, proxy_burst)
+        _proxy_rate_limiters.clear()
+
+
+def _get_proxy_rate_limiter(proxy_key: str) -> RateLimiter:
+    with _proxy_rate_limiters_lock:
+        if proxy_key not in _proxy_rate_limiters:
+            rate, burst = _proxy_rate
+            _proxy_rate_limiters[proxy_key] = RateLimiter(rate, burst=burst)
+        return _proxy_rate_limiters[proxy_key]
+
+
+def _get_circuit_breaker(proxy_key: str) -> CircuitBreaker:
+    with _proxy_rate_limiters_lock:
+        if proxy_key not in _circuit_breakers:
+            _circuit_breakers[proxy_key] = CircuitBreaker(name=proxy_key)
+        return _circuit_breakers[proxy_key]
+
+
+def classify_fetch_error(error: Exception) -> str:
+    """
+    Classify a transcript fetch error.
+
+    :param error: Exception raised while fetching a transcript
+    :return: FETCH_ERROR_UNAVAILABLE if the video has no transcript, FETCH_ERROR_RETRYABLE
+        for throttling and network errors, FETCH_ERROR_UNKNOWN otherwise
+    """
+    if isinstance(error, ReplayedFetchError):
+        return error.kind
+    if isinstance(error, TRANSCRIPT_UNAVAILABLE_ERRORS):
+        return FETCH_ERROR_UNAVAILABLE
+    if isinstance(error, RETRYABLE_FETCH_ERRORS):
+        return FETCH_ERROR_RETRYABLE
+    return FETCH_ERROR_UNKNOWN
 
 
 class ChannelTranscriptsFetcher:
-    def __init__(self, channel_url: str):
+    def __init__(
+        self,
+        channel_url: str,
+        cache: Optional[TranscriptCache] = None,
+        watermarks: Optional[ChannelWatermarkStore] = None,
+        metadata_source: str = DEFAULT_METADATA_SOURCE,
+        feed_client: Optional[ChannelFeedClient] = None,
+    ):
+        if metadata_source not in METADATA_SOURCES:
+            raise ValueError(f"Unknown metadata source {metadata_source!r}, expected one of {METADATA_SOURCES}")
         self.channel_url = channel_url
-        self._transcript_api = YouTubeTranscriptApi(
-            proxy_config=WebshareProxyConfig(
-                proxy_username=os.getenv("WEBSHARE_PROXY_USERNAME"),
-                proxy_password=os.getenv("WEBSHARE_PROXY_PASSWORD"),
-            )
-        )
+        self.cache = cache
+        self.watermarks = watermarks
+        self.metadata_source = metadata_source
+        self._feed_client = feed_client
+        self._unavailable_video_ids: set[str] = set()
+        # Videos consumed by the last fetch, newest first, and whether each is settled:
+        # True if it needs no retry, False if it must be retried, None until its transcript is extracted
+        self._scanned: list[tuple[ChannelWatermark, Optional[bool]]] = []
+        self._recorder = get_fetch_recorder()
+        if self._recorder is None:
+            self._transcript_api = get_transcript_api()
+        elif self._recorder.mode == "replay":
+            self._transcript_api = self._recorder.wrap_transcript_api(None, classify_fetch_error)
+        else:
+            self._transcript_api = self._recorder.wrap_transcript_api(get_transcript_api(), classify_fetch_error)
+        self._rate_limiter = _get_proxy_rate_limiter(get_proxy_key())
+        self._circuit_breaker = _get_circuit_breaker(get_proxy_key())
 
     def fetch_transcripts(
         self,
         n_videos: Optional[int] = None,
         since_date: Optional[datetime] = None,
-        json_save_path: Optional[str] = None
+        json_save_path: Optional[str] = None,
+        max_workers: int = 1,
     ) -> List[Transcript]:
+        """
+        Fetch transcripts of the newest channel videos.
+
+        The channel's watermark is not moved here: call `advance_watermark` once
+        the returned transcripts are extracted, so failed ones are fetched again.
+
+        :param n_videos: Maximum number of transcripts to return
+        :param since_date: Only fetch videos published at or after this date
+        :param json_save_path: Optional path to save the transcripts as JSON
+        :param max_workers: Maximum transcript requests in flight for this channel
+        :return: Transcripts ordered newest first
+        """
         if n_videos is None and since_date is None:
             n_videos = DEFAULT_N_VIDEOS
 
-        # Determine how many videos to scan
+        # Upper bound on videos to scan; with since_date the scan usually stops much earlier
         scan_limit = n_videos if n_videos is not None else DEFAULT_N_VIDEOS
         if since_date is not None:
             scan_limit = max(scan_limit, 50)
             since_date = self._normalize_datetime(since_date)
 
-        videos = self._get_channel_videos(limit=scan_limit)
-        logger.debug(f"Retrieved {len(videos)} video metadata entries")
+        watermark = self.watermarks.get(self.channel_url) if self.watermarks is not None else None
+        # Lazy pipeline: channel pages are only requested while the loop below keeps pulling
+        videos = self._iter_video_metadata(limit=scan_limit)
+        candidates = self._filter_videos(
+            islice(videos, scan_limit),
+            since_date=since_date,
+            watermark=watermark,
+        )
 
         transcripts = []
         failed = 0
-        for video_data in videos:
-            video_metadata = self._parse_video_metadata(video_data)
-            video_id = video_metadata["video_id"]
-            published_at = video_metadata["published_at"]
+        cache_hits = 0
+        scanned: list[tuple[ChannelWatermark, Optional[bool]]] = []
+
+        # Requests run concurrently, but results are consumed strictly in listing order
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            pending = deque()
+            exhausted = False
+            while True:
+                # Never speculate past the number of transcripts still needed
+                window = max_workers if n_videos is None else min(max_workers, n_videos - len(transcripts))
+                while not exhausted and len(pending) < max(1, window):
+                    video_metadata = next(candidates, None)
+                    if video_metadata is None:
+                        exhausted = True
+                        break
+                    pending.append((video_metadata, executor.submit(self._get_transcript, video_metadata)))
+
+                if not pending:
+                    break
 
-            if not video_id:
-                logger.debug(f"Could not find video id, skipping to next metadata entry")
-                continue
-            if since_date is not None:
-                if published_at is None:
-                    logger.debug(
-                        "Missing publish date for %s; skipping due to since_date filter",
-                        video_metadata["title"],
-                    )
+                video_metadata, future = pending.popleft()
+                video_id = video_metadata["video_id"]
+                published_at = video_metadata["published_at"]
+                found, transcript = future.result()
+                if found:
+                    cache_hits += 1
+
+                watermark = ChannelWatermark(video_id=video_id, published_at=published_at)
+                if transcript is None:
+                    failed += 1
+                    # Videos without a transcript are settled, transient failures are retried
+                    scanned.append((watermark, found or video_id in self._unavailable_video_ids))
                     continue
-                if published_at < since_date:
-                    logger.debug(
-                        "Reached videos older than since_date (%s); stopping scan",
-                        since_date.isoformat(),
-                    )
-                    break
 
-            logger.debug("Fetching transcript for video %s", video_metadata["title"])
-            transcript_text = self._fetch_transcript_for_video(video_id)
+                scanned.append((watermark, None))
+                transcript.title = video_metadata["title"]
+                transcript.publish_date = published_at
+                # Per-channel state (boilerplate tables, newsworthiness, source credits) is keyed by it
+                transcript.channel_name = self.channel_url
+                transcripts.append(transcript)
 
-            if transcript_text is None:
-                failed += 1
-                continue
+                if n_videos and len(transcripts) >= n_videos:
+                    break
 
-            transcript = Transcript(
-                video_id=video_id,
-                title=video_metadata["title"],
-                text=transcript_text or "",
-                publish_date=published_at,
-            )
-            transcripts.append(transcript)
+            for _, future in pending:
+                future.cancel()
+        candidates.close()
+        videos.close()
 
-            if n_videos and len(transcripts) >= n_videos:
-                break
+        logger.info(
+            "Successfully fetched %s transcripts (%s from cache), %s failed attempts",
+            len(transcripts),
+            cache_hits,
+            failed,
+        )
 
-        logger.info("Successfully fetched %s transcripts, %s failed attempts", len(transcripts), failed)
+        self._scanned = scanned
 
         if json_save_path is not None:
             self._save_transcripts_to_json(transcripts, json_save_path)
 
         return transcripts
 
+    def advance_watermark(self, settled_video_ids: Iterable[str]) -> None:
+        """
+        Move the channel's watermark to the newest video of the last fetch that is
+        older than every video still to be retried.
+
+        :param settled_video_ids: Fetched transcripts that need no retry, i.e. were
+            extracted or deliberately skipped; the others are fetched again next run
+        """
+        if self.watermarks is None:
+            return
+        settled_video_ids = set(settled_video_ids)
+        new_watermark: Optional[ChannelWatermark] = None
+        for watermark, settled in self._scanned:
+            if settled is None:
+                settled = watermark.video_id in settled_video_ids
+            if not settled:
+                new_watermark = None
+            elif new_watermark is None:
+                new_watermark = watermark
+        if new_watermark is not None:
+            self.watermarks.update(self.channel_url, new_watermark)
+        self._scanned = []
+
     def _save_transcripts_to_json(self, transcripts: List[Transcript], path: str) -> None:
         """
         Save transcripts to a JSON file.
@@ -114,26 +303,115 @@ class ChannelTranscriptsFetcher:
 
         logger.info(f"Saved {len(transcripts)} transcripts to {path}")
 
-    def _get_channel_videos(self, limit: Optional[int] = None) -> List[dict]:
+    def _iter_video_metadata(self, limit: Optional[int] = None) -> Iterator[dict]:
+        """
+        Lazily yield parsed video metadata, newest first, from the configured source.
+
+        In "auto" mode the feed is read first and scrapetube is only touched
+        when the consumer keeps pulling past a full feed, or when the feed fails.
+
+        :param limit: Maximum number of videos to request from scrapetube
+        :return: Iterator over parsed video metadata
+        """
+        feed_videos = None
+        if self.metadata_source != "scrapetube":
+            feed_client = self._feed_client or get_channel_feed_client()
+            feed_videos = feed_client.get_latest_videos(self.channel_url)
+
+        seen_video_ids = set()
+        if feed_videos is not None:
+            for video_metadata in feed_videos:
+                seen_video_ids.add(video_metadata["video_id"])
+                if not video_metadata["is_short"]:
+                    yield video_metadata
+            if self.metadata_source == "rss" or len(feed_videos) < FEED_MAX_ENTRIES:
+                return
+            logger.debug("Scanned past the channel feed; continuing with scrapetube")
+        elif self.metadata_source == "rss":
+            return
+
+        videos = self._get_channel_videos(limit=limit)
+        try:
+            for video_data in videos:
+                video_metadata = self._parse_video_metadata(video_data)
+                if video_metadata["video_id"] not in seen_video_ids:
+                    yield video_metadata
+        finally:
+            videos.close()
+
+    def _get_channel_videos(self, limit: Optional[int] = None) -> Iterator[dict]:
         """
-        Fetch video metadata from the channel.
+        Lazily yield video metadata from the channel, newest first.
 
-        :param limit: Maximum number of videos to fetch
-        :return: List of video metadata dictionaries
+        Scrapetube requests the next page only when the current one is exhausted,
+        so closing this generator early also stops pagination.
+
+        :param limit: Maximum number of videos to yield
+        :return: Iterator over video metadata dictionaries
         """
-        videos = []
-        video_generator = scrapetube.get_channel(
+        get_channel = self._recorder.get_channel if self._recorder is not None else scrapetube.get_channel
+        video_generator = get_channel(
             channel_url=self.channel_url,
             limit=limit,
             sort_by="newest"
         )
 
+        n_yielded = 0
         for video in video_generator:
-            videos.append(video)
-            if limit and len(videos) >= limit:
+            yield video
+            n_yielded += 1
+            if limit and n_yielded >= limit:
                 break
 
-        return videos
+        logger.debug(f"Scanned {n_yielded} video metadata entries")
+
+    def _filter_videos(
+        self,
+        videos: Iterable[dict],
+        since_date: Optional[datetime] = None,
+        watermark: Optional[ChannelWatermark] = None,
+    ) -> Generator[dict, None, None]:
+        """
+        Yield parsed video metadata that should be processed, stopping at the first
+        video older than `since_date` or the channel watermark.
+
+        :param videos: Parsed video metadata, newest first
+        :param since_date: Only videos published at or after this date are yielded
+        :param watermark: Last processed video of the channel
+        :return: Generator over parsed video metadata
+        """
+        for video_metadata in videos:
+            published_at = video_metadata["published_at"]
+
+            if not video_metadata["video_id"]:
+                logger.debug(f"Could not find video id, skipping to next metadata entry")
+                continue
+            if watermark is not None and video_metadata["video_id"] == watermark.video_id:
+                logger.debug("Reached watermark video %s; stopping scan", watermark.video_id)
+                return
+            if since_date is not None:
+                if published_at is None:
+                    logger.debug(
+                        "Missing publish date for %s; skipping due to since_date filter",
+                        video_metadata["title"],
+                    )
+                    continue
+                if published_at < since_date:
+                    logger.debug(
+                        "Reached videos older than since_date (%s); stopping scan",
+                        since_date.isoformat(),
+                    )
+                    return
+            if (
+                watermark is not None
+                and watermark.published_at is not None
+                and published_at is not None
+                and published_at < watermark.published_at
+            ):
+                logger.debug("Reached videos older than the channel watermark; stopping scan")
+                return
+
+            yield video_metadata
 
     def _parse_video_metadata(self, video_data: dict) -> dict:
         """
@@ -205,21 +483,98 @@ class ChannelTranscriptsFetcher:
 
         return datetime.now() - delta
 
-    def _fetch_transcript_for_video(self, video_id: str) -> Optional[str]:
+    def _get_transcript(self, video_metadata: dict) -> tuple[bool, Optional[Transcript]]:
+        """
+        Get a transcript from the cache, falling back to the network.
+
+        :param video_metadata: Parsed video metadata
+        :return: Tuple of (served from cache, transcript or None if unavailable)
         """
-        Fetch transcript text for a single video.
+        found, transcript = self._get_cached_transcript(video_metadata["video_id"])
+        if found:
+            return True, transcript
+
+        logger.debug("Fetching transcript for video %s", video_metadata["title"])
+        return False, self._fetch_transcript_for_video(video_metadata["video_id"])
+
+    def _get_cached_transcript(self, video_id: str) -> tuple[bool, Optional[Transcript]]:
+        """
+        Look up a transcript in the local cache without touching the network.
 
         :param video_id: YouTube video ID
-        :return: Transcript text or None if unavailable
+        :return: Tuple of (found, transcript); the transcript is None for known-unavailable videos
         """
-        try:
-            transcript_data = self._transcript_api.fetch(video_id, languages=LANGUAGES)
-            text = " ".join(entry.text for entry in transcript_data)
+        if self.cache is None:
+            return False, None
+
+        found, transcript = self.cache.get(video_id, LANGUAGES)
+        if found:
+            logger.debug(
+                "Cache hit for video %s%s", video_id, "" if transcript is not None else " (no transcript)"
+            )
+        return found, transcript
+
+    def _fetch_transcript_for_video(self, video_id: str) -> Optional[Transcript]:
+        """
+        Fetch the transcript of a single video, keeping segment timings.
+
+        :param video_id: YouTube video ID
+        :return: Transcript without title and publish date, or None if unavailable
+        """
+        with span("http.transcript") as fetch_span:
+            return self._fetch_with_retries(video_id, fetch_span)
+
+    def _fetch_with_retries(self, video_id: str, fetch_span: Span) -> Optional[Transcript]:
+        for attempt in range(MAX_FETCH_ATTEMPTS):
+            if attempt:
+                fetch_span.add("retries", 1)
+            fetch_span.add("queue_wait_seconds", self._circuit_breaker.wait_until_closed())
+            try:
+                queued_at = time.monotonic()
+                with _global_fetch_semaphore:
+                    self._rate_limiter.acquire()
+                    fetch_span.add("queue_wait_seconds", time.monotonic() - queued_at)
+                    transcript_data = self._transcript_api.fetch(video_id, languages=LANGUAGES)
+                transcript = Transcript.from_segments(
+                    video_id=video_id,
+                    title="",
+                    segments=((entry.text, entry.start) for entry in transcript_data),
+                )
+            except Exception as e:
+                error_kind = classify_fetch_error(e)
+                if error_kind == FETCH_ERROR_UNAVAILABLE:
+                    # YouTube answered; only this video is affected
+                    self._circuit_breaker.record_success()
+                    logger.warning(f"No transcript available for {video_id}: {type(e).__name__}")
+                    self._unavailable_video_ids.add(video_id)
+                    if self.cache is not None:
+                        self.cache.set_unavailable(video_id, LANGUAGES)
+                    return None
+                if error_kind == FETCH_ERROR_UNKNOWN:
+                    self._circuit_breaker.record_success()
+                    logger.warning(f"Could not fetch transcript for {video_id}: {e}")
+                    return None
+
+                self._circuit_breaker.record_failure()
+                if attempt + 1 >= MAX_FETCH_ATTEMPTS:
+                    logger.warning(
+                        f"Could not fetch transcript for {video_id} after {MAX_FETCH_ATTEMPTS} attempts: {e}"
+                    )
+                    return None
+                delay = backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY)
+                logger.debug(
+                    f"Retryable error for {video_id} ({type(e).__name__}), retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+
+            self._circuit_breaker.record_success()
             logger.debug(f"Successfully fetched transcript for video {video_id}")
-            return text.strip()
-        except Exception as e:
-            logger.warning(f"Could not fetch transcript for {video_id}: {e}")
-            return None
+            break
+
+        if self.cache is not None:
+            self.cache.set(transcript, LANGUAGES)
+        return transcript
 
 
 if __name__ == "__main__":
@@ -230,5 +585,5 @@ if __name__ == "__main__":
     repo_root = get_repo_root(Path(__file__))
     load_dotenv(repo_root / ".env")
 
-    fetcher = ChannelTranscriptsFetcher("https://www.youtube.com/@GoodTimesBadTimes")
+    fetcher = ChannelTranscriptsFetcher("https://www.youtube.com/@GoodTimesBadTimes", cache=TranscriptCache())
     fetcher.fetch_transcripts(n_videos=10, json_save_path="transcripts.json")
\ No newline at end of file
@@ -1,25 +1,157 @@
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence
 import json
+import struct
+import sys
 
-from src.utils import logger
+from src.utils.logger import logger
 
 
-@dataclass
 class Transcript:
     """
     Represents a YouTube video transcript with metadata.
+
+    The text is kept in a single string buffer, and segment boundaries and
+    start times are kept in compact arrays. This lets later stages slice the
+    transcript by segment without re-joining strings.
     """
-    video_id: str
-    title: str
-    text: str
-    channel_name: str = ""
-    publish_date: Optional[datetime] = None
-    url: str = field(init=False)
+    __slots__ = (
+        "video_id",
+        "title",
+        "channel_name",
+        "publish_date",
+        "url",
+        "_text",
+        "_offsets",
+        "_starts",
+    )
+
+    def __init__(
+        self,
+        video_id: str,
+        title: str,
+        text: str = "",
+        channel_name: str = "",
+        publish_date: Optional[datetime] = None,
+        segment_offsets: Optional[Sequence[int]] = None,
+        segment_starts: Optional[Sequence[float]] = None,
+    ):
+        """
+        :param segment_offsets: Character offset of each segment in `text`, plus a final
+            end offset; without it the whole text is a single segment
+        :param segment_starts: Start time in seconds of each segment
+        """
+        self.video_id = video_id
+        self.title = title
+        self.channel_name = channel_name
+        self.publish_date = publish_date
+        self.url = f"https://www.youtube.com/watch?v={video_id}"
+        self._text = text
+
+        if segment_offsets is None:
+            segment_offsets = [0, len(text)] if text else [0]
+            segment_starts = [0.0] if text else []
+        self._offsets = array("I", segment_offsets)
+        self._starts = array("f", segment_starts or [])
+        if len(self._offsets) != len(self._starts) + 1:
+            raise ValueError("segment_offsets must have exactly one more entry than segment_starts")
+
+    @classmethod
+    def from_segments(
+        cls,
+        video_id: str,
+        title: str,
+        segments: Iterable[tuple[str, float]],
+        channel_name: str = "",
+        publish_date: Optional[datetime] = None,
+    ) -> "Transcript":
+        """
+        Build a transcript from (text, start time) segments, joined with single spaces.
+
+        :param segments: Iterable of (segment text, start time in seconds)
+        :return: Transcript object
+        """
+        parts = []
+        offsets = array("I")
+        starts = array("f")
+        position = 0
+        for segment_text, start in segments:
+            segment_text = segment_text.strip()
+            if not segment_text:
+                continue
+            if parts:
+                position += 1
+            offsets.append(position)
+            starts.append(start)
+            parts.append(segment_text)
+            position += len(segment_text)
+        offsets.append(position)
+
+        return cls(
+            video_id=video_id,
+            title=title,
+            text=" ".join(parts),
+            channel_name=channel_name,
+            publish_date=publish_date,
+            segment_offsets=offsets,
+            segment_starts=starts,
+        )
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def n_segments(self) -> int:
+        return len(self._starts)
 
-    def __post_init__(self):
-        self.url = f"https://www.youtube.com/watch?v={self.video_id}"
+    def segment_start(self, index: int) -> float:
+        return self._starts[index]
+
+    def slice_text(self, start_segment: int, end_segment: Optional[int] = None) -> str:
+        """
+        Text of segments [start_segment, end_segment) without re-joining strings.
+
+        :param start_segment: Index of the first segment
+        :param end_segment: Index after the last segment, defaults to the end
+        :return: Text of the segment range
+        """
+        if end_segment is None:
+            end_segment = self.n_segments
+        return self.text[self._offsets[start_segment]:self._offsets[end_segment]].strip()
+
+    def iter_segments(self) -> Iterator[tuple[str, float]]:
+        """Yield (segment text, start time in seconds) pairs."""
+        for index in range(self.n_segments):
+            yield self.slice_text(index, index + 1), self._starts[index]
+
+    def body_to_bytes(self) -> bytes:
+        """Encode text and segments (without metadata) into a compact binary form."""
+        return (
+            struct.pack("<I", self.n_segments)
+            + _array_to_le_bytes(self._offsets)
+            + _array_to_le_bytes(self._starts)
+            + self.text.encode("utf-8")
+        )
+
+    @classmethod
+    def from_body_bytes(cls, data, video_id: str, title: str = "", **metadata) -> "Transcript":
+        """
+        Decode text and segments produced by `body_to_bytes`.
+
+        :param data: Bytes produced by `body_to_bytes`
+        :return: Transcript object
+        """
+        transcript = cls(video_id=video_id, title=title, **metadata)
+        n_segments, = struct.unpack_from("<I", data, 0)
+        offsets_end = 4 + 4 * (n_segments + 1)
+        starts_end = offsets_end + 4 * n_segments
+        transcript._offsets = _array_from_le_bytes("I", data[4:offsets_end])
+        transcript._starts = _array_from_le_bytes("f", data[offsets_end:starts_end])
+        transcript._text = bytes(data[starts_end:]).decode("utf-8")
+        return transcript
 
     def __str__(self) -> str:
         return f"Transcript(video_id={self.video_id}, title={self.title[:50]}...)"
@@ -39,6 +171,22 @@ class Transcript:
         }
 
 
+def _array_to_le_bytes(values: array) -> bytes:
+    if sys.byteorder == "little":
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _array_from_le_bytes(typecode: str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
 @dataclass
 class News:
     """
@@ -53,6 +201,9 @@ class News:
     source_video_title: str = ""
     source_video_url: str = ""
     source_channel: str = ""
+    # Near-duplicate copies of the source video (re-uploads, clips, cross-posts) that were not extracted
+    duplicate_video_urls: List[str] = field(default_factory=list)
+    duplicate_channels: List[str] = field(default_factory=list)
     extracted_at: datetime = field(default_factory=datetime.now)
 
     def __str__(self) -> str:
@@ -73,6 +224,8 @@ class News:
             "source_video_title": self.source_video_title,
             "source_video_url": self.source_video_url,
             "source_channel": self.source_channel,
+            "duplicate_video_urls": self.duplicate_video_urls,
+            "duplicate_channels": self.duplicate_channels,
             "extracted_at": self.extracted_at.isoformat(),
         }
 
@@ -122,4 +275,4 @@ def save_news_to_json(news_list: List[News], path: str) -> None:
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-    logger.info(f"Saved {len(news_list)} news items to {path}")
\ No newline at end of file
+    logger.info(f"Saved {len(news_list)} news items to {path}")
@@ -1,18 +1,17 @@
-import os
+import asyncio
 
-import pandas as pd
 import pydantic
 from pydantic import BaseModel
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 
 from src.generating.utils import GeneratedNews
 from src.generating.prompts import POST_GENERATING_PROMPT
+from src.processing.news_batch import NewsBatch
 from src.utils.logger import logger
+from src.utils.tokens import estimate_call_tokens
+from src.utils.llm_factory import get_chain, get_prompt
+from src.utils.llm_concurrency import llm_slot, llm_slot_sync
 
 
-DEFAULT_DF_COLUMNS = ["title", "content", "keywords", "source_channel", "source_video_url", "category"]
 DEFAULT_TEMPERATURE = 0.5
 DEFAULT_MODEL_NAME = "gpt-4o-mini"
 
@@ -24,22 +23,32 @@ class GeneratedNewsItem(BaseModel):
 
 class NewsGenerator:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=DEFAULT_MODEL_NAME,
-            temperature=DEFAULT_TEMPERATURE,
-            api_key=os.environ.get("OPENAI_API_KEY"),
+        self.prompt = get_prompt(POST_GENERATING_PROMPT)
+        self.chain = get_chain(
+            POST_GENERATING_PROMPT,
+            GeneratedNewsItem,
+            DEFAULT_MODEL_NAME,
+            DEFAULT_TEMPERATURE,
         )
-        self.prompt = PromptTemplate(
-            input_variables=["news_list"],
-            template=POST_GENERATING_PROMPT,
-        )
-        self.output_parser = PydanticOutputParser(pydantic_object=GeneratedNewsItem)
-
-        self.chain = self.prompt | self.llm | self.output_parser
 
     def generate(self, text: str):
         try:
-            response = self.chain.invoke({"news_list": text})
+            with llm_slot_sync(DEFAULT_MODEL_NAME, self._estimate_tokens(text)):
+                response = self.chain.invoke({"news_list": text})
+            news_content = response
+
+            logger.debug(f"News generated: {news_content}")
+            return news_content
+
+        except Exception as e:
+            logger.error(f"Error during news generation: {e}")
+            return None
+
+    async def agenerate(self, text: str):
+        """Async variant of `generate`; the call shares the global LLM concurrency budget."""
+        try:
+            async with llm_slot(DEFAULT_MODEL_NAME, self._estimate_tokens(text)):
+                response = await self.chain.ainvoke({"news_list": text})
             news_content = response
 
             logger.debug(f"News generated: {news_content}")
@@ -47,43 +56,68 @@ class NewsGenerator:
 
         except Exception as e:
             logger.error(f"Error during news generation: {e}")
-            return []
+            return None
+
+    def _estimate_tokens(self, text: str) -> int:
+        return estimate_call_tokens(self.prompt.format(news_list=text), DEFAULT_MODEL_NAME)
 
-    def generate_from_df(self, df: pd.DataFrame):
-        prompts, metadata = self._process_df(df)
+    def generate_from_batch(self, batch: NewsBatch):
+        prompts, metadata = self._process_batch(batch)
         generated_news = []
         for prompt, meta in zip(prompts, metadata):
             news = self.generate(prompt)
-            generated_news.append(GeneratedNews(
-                title=news.title,
-                content=news.content,
-                source_video_urls=meta["source_video_urls"],
-                source_channels=meta["source_channels"],
-            ))
+            # A failed cluster is skipped, the others are still published
+            if news is not None:
+                generated_news.append(self._to_generated_news(news, meta))
         return generated_news
 
-    def _process_df(self, df: pd.DataFrame):
+    async def agenerate_from_batch(self, batch: NewsBatch):
+        prompts, metadata = self._process_batch(batch)
+        responses = await asyncio.gather(*(self.agenerate(prompt) for prompt in prompts))
+        return [
+            self._to_generated_news(news, meta)
+            for news, meta in zip(responses, metadata)
+            if news is not None
+        ]
+
+    @staticmethod
+    def _to_generated_news(news: GeneratedNewsItem, meta: dict) -> GeneratedNews:
+        return GeneratedNews(
+            title=news.title,
+            content=news.content,
+            source_video_urls=meta["source_video_urls"],
+            source_channels=meta["source_channels"],
+            cluster=meta["cluster"],
+        )
+
+    def _process_batch(self, batch: NewsBatch):
         news_prompts = []
         metadata = []
-        for cluster_idx in df["cluster"].unique():
-            df_subset = df[df["cluster"] == cluster_idx][DEFAULT_DF_COLUMNS]
+        for cluster_idx, rows in batch.cluster_rows.items():
+            keywords = list(dict.fromkeys(
+                keyword for item_keywords in batch["keywords"][rows] for keyword in item_keywords
+            ))
+            categories = list(dict.fromkeys(batch["category"][rows]))
 
             news_cluster_prompt = f"""
             ### NEWS CLUSTER
-            keywords: {list(df_subset['keywords'].explode().unique())}
-            category: {list(df_subset['category'].explode().unique())}
+            keywords: {keywords}
+            category: {categories}
             """
-            for row in df_subset.itertuples():
+            for title, content in zip(batch["title"][rows], batch["content"][rows]):
                 news_cluster_prompt += f"""
                 - NEWS
-                {row.title}
-                {row.content}
+                {title}
+                {content}
                 """
 
             news_prompts.append(news_cluster_prompt)
+            # Near-duplicate copies collapsed before extraction are credited as sources too
+            video_urls, channels = batch.sources(rows)
             metadata.append({
-                "source_video_urls": [list(df_subset["source_video_url"].unique())],
-                "source_channels": [list(df_subset["source_channel"].unique())],
+                "cluster": cluster_idx,
+                "source_video_urls": [video_urls],
+                "source_channels": [channels],
             })
 
         return news_prompts, metadata
\ No newline at end of file
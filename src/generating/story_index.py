@@ -0,0 +1,211 @@
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from src.utils.logger import logger
+
+
+# Minimum cosine similarity between a cluster centroid and a published story to treat them as one story
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+# Stories older than this are no longer matched; a story returning after that is news again
+DEFAULT_STORY_TTL = timedelta(days=14)
+
+
+class VectorIndex(ABC):
+    """
+    Nearest-neighbour index of unit vectors under integer keys.
+
+    `StoryIndex` only uses this interface, so an approximate index can replace the
+    exact `NumpyVectorIndex` once the collection outgrows a brute-force search.
+    """
+
+    @abstractmethod
+    def add(self, keys: list[int], vectors: np.ndarray) -> None:
+        """Add or replace the vectors stored under `keys`."""
+
+    @abstractmethod
+    def remove(self, keys: list[int]) -> None:
+        """Remove the vectors stored under `keys`, ignoring unknown keys."""
+
+    @abstractmethod
+    def search(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest stored vector of each query vector.
+
+        :return: Key and cosine similarity of the nearest vector per query, key -1 if the index is empty
+        """
+
+    @abstractmethod
+    def save(self) -> None:
+        """Persist the index."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class NumpyVectorIndex(VectorIndex):
+    """
+    Exact search over all stored vectors with one matrix product, kept in a .npz file.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        if self.path.exists():
+            with np.load(self.path) as data:
+                self.keys = data["keys"]
+                self.vectors = data["vectors"].astype(np.float32)
+
+    def add(self, keys: list[int], vectors: np.ndarray) -> None:
+        if not keys:
+            return
+        self.remove(keys)
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self.vectors = np.vstack([self.vectors, vectors]) if len(self.keys) else vectors
+        self.keys = np.concatenate([self.keys, np.asarray(keys, dtype=np.int64)])
+
+    def remove(self, keys: list[int]) -> None:
+        keep = ~np.isin(self.keys, keys)
+        self.keys = self.keys[keep]
+        self.vectors = self.vectors[keep] if len(self.vectors) else self.vectors
+
+    def search(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if not len(self.keys) or not len(vectors):
+            return np.full(len(vectors), -1, dtype=np.int64), np.zeros(len(vectors), dtype=np.float32)
+        similarities = _normalize(np.asarray(vectors, dtype=np.float32)) @ self.vectors.T
+        best = similarities.argmax(axis=1)
+        return self.keys[best], similarities[np.arange(len(vectors)), best]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, keys=self.keys, vectors=self.vectors.astype(np.float16))
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+@dataclass
+class PublishedStory:
+    row_id: int
+    title: str
+    source_video_urls: list[str]
+    source_channels: list[str]
+    created_at: float
+    # Persistent story id of the incremental clustering, None if clustered per run
+    story_id: Optional[int] = None
+
+
+class StoryIndex:
+    """
+    Stories already generated for a Grist table, keyed by their row id, with the
+    centroid embedding of the news items each one was generated from.
+
+    Clusters continuing a story with a persistent id are matched to the post of
+    that story, others by their centroid embedding, before generation, so a story
+    that was already posted, or is waiting for approval, is not generated and
+    uploaded again.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        vector_index: Optional[VectorIndex] = None,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        ttl: timedelta = DEFAULT_STORY_TTL,
+    ):
+        """
+        :param path: Directory of the persisted index
+        :param vector_index: Index of the centroids, defaults to an exact NumPy index in `path`
+        :param similarity_threshold: Minimum cosine similarity of a match
+        :param ttl: How long a story is matched after it was generated
+        """
+        self.path = Path(path)
+        self.vector_index = vector_index or NumpyVectorIndex(self.path / "vectors.npz")
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl.total_seconds()
+        self.stories: dict[int, PublishedStory] = {}
+        # Latest post of each persistent story id
+        self.story_posts: dict[int, PublishedStory] = {}
+
+        stories_path = self.path / "stories.json"
+        if stories_path.exists():
+            with open(stories_path, "r", encoding="utf-8") as f:
+                self.stories = {story["row_id"]: PublishedStory(**story) for story in json.load(f)}
+        self._expire()
+        for story in sorted(self.stories.values(), key=lambda story: story.created_at):
+            if story.story_id is not None:
+                self.story_posts[story.story_id] = story
+
+    def match(
+        self,
+        centroids: np.ndarray,
+        story_ids: Optional[list[Optional[int]]] = None,
+    ) -> list[Optional[PublishedStory]]:
+        """
+        :param centroids: Centroid embedding per cluster
+        :param story_ids: Persistent story id per cluster continuing a known story, None for the others
+        :return: Published story of the same event per cluster, None if the cluster is a new story
+        """
+        keys, similarities = self.vector_index.search(centroids)
+        matches = []
+        for i, (key, similarity) in enumerate(zip(keys.tolist(), similarities.tolist())):
+            story = self.story_posts.get(story_ids[i]) if story_ids and story_ids[i] is not None else None
+            if story is not None:
+                logger.info(f"Cluster continues published story {story.row_id} {story.title!r}")
+            elif similarity >= self.similarity_threshold and key in self.stories:
+                story = self.stories[key]
+                logger.info(f"Cluster matches published story {story.row_id} {story.title!r} ({similarity:.2f})")
+            matches.append(story)
+        return matches
+
+    def add(self, story: PublishedStory, centroid: np.ndarray) -> None:
+        self.stories[story.row_id] = story
+        if story.story_id is not None:
+            self.story_posts[story.story_id] = story
+        self.vector_index.add([story.row_id], centroid[np.newaxis])
+
+    def merge_sources(self, story: PublishedStory, video_urls: list[str], channels: list[str]) -> bool:
+        """
+        Credit new sources of an already published story.
+
+        :return: Whether the story gained sources
+        """
+        merged_urls = list(dict.fromkeys(story.source_video_urls + video_urls))
+        merged_channels = list(dict.fromkeys(story.source_channels + channels))
+        changed = merged_urls != story.source_video_urls or merged_channels != story.source_channels
+        story.source_video_urls, story.source_channels = merged_urls, merged_channels
+        return changed
+
+    def save(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vector_index.save()
+        tmp_path = self.path / "stories.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(story) for story in self.stories.values()], f, ensure_ascii=False)
+        os.replace(tmp_path, self.path / "stories.json")
+
+    def __len__(self) -> int:
+        return len(self.stories)
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [row_id for row_id, story in self.stories.items() if story.created_at < cutoff]
+        for row_id in expired:
+            del self.stories[row_id]
+        self.vector_index.remove(expired)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -6,4 +7,6 @@ class GeneratedNews:
     title: str
     content: str
     source_video_urls: list[str]
-    source_channels: list[str]
\ No newline at end of file
+    source_channels: list[str]
+    # Cluster label of the news items the post was generated from
+    cluster: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,95 @@
+import argparse
+import json
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from src.extracting.fetch_recording import configure_fetch_recording, FETCH_MODES
+from src.extracting.transcripts_fetcher import ChannelTranscriptsFetcher, configure_fetch_limits
+from src.utils.logger import logger
+from src.utils.path_utils import get_repo_root
+
+
+REPO_ROOT = get_repo_root(Path(__file__))
+DEFAULT_CONFIG_PATH = REPO_ROOT / "configs" / "naglobalnie_config.json"
+
+
+def run_channel(channel_url: str, args: argparse.Namespace) -> dict:
+    since_date = datetime.now() - timedelta(hours=args.since_hours) if args.since_hours else None
+    started = time.perf_counter()
+
+    if args.extract:
+        from src.extracting.simple_news_extractor import SimpleNewsExtractor
+
+        extractor = SimpleNewsExtractor(channel_url)
+        items = extractor.run(n_videos=args.n_videos, since_date=since_date, fetch_workers=args.fetch_workers)
+    else:
+        fetcher = ChannelTranscriptsFetcher(channel_url)
+        items = fetcher.fetch_transcripts(
+            n_videos=args.n_videos,
+            since_date=since_date,
+            max_workers=args.fetch_workers,
+        )
+
+    return {
+        "channel_url": channel_url,
+        "items": len(items),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark channel fetching (and optionally extraction) against recorded YouTube responses."
+    )
+    parser.add_argument("--config", default=str(DEFAULT_CONFIG_PATH))
+    parser.add_argument("--mode", choices=FETCH_MODES, default="replay")
+    parser.add_argument("--fixtures-dir", default=None)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated latency per request in seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--n-videos", type=int, default=None)
+    parser.add_argument("--since-hours", type=float, default=None)
+    parser.add_argument("--channel-workers", type=int, default=8)
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--global-concurrency", type=int, default=16)
+    parser.add_argument("--extract", action="store_true", help="Also run LLM extraction (needs OpenAI access)")
+    args = parser.parse_args()
+
+    configure_fetch_recording(
+        mode=args.mode,
+        fixtures_dir=args.fixtures_dir,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    configure_fetch_limits(global_concurrency=args.global_concurrency)
+
+    with open(args.config, "r") as f:
+        channels = json.load(f)["source_channels"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.channel_workers) as executor:
+        results = list(executor.map(lambda url: run_channel(url, args), channels))
+    total_seconds = time.perf_counter() - started
+
+    report = {
+        "mode": args.mode,
+        "channels": len(channels),
+        "items": sum(r["items"] for r in results),
+        "total_seconds": round(total_seconds, 3),
+        "slowest_channel_seconds": max((r["seconds"] for r in results), default=0.0),
+        "per_channel": results,
+    }
+    logger.info("Benchmark finished in %.2fs", total_seconds)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv(REPO_ROOT / ".env")
+    main()
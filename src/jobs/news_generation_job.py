@@ -1,63 +1,206 @@
 import os
 import json
+import time
+import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Optional, Union
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import numpy as np
+
 from src.extracting.simple_news_extractor import SimpleNewsExtractor
-from src.processing.clustering import NewsClusteringEngine
+from src.extracting.transcript_cache import TranscriptCache
+from src.extracting.transcripts_fetcher import configure_fetch_limits, DEFAULT_METADATA_SOURCE
+from src.extracting.transcript_api import configure_transcript_api
+from src.extracting.channel_watermarks import ChannelWatermarkStore
+from src.extracting.newsworthiness import NewsworthinessFilter, DEFAULT_MODE, DEFAULT_THRESHOLD
+from src.extracting.boilerplate import BoilerplateStripper
+from src.extracting.near_duplicates import DeduplicationResult, NearDuplicateIndex
+from src.extracting.utils import News, Transcript
+from src.processing.clustering import NewsClusteringEngine, DEFAULT_EMBEDDING_MODEL
+from src.processing.embedding_store import EmbeddingStore
+from src.processing.incremental_clustering import IncrementalClusterer, NOISE
+from src.processing.news_batch import NewsBatch
 from src.generating.news_generator import NewsGenerator
+from src.generating.story_index import StoryIndex, PublishedStory
+from src.generating.utils import GeneratedNews
 from src.utils.logger import logger
-from src.utils.path_utils import get_repo_root
+from src.utils.llm_cache import LLMResponseCache
+from src.utils.llm_factory import configure_llm_clients
+from src.utils.llm_concurrency import (
+    configure_llm_concurrency,
+    configure_llm_rate_limit,
+    get_llm_rate_limit_stats,
+    DEFAULT_LLM_CONCURRENCY,
+)
+from src.utils.path_utils import get_repo_root, get_cache_dir
 from src.utils.grist_client import GristClient
+from src.utils.tracing import span, write_run_report
 from src.analyzing.news_analyzer import NewsAnalyzer
 
 
 REPO_ROOT = get_repo_root(Path(__file__))
 CONFIGS_PATH = REPO_ROOT / "configs"
 TIME_DELTA = timedelta(hours=24)
+CHANNEL_WORKERS = 8
+FETCH_WORKERS_PER_CHANNEL = 4
+GLOBAL_FETCH_CONCURRENCY = 16
+PROXY_REQUESTS_PER_SECOND = 4.0
+HTTP_POOL_SIZE = 32
+LLM_MAX_CONNECTIONS = 64
+LLM_MAX_KEEPALIVE_CONNECTIONS = 32
+# Account limits per model as (requests per minute, tokens per minute), overridable via env
+LLM_RATE_LIMITS = {
+    "gpt-4o-mini": (500, 200_000),
+    "text-embedding-3-small": (3000, 1_000_000),
+}
 
 
-def generate(config: dict):
-    extractors = [SimpleNewsExtractor(url) for url in config["source_channels"]]
-    since_date = datetime.now() - TIME_DELTA
+def _build_extractors(
+    config: dict,
+    watermarks: ChannelWatermarkStore,
+    transcript_cache: Optional[TranscriptCache] = None,
+    llm_cache: Optional[LLMResponseCache] = None,
+    newsworthiness: Optional[NewsworthinessFilter] = None,
+    boilerplate: Optional[BoilerplateStripper] = None,
+) -> list[SimpleNewsExtractor]:
+    # Optional per-channel override of where video metadata comes from ("auto", "rss" or "scrapetube")
+    metadata_sources = config.get("channel_metadata_sources", {})
+    return [
+        SimpleNewsExtractor(
+            url,
+            transcript_cache=transcript_cache,
+            watermarks=watermarks,
+            metadata_source=metadata_sources.get(url, DEFAULT_METADATA_SOURCE),
+            llm_cache=llm_cache,
+            newsworthiness=newsworthiness,
+            boilerplate=boilerplate,
+        )
+        for url in config["source_channels"]
+    ]
 
-    news = []
 
-    def run_extractor(extractor):
-        try:
-            results = extractor.run(since_date=since_date)
-            logger.info(
-                "Extracted %s transcripts from channel %s",
-                len(results),
-                extractor.channel_id,
-            )
-            return results
-        except Exception as e:
-            logger.error(
-                "Failed to extract transcripts from channel %s",
-                extractor.channel_id,
-                exc_info=e,
-            )
-            return []
+def _get_watermarks(config: dict) -> ChannelWatermarkStore:
+    # Watermarks are kept per config so channels shared between configs are processed for each
+    return ChannelWatermarkStore(
+        get_cache_dir() / "watermarks" / f"{config['grist_table_name']}.json"
+    )
 
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = [executor.submit(run_extractor, ex) for ex in extractors]
 
-        for future in as_completed(futures):
-            news.extend(future.result())
+def _get_near_duplicate_index(config: dict) -> NearDuplicateIndex:
+    # Kept per config like watermarks, so content extracted for one config is not skipped for another
+    return NearDuplicateIndex(get_cache_dir() / "near_duplicates" / f"{config['grist_table_name']}.sqlite")
+
+
+def _get_incremental_clusterer(config: dict) -> IncrementalClusterer:
+    # Stories are tracked per config, like the other per-table state
+    return IncrementalClusterer(get_cache_dir() / "clustering" / config["grist_table_name"])
+
+
+def _get_story_index(config: dict) -> StoryIndex:
+    return StoryIndex(get_cache_dir() / "story_index" / config["grist_table_name"])
+
+
+def _skip_published_stories(
+    batch: NewsBatch,
+    story_index: StoryIndex,
+) -> tuple[NewsBatch, dict[int, np.ndarray], list[tuple[PublishedStory, NewsBatch]]]:
+    """
+    Drop clusters, and unclustered items one by one, that match an already generated story.
+    With incremental clustering, a cluster continuing a known story goes to that story's post.
+
+    :return: Items left to generate from, centroid per cluster, and the items matched to each published story
+    """
+    clusters = [label for label in batch.cluster_rows if label != NOISE]
+    centroids = {label: batch.embeddings[batch.cluster_rows[label]].mean(axis=0) for label in clusters}
+    members = [batch.cluster_rows[label] for label in clusters]
+    queries = [centroids[label] for label in clusters]
+    # Labels are persistent story ids when the batch tells new stories from continuing ones
+    story_ids = [
+        None if batch.is_new_story is None or batch.is_new_story[rows[0]] else label
+        for label, rows in zip(clusters, members)
+    ]
+    for i in batch.cluster_rows.get(NOISE, []):
+        members.append(np.array([i]))
+        queries.append(batch.embeddings[i])
+        story_ids.append(None)
+    if not queries:
+        return batch, centroids, []
+
+    keep = np.ones(len(batch), dtype=bool)
+    matched: dict[int, tuple[PublishedStory, list[int]]] = {}
+    for rows, story in zip(members, story_index.match(np.vstack(queries), story_ids)):
+        if story is not None:
+            keep[rows] = False
+            matched.setdefault(story.row_id, (story, []))[1].extend(rows.tolist())
 
-    clustering_engine = NewsClusteringEngine()
-    clusters_json_path = REPO_ROOT / "src" / "jobs" / "news_clusters.json"
-    clusters_df = clustering_engine.get_clusters(
-        news,
-        json_save_path=str(clusters_json_path),
+    logger.info(f"Skipping {int((~keep).sum())} news items of {len(matched)} already generated stories")
+    return (
+        batch.take(keep),
+        centroids,
+        [(story, batch.take(rows)) for story, rows in matched.values()],
     )
 
-    news_generator = NewsGenerator()
-    news_list = news_generator.generate_from_df(clusters_df)
 
+def _record_published_stories(
+    story_index: StoryIndex,
+    grist_client: GristClient,
+    news_list: list[GeneratedNews],
+    row_ids: list[int],
+    centroids: dict[int, np.ndarray],
+    matched: list[tuple[PublishedStory, NewsBatch]],
+    persistent_clusters: bool = False,
+) -> None:
+    """
+    Index the uploaded posts and credit new sources of matched stories on their existing rows.
+    A failed update of existing rows is logged rather than raised, as the new posts are already uploaded.
+
+    :param persistent_clusters: Whether cluster labels are story ids of the incremental clustering
+    """
+    for news, row_id in zip(news_list, row_ids):
+        # The post of unclustered items covers no single story, so it is not matched against later
+        if news.cluster not in centroids:
+            continue
+        story = PublishedStory(
+            row_id=row_id,
+            title=news.title,
+            # Sources are uploaded wrapped in a one-element list
+            source_video_urls=news.source_video_urls[0],
+            source_channels=news.source_channels[0],
+            created_at=time.time(),
+            story_id=news.cluster if persistent_clusters else None,
+        )
+        story_index.add(story, centroids[news.cluster])
+
+    updates = []
+    previous_sources = {}
+    for story, items in matched:
+        video_urls, channels = items.sources()
+        sources = (story.source_video_urls, story.source_channels)
+        if story_index.merge_sources(story, video_urls, channels):
+            previous_sources[story.row_id] = (story, sources)
+            updates.append({
+                "id": story.row_id,
+                "fields": {
+                    "source_video_urls": str([story.source_video_urls]),
+                    "source_channels": str([story.source_channels]),
+                },
+            })
+    if not updates:
+        return
+    try:
+        grist_client.update_rows(updates)
+    except Exception as e:
+        # The posts are already uploaded, so this must not stop the run's state from being
+        # saved; the stories keep the sources their rows still show
+        logger.error(f"Failed to credit new sources of {len(updates)} published stories", exc_info=e)
+        for story, (video_urls, channels) in previous_sources.values():
+            story.source_video_urls, story.source_channels = video_urls, channels
+
+
+def _to_upload_data(news_list) -> list[dict]:
     upload_data = []
     for news in news_list:
         data = {
@@ -69,15 +212,287 @@ def generate(config: dict):
             "status": "not approved"
         }
         upload_data.append(data)
+    return upload_data
+
+
+def _collapse_duplicates(
+    transcripts_by_channel: list[list[Transcript]],
+    near_duplicates: NearDuplicateIndex,
+) -> tuple[list[list[Transcript]], DeduplicationResult]:
+    result = near_duplicates.collapse([t for transcripts in transcripts_by_channel for t in transcripts])
+    survivor_ids = {t.video_id for t in result.survivors}
+    return (
+        [[t for t in transcripts if t.video_id in survivor_ids] for transcripts in transcripts_by_channel],
+        result,
+    )
+
+
+def _settled_video_ids(extractors: list[SimpleNewsExtractor], deduplication: DeduplicationResult) -> set[str]:
+    """Fetched videos that need no retry: extracted or skipped, and the near-duplicates of those."""
+    settled = {t.video_id for t in deduplication.already_extracted}
+    for extractor in extractors:
+        settled |= extractor.extracted_video_ids | extractor.skipped_video_ids
+    for survivor_id, duplicates in deduplication.duplicates.items():
+        if survivor_id in settled:
+            settled.update(t.video_id for t in duplicates)
+    return settled
+
+
+def _save_state(
+    watermarks: ChannelWatermarkStore,
+    newsworthiness: Optional[NewsworthinessFilter],
+    boilerplate: Optional[BoilerplateStripper],
+    near_duplicates: NearDuplicateIndex,
+    incremental: Optional[IncrementalClusterer],
+    story_index: StoryIndex,
+    extractors: list[SimpleNewsExtractor],
+    deduplication: DeduplicationResult,
+) -> None:
+    # Only called once the run's results are stored, so a failed run is retried in full
+    settled = _settled_video_ids(extractors, deduplication)
+    for extractor in extractors:
+        # Watermarks stop short of failed extractions, so those videos are fetched again
+        extractor.advance_watermark(settled)
+    watermarks.save()
+    if newsworthiness is not None:
+        newsworthiness.save()
+    if boilerplate is not None:
+        boilerplate.save()
+    # Transcripts that failed or were skipped stay out of the index, so their duplicates are not suppressed
+    near_duplicates.commit({video_id for ex in extractors for video_id in ex.extracted_video_ids})
+    if incremental is not None:
+        incremental.save()
+    story_index.save()
+
+
+class _PipelineRun:
+    """
+    State and stages of one run for one config, shared by `generate` and `agenerate`.
+
+    Stages run here are blocking; the two entry points only differ in how they
+    call extraction, generation and analysis, and in running the blocking stages
+    in worker threads when async.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        transcript_cache: Optional[TranscriptCache],
+        llm_cache: Optional[LLMResponseCache],
+        newsworthiness: Optional[NewsworthinessFilter],
+        boilerplate: Optional[BoilerplateStripper],
+        embedding_store: Optional[EmbeddingStore],
+        incremental_clustering: bool,
+    ):
+        self.config = config
+        self.table_name = config["grist_table_name"]
+        self.newsworthiness = newsworthiness
+        self.boilerplate = boilerplate
+        self.watermarks = _get_watermarks(config)
+        self.near_duplicates = _get_near_duplicate_index(config)
+        self.incremental = _get_incremental_clusterer(config) if incremental_clustering else None
+        self.story_index = _get_story_index(config)
+        self.extractors = _build_extractors(
+            config, self.watermarks, transcript_cache, llm_cache, newsworthiness, boilerplate
+        )
+        self.embedding_store = embedding_store
+        self.grist_client = GristClient(
+            document_id=config["grist_document_id"],
+            table_id=config["grist_table_name"],
+        )
+        self.since_date = datetime.now() - TIME_DELTA
+        self.deduplication = DeduplicationResult()
+
+    def fetch_channel(self, extractor: SimpleNewsExtractor) -> list[Transcript]:
+        try:
+            return extractor.fetch(since_date=self.since_date, fetch_workers=FETCH_WORKERS_PER_CHANNEL)
+        except Exception as e:
+            logger.error(
+                "Failed to fetch transcripts from channel %s",
+                extractor.channel_id,
+                exc_info=e,
+            )
+            return []
+
+    def deduplicate(self, transcripts_by_channel: list[list[Transcript]]) -> list[list[Transcript]]:
+        """Collapse near-duplicates across all channels, so they are extracted once."""
+        transcripts_by_channel, self.deduplication = _collapse_duplicates(
+            transcripts_by_channel, self.near_duplicates
+        )
+        return transcripts_by_channel
+
+    @property
+    def duplicates(self) -> dict[str, list[Transcript]]:
+        """Near-duplicates collapsed into each surviving transcript, by video id."""
+        return self.deduplication.duplicates
+
+    def cluster(
+        self,
+        news: list[News],
+    ) -> tuple[NewsBatch, dict[int, np.ndarray], list[tuple[PublishedStory, NewsBatch]]]:
+        """Cluster the run's news and set aside the clusters of already generated stories."""
+        clustering_engine = NewsClusteringEngine(embedding_store=self.embedding_store, incremental=self.incremental)
+        clusters_json_path = REPO_ROOT / "src" / "jobs" / "news_clusters.json"
+        with span("stage.clustering", config=self.table_name):
+            clusters = clustering_engine.get_clusters(news, json_save_path=str(clusters_json_path))
+        with span("stage.story_matching", config=self.table_name):
+            return _skip_published_stories(clusters, self.story_index)
+
+    def publish(
+        self,
+        news_list: list[GeneratedNews],
+        clusters: NewsBatch,
+        centroids: dict[int, np.ndarray],
+        matched: list[tuple[PublishedStory, NewsBatch]],
+    ) -> None:
+        """Upload the generated posts, record them as published and save the run's state."""
+        with span("stage.upload", config=self.table_name):
+            row_ids = self.grist_client.upload(_to_upload_data(news_list)) if news_list else []
+            _record_published_stories(
+                self.story_index, self.grist_client, news_list, row_ids, centroids, matched,
+                persistent_clusters=clusters.is_new_story is not None,
+            )
+        self.save_state()
+
+    def save_state(self) -> None:
+        _save_state(
+            self.watermarks,
+            self.newsworthiness,
+            self.boilerplate,
+            self.near_duplicates,
+            self.incremental,
+            self.story_index,
+            self.extractors,
+            self.deduplication,
+        )
+        self.near_duplicates.close()
+
+    def finish_without_news(self) -> None:
+        # Nothing to cluster; the fetched transcripts are still marked as processed
+        logger.info("No news extracted, skipping clustering and generation")
+        self.save_state()
+
 
-    grist_client = GristClient(
-        document_id=config["grist_document_id"],
-        table_id=config["grist_table_name"],
+def _log_extraction(extractor: SimpleNewsExtractor, results: Union[list[News], BaseException]) -> list[News]:
+    if isinstance(results, BaseException):
+        logger.error(
+            "Failed to extract news from channel %s",
+            extractor.channel_id,
+            exc_info=results,
+        )
+        return []
+    logger.info(
+        "Extracted %s news items from channel %s",
+        len(results),
+        extractor.channel_id,
     )
-    grist_client.upload(upload_data)
+    return results
 
-    analyzer = NewsAnalyzer(grist_client=grist_client)
-    analyzer.analyze_all()
+
+def generate(
+    config: dict,
+    transcript_cache: Optional[TranscriptCache] = None,
+    llm_cache: Optional[LLMResponseCache] = None,
+    newsworthiness: Optional[NewsworthinessFilter] = None,
+    boilerplate: Optional[BoilerplateStripper] = None,
+    embedding_store: Optional[EmbeddingStore] = None,
+    incremental_clustering: bool = True,
+):
+    run = _PipelineRun(
+        config, transcript_cache, llm_cache, newsworthiness, boilerplate, embedding_store, incremental_clustering
+    )
+
+    # All channels are fetched before extraction, so near-duplicates across channels are collapsed first
+    with span("stage.fetch", config=run.table_name), ThreadPoolExecutor(max_workers=CHANNEL_WORKERS) as executor:
+        transcripts_by_channel = list(executor.map(run.fetch_channel, run.extractors))
+    with span("stage.deduplicate", config=run.table_name):
+        transcripts_by_channel = run.deduplicate(transcripts_by_channel)
+
+    def extract_channel(extractor, transcripts):
+        try:
+            return _log_extraction(extractor, extractor.extract(transcripts, duplicates=run.duplicates))
+        except Exception as e:
+            return _log_extraction(extractor, e)
+
+    news = []
+    with span("stage.extract", config=run.table_name), ThreadPoolExecutor(max_workers=CHANNEL_WORKERS) as executor:
+        futures = [
+            executor.submit(extract_channel, ex, transcripts)
+            for ex, transcripts in zip(run.extractors, transcripts_by_channel)
+        ]
+
+        for future in as_completed(futures):
+            news.extend(future.result())
+    if not news:
+        run.finish_without_news()
+        return
+
+    clusters, centroids, matched = run.cluster(news)
+    news_generator = NewsGenerator()
+    with span("stage.generation", config=run.table_name):
+        news_list = news_generator.generate_from_batch(clusters)
+    run.publish(news_list, clusters, centroids, matched)
+
+    analyzer = NewsAnalyzer(grist_client=run.grist_client)
+    with span("stage.analysis", config=run.table_name):
+        analyzer.analyze_all()
+
+    logger.info("Job finished!")
+
+
+async def agenerate(
+    config: dict,
+    transcript_cache: Optional[TranscriptCache] = None,
+    llm_cache: Optional[LLMResponseCache] = None,
+    newsworthiness: Optional[NewsworthinessFilter] = None,
+    boilerplate: Optional[BoilerplateStripper] = None,
+    embedding_store: Optional[EmbeddingStore] = None,
+    incremental_clustering: bool = True,
+):
+    """
+    Async variant of `generate`. Extraction, generation and analysis calls of all
+    channels share one event loop and the global LLM concurrency budget, while
+    blocking stages (fetching, clustering, Grist) run in worker threads.
+    """
+    run = _PipelineRun(
+        config, transcript_cache, llm_cache, newsworthiness, boilerplate, embedding_store, incremental_clustering
+    )
+    # Bounds the number of channels fetching at once, LLM calls are bounded separately
+    channel_semaphore = asyncio.Semaphore(CHANNEL_WORKERS)
+
+    async def fetch_channel(extractor):
+        async with channel_semaphore:
+            return await asyncio.to_thread(run.fetch_channel, extractor)
+
+    with span("stage.fetch", config=run.table_name):
+        transcripts_by_channel = await asyncio.gather(*(fetch_channel(ex) for ex in run.extractors))
+    with span("stage.deduplicate", config=run.table_name):
+        transcripts_by_channel = await asyncio.to_thread(run.deduplicate, list(transcripts_by_channel))
+
+    news = []
+    with span("stage.extract", config=run.table_name):
+        results = await asyncio.gather(
+            *(
+                ex.aextract(transcripts, duplicates=run.duplicates)
+                for ex, transcripts in zip(run.extractors, transcripts_by_channel)
+            ),
+            return_exceptions=True,
+        )
+        for extractor, channel_results in zip(run.extractors, results):
+            news.extend(_log_extraction(extractor, channel_results))
+    if not news:
+        await asyncio.to_thread(run.finish_without_news)
+        return
+
+    clusters, centroids, matched = await asyncio.to_thread(run.cluster, news)
+    news_generator = NewsGenerator()
+    with span("stage.generation", config=run.table_name):
+        news_list = await news_generator.agenerate_from_batch(clusters)
+    await asyncio.to_thread(run.publish, news_list, clusters, centroids, matched)
+
+    analyzer = NewsAnalyzer(grist_client=run.grist_client)
+    with span("stage.analysis", config=run.table_name):
+        await analyzer.aanalyze_all()
 
     logger.info("Job finished!")
 
@@ -91,5 +506,65 @@ if __name__ == "__main__":
             config = json.load(f)
             configs.append(config)
 
-    for config in configs:
-        generate(config)
+    configure_transcript_api(pool_size=HTTP_POOL_SIZE)
+    configure_fetch_limits(
+        global_concurrency=GLOBAL_FETCH_CONCURRENCY,
+        proxy_requests_per_second=PROXY_REQUESTS_PER_SECOND,
+    )
+    transcript_cache = TranscriptCache()
+    # Set LLM_CACHE_DISABLED=1 to force fresh LLM calls
+    llm_cache = None if os.getenv("LLM_CACHE_DISABLED") else LLMResponseCache()
+    # Pre-filter of transcripts sent to the LLM: "off", "shadow" (log decisions only) or "enforce"
+    newsworthiness = NewsworthinessFilter(
+        mode=os.getenv("NEWSWORTHINESS_MODE") or DEFAULT_MODE,
+        threshold=float(os.getenv("NEWSWORTHINESS_THRESHOLD") or DEFAULT_THRESHOLD),
+    )
+    # Set BOILERPLATE_STRIPPING_DISABLED=1 to send transcripts to the LLM as fetched
+    boilerplate = None if os.getenv("BOILERPLATE_STRIPPING_DISABLED") else BoilerplateStripper()
+    # Set EMBEDDING_CACHE_DISABLED=1 to re-embed every news item
+    embedding_store = None if os.getenv("EMBEDDING_CACHE_DISABLED") else EmbeddingStore(DEFAULT_EMBEDDING_MODEL)
+    # Set INCREMENTAL_CLUSTERING_DISABLED=1 to cluster each run's items from scratch
+    incremental_clustering = not os.getenv("INCREMENTAL_CLUSTERING_DISABLED")
+    configure_llm_clients(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+    )
+    configure_llm_concurrency(int(os.getenv("LLM_CONCURRENCY") or DEFAULT_LLM_CONCURRENCY))
+    for model, (rpm, tpm) in LLM_RATE_LIMITS.items():
+        # e.g. OPENAI_RPM_GPT_4O_MINI=5000
+        env_suffix = model.upper().replace("-", "_").replace(".", "_")
+        configure_llm_rate_limit(
+            model,
+            requests_per_minute=float(os.getenv(f"OPENAI_RPM_{env_suffix}") or rpm),
+            tokens_per_minute=float(os.getenv(f"OPENAI_TPM_{env_suffix}") or tpm),
+        )
+    # Set ASYNC_PIPELINE=1 to run LLM stages on one event loop instead of thread pools
+    if os.getenv("ASYNC_PIPELINE"):
+        async def run_all():
+            for config in configs:
+                await agenerate(
+                    config,
+                    transcript_cache=transcript_cache,
+                    llm_cache=llm_cache,
+                    newsworthiness=newsworthiness,
+                    boilerplate=boilerplate,
+                    embedding_store=embedding_store,
+                    incremental_clustering=incremental_clustering,
+                )
+
+        asyncio.run(run_all())
+    else:
+        for config in configs:
+            generate(
+                config,
+                transcript_cache=transcript_cache,
+                llm_cache=llm_cache,
+                newsworthiness=newsworthiness,
+                boilerplate=boilerplate,
+                embedding_store=embedding_store,
+                incremental_clustering=incremental_clustering,
+            )
+
+    for model, stats in get_llm_rate_limit_stats().items():
+        logger.info("LLM rate limiter queue stats for %s: %s", model, stats)
+    write_run_report()
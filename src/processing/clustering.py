@@ -1,25 +1,60 @@
-import os
 import json
-from typing import Optional
+import math
+from typing import TYPE_CHECKING, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
 
-import umap
-import hdbscan
-from openai import OpenAI
-import pandas as pd
 import numpy as np
 
 from src.utils.logger import logger
+from src.utils.llm_concurrency import llm_slot_sync
+from src.utils.tokens import count_tokens, truncate_to_tokens
+from src.utils.llm_factory import get_openai_client
+from src.utils.tracing import span, add_to_current_span
 from src.extracting.utils import News
+from src.processing.embedding_store import EmbeddingStore
+from src.processing.incremental_clustering import IncrementalClusterer, NOISE
+from src.processing.news_batch import NewsBatch
+
+if TYPE_CHECKING:
+    import umap
+    import hdbscan
+
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+# OpenAI limits of a single embeddings request
+EMBEDDING_MAX_INPUTS = 2048
+EMBEDDING_MAX_REQUEST_TOKENS = 300_000
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+# Batches are sized so mid-sized inputs are still spread over the workers
+EMBEDDING_WORKERS = 4
+EMBEDDING_MIN_BATCH_INPUTS = 16
+CLUSTERING_BACKENDS = ("auto", "agglomerative", "umap_hdbscan")
+# Below this many items, "auto" clusters the similarity matrix directly: UMAP's JIT
+# compilation and fit cost seconds, and its neighbour graph is unreliable on few items
+DEFAULT_UMAP_MIN_ITEMS = 300
+# Minimum average cosine similarity between two groups of items merged into one story
+DEFAULT_SIMILARITY_THRESHOLD = 0.7
 
 
 class NewsClusteringEngine:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.df = None
+    def __init__(
+        self,
+        embedding_store: Optional[EmbeddingStore] = None,
+        incremental: Optional[IncrementalClusterer] = None,
+    ):
+        """
+        :param embedding_store: Store of previously computed vectors; pass None to always call the API
+        :param incremental: Persisted clustering state; when given, items are assigned to stories
+            that persist across runs instead of being clustered from scratch
+        """
+        self.client = get_openai_client()
+        self.embedding_store = embedding_store
+        self.incremental = incremental
+        self.batch: Optional[NewsBatch] = None
 
     def get_clusters(
         self,
-        news: list[News],
+        news: Union[list[News], NewsBatch],
         json_save_path: Optional[str] = None,
         dim_red_n_neighbors: int = 5,
         dim_red_n_components: int = 10,
@@ -27,22 +62,92 @@ class NewsClusteringEngine:
         min_samples: int = 1,
         cluster_selection_method: str = "eom",
         cluster_distance_metric: str = "euclidean",
-    ):
-        self.df = pd.DataFrame([n.to_dict() for n in news])
-        self.df["text_for_embedding"] = self.df.apply(self._prepare_text_for_embedding, axis=1)
+        backend: str = "auto",
+        umap_min_items: int = DEFAULT_UMAP_MIN_ITEMS,
+        similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ) -> NewsBatch:
+        """
+        Cluster news items into stories. Every backend labels items with cluster ids
+        from 0 and marks items in no cluster with -1.
+
+        :return: Batch of the items with their embeddings and cluster labels
+
+        :param backend: "umap_hdbscan", "agglomerative" (cosine similarity, NumPy only),
+            or "auto" to use "agglomerative" below `umap_min_items` items
+        :param umap_min_items: Number of items from which "auto" uses UMAP and HDBSCAN
+        :param similarity_threshold: Merge threshold of the "agglomerative" backend
+        """
+        if backend not in CLUSTERING_BACKENDS:
+            raise ValueError(f"Unknown clustering backend {backend!r}, expected one of {CLUSTERING_BACKENDS}")
+        batch = news if isinstance(news, NewsBatch) else NewsBatch.from_news(news)
+        self.batch = batch
+
+        embeddings_array = self._get_embeddings(self._prepare_texts_for_embedding(batch))
+        batch.embeddings = embeddings_array
+
+        def fit(embeddings: np.ndarray):
+            if backend == "agglomerative" or (backend == "auto" and len(embeddings) < umap_min_items):
+                # No reducer or clusterer to predict with, new items are matched to story centroids
+                with span("clustering.agglomerative", n_items=len(embeddings)):
+                    return None, None, cluster_by_similarity(embeddings, similarity_threshold, min_cluster_size)
+            return self._fit(
+                embeddings,
+                dim_red_n_neighbors=dim_red_n_neighbors,
+                dim_red_n_components=dim_red_n_components,
+                min_cluster_size=min_cluster_size,
+                min_samples=min_samples,
+                cluster_selection_method=cluster_selection_method,
+                cluster_distance_metric=cluster_distance_metric,
+            )
+
+        logger.info("Clustering...")
+        if self.incremental is not None:
+            # Cluster labels are story ids that stay the same across runs
+            cluster_labels, is_new_story = self.incremental.assign(embeddings_array, fit)
+            batch.set_clusters(cluster_labels, is_new_story)
+        else:
+            _, _, cluster_labels = fit(embeddings_array)
+            batch.set_clusters(cluster_labels)
+
+        n_clusters = len(batch.cluster_rows) - (1 if NOISE in batch.cluster_rows else 0)
+        logger.info(f"Number of clusters found: {n_clusters}")
+        logger.info(
+            "Cluster distribution: %s",
+            {label: len(rows) for label, rows in sorted(batch.cluster_rows.items())},
+        )
+
+        if json_save_path:
+            grouped = {label: batch.to_records(rows) for label, rows in sorted(batch.cluster_rows.items())}
+
+            with open(json_save_path, "w", encoding="utf-8") as f:
+                json.dump(grouped, f, ensure_ascii=False, indent=2)
+
+        return batch
 
-        texts = self.df["text_for_embedding"].tolist()
-        embeddings = self._get_embeddings(texts)
-        embeddings_array = np.array(embeddings)
+    @staticmethod
+    def _fit(
+        embeddings: np.ndarray,
+        dim_red_n_neighbors: int,
+        dim_red_n_components: int,
+        min_cluster_size: int,
+        min_samples: int,
+        cluster_selection_method: str,
+        cluster_distance_metric: str,
+    ) -> tuple["umap.UMAP", "hdbscan.HDBSCAN", np.ndarray]:
+        """Fit the reducer and clusterer on `embeddings` and return them with the cluster labels."""
+        # Imported on first use, as importing umap compiles its numba functions
+        import umap
+        import hdbscan
 
-        umap_reducer_clustering = umap.UMAP(
+        reducer = umap.UMAP(
             n_neighbors=dim_red_n_neighbors,
             n_components=dim_red_n_components,
             min_dist=0.0,
             metric="cosine",
             random_state=42
         )
-        embeddings_reduced_clustering = umap_reducer_clustering.fit_transform(embeddings_array)
+        with span("clustering.umap", n_items=len(embeddings)):
+            embeddings_reduced = reducer.fit_transform(embeddings)
 
         clusterer = hdbscan.HDBSCAN(
             min_cluster_size=min_cluster_size,
@@ -51,47 +156,136 @@ class NewsClusteringEngine:
             cluster_selection_method=cluster_selection_method,
             prediction_data=True
         )
-        logger.info("Clustering...")
-        cluster_labels = clusterer.fit_predict(embeddings_reduced_clustering)
+        with span("clustering.hdbscan", n_items=len(embeddings)):
+            cluster_labels = clusterer.fit_predict(embeddings_reduced)
+        return reducer, clusterer, cluster_labels
 
-        self.df["cluster"] = cluster_labels
+    @staticmethod
+    def _prepare_texts_for_embedding(batch: NewsBatch) -> list[str]:
+        """Combine relevant fields of each item into a single text for embedding."""
+        return [
+            f"Title: {title}\nSummary: {summary}\nContent: {content}\n"
+            f"Keywords: {', '.join(keywords)}\nCategory: {category}"
+            for title, summary, content, keywords, category in zip(
+                batch["title"], batch["summary"], batch["content"], batch["keywords"], batch["category"]
+            )
+        ]
 
-        n_clusters = len(set(cluster_labels)) - (1 if -1 in cluster_labels else 0)
-        logger.info(f"Number of clusters found: {n_clusters}")
-        logger.info(f"\nCluster distribution: %s", self.df["cluster"].value_counts().sort_index())
+    def _get_embeddings(self, texts: list[str], model: str = DEFAULT_EMBEDDING_MODEL) -> np.ndarray:
+        """Get embeddings for a list of texts, reusing stored vectors of unchanged texts."""
+        store = self.embedding_store
+        if store is not None and store.model != model:
+            store = None
 
-        if json_save_path:
-            grouped = (
-                self.df
-                .groupby("cluster")
-                .apply(lambda g: g.to_dict(orient="records"))
-                .to_dict()
-            )
+        embeddings = store.get_many(texts) if store is not None else [None] * len(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        logger.info(f"Reusing {len(texts) - len(missing)} of {len(texts)} stored embeddings")
+        add_to_current_span("embedding_cache_hits", len(texts) - len(missing))
 
-            with open(json_save_path, "w", encoding="utf-8") as f:
-                json.dump(grouped, f, ensure_ascii=False, indent=2)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fetched = self._request_embeddings(missing_texts, model)
+            if store is not None:
+                store.put_many(missing_texts, fetched)
+            for i, embedding in zip(missing, fetched):
+                embeddings[i] = embedding
 
-        return self.df
+        return np.vstack(embeddings)
 
-    @staticmethod
-    def _prepare_text_for_embedding(row: pd.Series) -> str:
-        """Combine relevant fields into a single text for embedding."""
-        parts = [
-            f"Title: {row['title']}",
-            f"Summary: {row['summary']}",
-            f"Content: {row['content']}",
-            f"Keywords: {', '.join(row['keywords'])}",
-            f"Category: {row['category']}",
-        ]
-        return "\n".join(parts)
+    def _request_embeddings(self, texts: list[str], model: str) -> np.ndarray:
+        """
+        Get embeddings for a list of texts using OpenAI API, in concurrent batches
+        within the request input and token limits, returned in input order.
+        """
+        texts = list(texts)
+        token_counts = []
+        for i, text in enumerate(texts):
+            n_tokens = count_tokens(text, model)
+            if n_tokens > EMBEDDING_MAX_INPUT_TOKENS:
+                logger.warning(f"Truncating embedding input of {n_tokens} tokens")
+                texts[i] = truncate_to_tokens(text, EMBEDDING_MAX_INPUT_TOKENS, model)
+                n_tokens = EMBEDDING_MAX_INPUT_TOKENS
+            token_counts.append(n_tokens)
+
+        batches = self._make_batches(token_counts)
+        logger.info(f"Embedding {len(texts)} texts in {len(batches)} batches")
+        with ThreadPoolExecutor(max_workers=min(EMBEDDING_WORKERS, len(batches))) as executor:
+            results = executor.map(
+                lambda batch: self._request_embeddings_batch(
+                    [texts[i] for i in batch],
+                    model,
+                    sum(token_counts[i] for i in batch),
+                ),
+                batches,
+            )
+            return np.vstack(list(results))
 
-    def _get_embeddings(self, texts: list[str], model: str = "text-embedding-3-small") -> list[list[float]]:
-        """Get embeddings for a list of texts using OpenAI API."""
-        response = self.client.embeddings.create(
-            input=texts,
-            model=model
+    @staticmethod
+    def _make_batches(token_counts: list[int]) -> list[range]:
+        """Split consecutive inputs into batches within the per-request limits."""
+        max_inputs = min(
+            EMBEDDING_MAX_INPUTS,
+            max(EMBEDDING_MIN_BATCH_INPUTS, math.ceil(len(token_counts) / EMBEDDING_WORKERS)),
         )
-        return [item.embedding for item in response.data]
+        batches = []
+        start = batch_tokens = 0
+        for i, n_tokens in enumerate(token_counts):
+            if i > start and (i - start >= max_inputs or batch_tokens + n_tokens > EMBEDDING_MAX_REQUEST_TOKENS):
+                batches.append(range(start, i))
+                start, batch_tokens = i, 0
+            batch_tokens += n_tokens
+        batches.append(range(start, len(token_counts)))
+        return batches
+
+    def _request_embeddings_batch(self, texts: list[str], model: str, tokens: int) -> np.ndarray:
+        with llm_slot_sync(model, tokens):
+            response = self.client.embeddings.create(
+                input=texts,
+                model=model
+            )
+            add_to_current_span("prompt_tokens", response.usage.prompt_tokens)
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.array([item.embedding for item in data], dtype=np.float32)
+
+
+def cluster_by_similarity(embeddings: np.ndarray, threshold: float, min_cluster_size: int) -> np.ndarray:
+    """
+    Average-linkage agglomerative clustering on cosine similarity: the most similar
+    pair of groups is merged while their average similarity is at least `threshold`.
+
+    :return: Cluster label of each row, numbered from 0 in order of first member;
+        groups smaller than `min_cluster_size` are labelled -1
+    """
+    n_items = len(embeddings)
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    unit = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    similarity = unit @ unit.T
+    np.fill_diagonal(similarity, -np.inf)
+    sizes = np.ones(n_items)
+    groups = np.arange(n_items)
+
+    while n_items > 1:
+        i, j = divmod(int(similarity.argmax()), n_items)
+        if similarity[i, j] < threshold:
+            break
+        # Average similarity of the merged group to every other group; merged-away rows stay -inf
+        merged = (sizes[i] * similarity[i] + sizes[j] * similarity[j]) / (sizes[i] + sizes[j])
+        similarity[i, :] = merged
+        similarity[:, i] = merged
+        similarity[i, i] = -np.inf
+        similarity[j, :] = -np.inf
+        similarity[:, j] = -np.inf
+        sizes[i] += sizes[j]
+        groups[groups == j] = i
+
+    labels = np.full(n_items, NOISE, dtype=np.int64)
+    next_label = 0
+    for group in dict.fromkeys(groups.tolist()):
+        members = groups == group
+        if members.sum() >= min_cluster_size:
+            labels[members] = next_label
+            next_label += 1
+    return labels
 
 
 if __name__ == "__main__":
@@ -110,4 +304,4 @@ if __name__ == "__main__":
         news.append(News.from_dict(item))
 
     clustering_engine = NewsClusteringEngine()
-    cluster_df = clustering_engine.get_clusters(news=news, json_save_path="clusters.json")
\ No newline at end of file
+    clusters = clustering_engine.get_clusters(news=news, json_save_path="clusters.json")
\ No newline at end of file
@@ -0,0 +1,208 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+
+
+DEFAULT_MAX_ENTRIES = 200_000
+INITIAL_CAPACITY = 1024
+# Share of entries dropped at once when the store is full
+EVICTION_FRACTION = 0.1
+# SQLite limits the number of parameters per statement
+QUERY_BATCH_SIZE = 500
+VECTORS_FILENAME = "vectors.bin"
+INDEX_FILENAME = "index.sqlite"
+
+
+class EmbeddingStore:
+    """
+    Persistent store of embedding vectors for one model.
+
+    Vectors are kept in a memory-mapped array file, one row per slot, and a
+    SQLite index maps the hash of each embedded text to its slot and last access
+    time. Once the store holds `max_entries` vectors, the least recently used
+    ones are evicted and their slots reused.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        path: Optional[Union[str, Path]] = None,
+        dtype: Union[str, np.dtype] = "float16",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        :param model: Embedding model the vectors come from
+        :param path: Directory of the store, defaults to .cache/embeddings/<model>
+        :param dtype: On-disk precision, "float16" halves the size at negligible cost for clustering
+        :param max_entries: Maximum number of vectors kept
+        """
+        self.model = model
+        self.path = Path(path) if path else get_cache_dir() / "embeddings" / model
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.memmap] = None
+        self._dim: Optional[int] = None
+        self._capacity = 0
+        self._free_slots: list[int] = []
+
+        self._conn = sqlite3.connect(str(self.path / INDEX_FILENAME), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        self._open()
+
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """
+        Look up the vectors of `texts`.
+
+        :return: float32 vector per text, None where the text is not stored
+        """
+        keys = [self.make_key(text) for text in texts]
+        with self._lock:
+            if self._vectors is None:
+                return [None] * len(texts)
+
+            slots: dict[str, int] = {}
+            for start in range(0, len(keys), QUERY_BATCH_SIZE):
+                batch = keys[start:start + QUERY_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                slots.update(rows)
+
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", [(now, key) for key in slots]
+            )
+            self._conn.commit()
+            return [
+                np.array(self._vectors[slots[key]], dtype=np.float32) if key in slots else None
+                for key in keys
+            ]
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        """
+        Store the vectors of `texts`, replacing existing entries.
+
+        :param texts: Embedded texts
+        :param vectors: Array of shape (len(texts), dimension)
+        """
+        vectors = np.asarray(vectors)
+        if len(texts) == 0:
+            return
+        with self._lock:
+            if self._dim is None:
+                self._init_vectors(vectors.shape[1])
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Expected vectors of dimension {self._dim}, got {vectors.shape[1]}")
+
+            now = time.time()
+            rows = []
+            # Repeated texts in one batch must share a slot
+            by_key = {self.make_key(text): vector for text, vector in zip(texts, vectors)}
+            for key, vector in by_key.items():
+                existing = self._conn.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                slot = existing[0] if existing else self._allocate_slot()
+                self._vectors[slot] = vector.astype(self.dtype)
+                rows.append((key, slot, now))
+
+            # Vectors reach the disk before the index points at them
+            self._vectors.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, slot, accessed_at) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._conn.close()
+
+    def _open(self) -> None:
+        meta = dict(self._conn.execute("SELECT name, value FROM meta").fetchall())
+        vectors_path = self.path / VECTORS_FILENAME
+        if not meta or not vectors_path.exists():
+            return
+        if meta.get("dtype") != self.dtype.name:
+            logger.warning(f"Embedding store {self.path} has dtype {meta.get('dtype')}, rebuilding it")
+            self._reset()
+            return
+
+        self._dim = int(meta["dim"])
+        row_bytes = self._dim * self.dtype.itemsize
+        self._capacity = vectors_path.stat().st_size // row_bytes
+        self._vectors = np.memmap(vectors_path, dtype=self.dtype, mode="r+", shape=(self._capacity, self._dim))
+        used = {row[0] for row in self._conn.execute("SELECT slot FROM entries").fetchall()}
+        self._free_slots = sorted(set(range(self._capacity)) - used, reverse=True)
+
+    def _reset(self) -> None:
+        self._conn.execute("DELETE FROM entries")
+        self._conn.execute("DELETE FROM meta")
+        self._conn.commit()
+        (self.path / VECTORS_FILENAME).unlink(missing_ok=True)
+
+    def _init_vectors(self, dim: int) -> None:
+        self._dim = dim
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [("dim", str(dim)), ("dtype", self.dtype.name)],
+        )
+        self._conn.commit()
+        self._resize(min(INITIAL_CAPACITY, self.max_entries))
+
+    def _resize(self, capacity: int) -> None:
+        vectors_path = self.path / VECTORS_FILENAME
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(vectors_path, "ab") as f:
+            f.truncate(capacity * self._dim * self.dtype.itemsize)
+        self._free_slots = list(range(capacity - 1, self._capacity - 1, -1)) + self._free_slots
+        self._capacity = capacity
+        self._vectors = np.memmap(vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self._dim))
+
+    def _allocate_slot(self) -> int:
+        if not self._free_slots:
+            if self._capacity < self.max_entries:
+                self._resize(min(self.max_entries, self._capacity * 2))
+            else:
+                self._evict(max(1, int(self.max_entries * EVICTION_FRACTION)))
+        return self._free_slots.pop()
+
+    def _evict(self, n_entries: int) -> None:
+        rows = self._conn.execute(
+            "SELECT key, slot FROM entries ORDER BY accessed_at LIMIT ?", (n_entries,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in rows])
+        self._conn.commit()
+        self._free_slots.extend(slot for _, slot in rows)
+        logger.debug(f"Evicted {len(rows)} least recently used embeddings from {self.path}")
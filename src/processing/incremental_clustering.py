@@ -0,0 +1,324 @@
+import json
+import os
+import time
+import pickle
+import threading
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+import numpy as np
+
+from src.utils.logger import logger
+from src.utils.tracing import span
+
+if TYPE_CHECKING:
+    import hdbscan
+
+
+# How long items are kept to refit on, and stories kept to match new items against
+DEFAULT_HISTORY = timedelta(days=14)
+DEFAULT_REFIT_INTERVAL = timedelta(days=7)
+# The reducer and clusterer are only fitted once this many items are available
+MIN_FIT_ITEMS = 30
+# A new item joins the story with the nearest centroid above this cosine similarity
+CENTROID_SIMILARITY = 0.8
+# Items this close below CENTROID_SIMILARITY to a known story are ones the model should have placed;
+# unmatched news is mostly new stories, so drift is measured on these near misses only
+DRIFT_SIMILARITY_MARGIN = 0.1
+# A refit is triggered when this share of the items near a known story is left unassigned
+DRIFT_NEAR_MISS_FRACTION = 0.5
+DRIFT_MIN_ITEMS = 20
+# A refitted cluster keeps a story id when this share of its older items had that id
+STORY_MATCH_SHARE = 0.5
+NOISE = -1
+
+# Fits a reducer and clusterer on embeddings and returns them with the cluster label of each row;
+# backends without a predictive model return None for both
+FitFunction = Callable[[np.ndarray], tuple[Optional[object], Optional["hdbscan.HDBSCAN"], np.ndarray]]
+
+
+class IncrementalClusterer:
+    """
+    Assigns each day's news items to stories that persist across runs.
+
+    A UMAP reducer and HDBSCAN clusterer fitted on recent history are kept on
+    disk, and new items are placed with `reducer.transform` and
+    `hdbscan.approximate_predict`, so a daily run costs in proportion to its new
+    items. Items the model leaves as noise are matched to story centroids, and
+    the remainder are clustered among themselves into new stories with the same
+    fit function, so they are grouped like a from-scratch run. Backends with
+    no predictive model, used on small histories, rely on the centroids alone.
+
+    Story ids are stable: a full refit, done on a schedule or when the model
+    leaves too many items that are close to a known story unassigned, maps its
+    clusters back to the story ids of the items they contain.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        history: timedelta = DEFAULT_HISTORY,
+        refit_interval: timedelta = DEFAULT_REFIT_INTERVAL,
+        min_cluster_size: int = 2,
+    ):
+        """
+        :param path: Directory of the persisted state
+        :param history: How long items are kept for refits and story matching
+        :param refit_interval: Maximum age of the fitted model
+        :param min_cluster_size: Minimum number of new items forming a new story
+        """
+        self.path = Path(path)
+        self.history_seconds = history.total_seconds()
+        self.refit_interval_seconds = refit_interval.total_seconds()
+        self.min_cluster_size = min_cluster_size
+        self._lock = threading.Lock()
+
+        self.reducer = None
+        self.clusterer: Optional["hdbscan.HDBSCAN"] = None
+        self.fitted_at: Optional[float] = None
+        self.label_to_story: dict[int, int] = {}
+        self.next_story_id = 0
+        # Items of the recent history, one row per item
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
+        self.story_ids = np.zeros(0, dtype=np.int64)
+        self.timestamps = np.zeros(0, dtype=np.float64)
+        # Per-story sum of member embeddings and member count, kept up to date as items come and go
+        self.centroid_sums: dict[int, np.ndarray] = {}
+        self.centroid_counts: dict[int, int] = {}
+        self._load()
+
+    def assign(self, embeddings: np.ndarray, fit: FitFunction) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Assign new items to stories.
+
+        :param embeddings: Embeddings of the new items
+        :param fit: Function fitting a reducer and clusterer, used on refits and to group
+            items matching no known story
+        :return: Story id of each item (NOISE if unassigned) and whether the story is new in this run
+        """
+        embeddings = _normalize(np.asarray(embeddings, dtype=np.float32))
+        now = time.time()
+        with self._lock:
+            self._prune_history(now)
+            known_stories = set(self.story_ids.tolist())
+
+            if self._refit_due(now, len(embeddings)):
+                labels = self._refit(embeddings, fit, reason="schedule")
+            else:
+                labels, n_near_misses, n_near = self._predict(embeddings, fit)
+                if (
+                    self.fitted_at is not None
+                    and n_near >= DRIFT_MIN_ITEMS
+                    and n_near_misses / n_near > DRIFT_NEAR_MISS_FRACTION
+                ):
+                    labels = self._refit(embeddings, fit, reason="drift")
+
+            self._append_history(embeddings, labels, now)
+            is_new = np.array([label != NOISE and label not in known_stories for label in labels.tolist()])
+
+        logger.info(
+            f"Assigned {int((labels != NOISE).sum())} of {len(labels)} items to stories, "
+            f"{len(set(labels[is_new].tolist()))} new stories"
+        )
+        return labels, is_new
+
+    def save(self) -> None:
+        """Persist the model and history; call once the run's results are stored."""
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            state = {
+                "fitted_at": self.fitted_at,
+                "label_to_story": {str(k): v for k, v in self.label_to_story.items()},
+                "next_story_id": self.next_story_id,
+            }
+            _atomic_write(self.path / "state.json", json.dumps(state).encode("utf-8"))
+            with open(self.path / "history.npz.tmp", "wb") as f:
+                centroid_ids = sorted(self.centroid_sums)
+                np.savez(
+                    f,
+                    embeddings=self.embeddings.astype(np.float16),
+                    story_ids=self.story_ids,
+                    timestamps=self.timestamps,
+                    centroid_ids=np.array(centroid_ids, dtype=np.int64),
+                    centroid_sums=np.array([self.centroid_sums[i] for i in centroid_ids], dtype=np.float32),
+                    centroid_counts=np.array([self.centroid_counts[i] for i in centroid_ids], dtype=np.int64),
+                )
+            os.replace(self.path / "history.npz.tmp", self.path / "history.npz")
+            if self.clusterer is not None:
+                _atomic_write(self.path / "model.pkl", pickle.dumps((self.reducer, self.clusterer)))
+            else:
+                # The last fit had no predictive model, an older one must not be loaded
+                (self.path / "model.pkl").unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        state_path = self.path / "state.json"
+        if not state_path.exists():
+            return
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.fitted_at = state["fitted_at"]
+        self.label_to_story = {int(k): v for k, v in state["label_to_story"].items()}
+        self.next_story_id = state["next_story_id"]
+
+        history_path = self.path / "history.npz"
+        if history_path.exists():
+            with np.load(history_path) as history:
+                self.embeddings = history["embeddings"].astype(np.float32)
+                self.story_ids = history["story_ids"]
+                self.timestamps = history["timestamps"]
+                for story, total, count in zip(
+                    history["centroid_ids"].tolist(), history["centroid_sums"], history["centroid_counts"].tolist()
+                ):
+                    self.centroid_sums[story] = total
+                    self.centroid_counts[story] = count
+
+        model_path = self.path / "model.pkl"
+        if model_path.exists():
+            try:
+                with open(model_path, "rb") as f:
+                    self.reducer, self.clusterer = pickle.load(f)
+            except Exception as e:
+                # E.g. after a umap or hdbscan upgrade; the next run refits
+                logger.warning(f"Could not load clustering model from {model_path}: {e}")
+                self.reducer, self.clusterer, self.fitted_at = None, None, None
+
+    def _refit_due(self, now: float, n_new: int) -> bool:
+        if len(self.story_ids) + n_new < MIN_FIT_ITEMS:
+            return False
+        return self.fitted_at is None or now - self.fitted_at >= self.refit_interval_seconds
+
+    def _predict(self, embeddings: np.ndarray, fit: FitFunction) -> tuple[np.ndarray, int, int]:
+        """
+        :return: Story id of each item, the number of items left unassigned although within
+            DRIFT_SIMILARITY_MARGIN of a story centroid, and the number of items assigned or within that margin
+        """
+        labels = np.full(len(embeddings), NOISE, dtype=np.int64)
+        if self.clusterer is not None and len(embeddings):
+            import hdbscan
+
+            with span("clustering.approximate_predict", n_items=len(embeddings)):
+                reduced = self.reducer.transform(embeddings)
+                cluster_labels, _ = hdbscan.approximate_predict(self.clusterer, reduced)
+            labels = np.array(
+                [self.label_to_story.get(int(label), NOISE) for label in cluster_labels], dtype=np.int64
+            )
+
+        noise = np.flatnonzero(labels == NOISE)
+        story_ids, centroids = self._centroids()
+        n_near_misses = 0
+        if len(noise) and len(story_ids):
+            similarities = embeddings[noise] @ centroids.T
+            best = similarities.argmax(axis=1)
+            best_similarities = similarities[np.arange(len(noise)), best]
+            matched = best_similarities >= CENTROID_SIMILARITY
+            labels[noise[matched]] = story_ids[best[matched]]
+            near = best_similarities >= CENTROID_SIMILARITY - DRIFT_SIMILARITY_MARGIN
+            n_near_misses = int((near & ~matched).sum())
+        n_near = int((labels != NOISE).sum()) + n_near_misses
+
+        self._cluster_leftovers(embeddings, labels, fit)
+        return labels, n_near_misses, n_near
+
+    def _cluster_leftovers(self, embeddings: np.ndarray, labels: np.ndarray, fit: FitFunction) -> None:
+        """
+        Group items matching no known story among themselves into new stories, with
+        the backend and threshold a from-scratch run would use; the fitted models
+        are discarded, as they only cover the leftovers.
+        """
+        leftovers = np.flatnonzero(labels == NOISE)
+        if len(leftovers) < max(2, self.min_cluster_size):
+            return
+        _, _, cluster_labels = fit(embeddings[leftovers])
+        for label in sorted(set(cluster_labels.tolist()) - {NOISE}):
+            members = leftovers[cluster_labels == label]
+            if len(members) >= self.min_cluster_size:
+                labels[members] = self._new_story_id()
+
+    def _refit(self, embeddings: np.ndarray, fit: FitFunction, reason: str) -> np.ndarray:
+        all_embeddings = np.vstack([self.embeddings, embeddings]) if len(self.story_ids) else embeddings
+        logger.info(f"Refitting clustering on {len(all_embeddings)} items ({reason})")
+        self.reducer, self.clusterer, cluster_labels = fit(all_embeddings)
+        self.fitted_at = time.time()
+
+        n_history = len(self.story_ids)
+        history_labels = cluster_labels[:n_history]
+        self.label_to_story = {}
+        for label in sorted(set(cluster_labels.tolist()) - {NOISE}):
+            previous = self.story_ids[(history_labels == label) & (self.story_ids != NOISE)]
+            if len(previous):
+                ids, counts = np.unique(previous, return_counts=True)
+                if counts.max() / (history_labels == label).sum() >= STORY_MATCH_SHARE:
+                    self.label_to_story[label] = int(ids[counts.argmax()])
+                    continue
+            self.label_to_story[label] = self._new_story_id()
+
+        all_stories = np.array(
+            [self.label_to_story.get(int(label), NOISE) for label in cluster_labels], dtype=np.int64
+        )
+        # Older items keep their story unless the refit put them in another one
+        refit_history = all_stories[:n_history]
+        self.story_ids = np.where(refit_history != NOISE, refit_history, self.story_ids)
+        self._rebuild_centroids()
+
+        labels = all_stories[n_history:]
+        self._cluster_leftovers(embeddings, labels, fit)
+        return labels
+
+    def _centroids(self) -> tuple[np.ndarray, np.ndarray]:
+        story_ids = np.array(sorted(self.centroid_sums), dtype=np.int64)
+        if not len(story_ids):
+            return story_ids, np.zeros((0, 0), dtype=np.float32)
+        centroids = np.vstack([self.centroid_sums[story] / self.centroid_counts[story] for story in story_ids])
+        return story_ids, _normalize(centroids)
+
+    def _update_centroids(self, embeddings: np.ndarray, story_ids: np.ndarray, sign: int) -> None:
+        for story in set(story_ids.tolist()) - {NOISE}:
+            members = embeddings[story_ids == story]
+            total = self.centroid_sums.get(story, 0) + sign * members.sum(axis=0)
+            count = self.centroid_counts.get(story, 0) + sign * len(members)
+            if count > 0:
+                self.centroid_sums[story] = total
+                self.centroid_counts[story] = count
+            else:
+                self.centroid_sums.pop(story, None)
+                self.centroid_counts.pop(story, None)
+
+    def _rebuild_centroids(self) -> None:
+        self.centroid_sums, self.centroid_counts = {}, {}
+        self._update_centroids(self.embeddings, self.story_ids, sign=1)
+
+    def _append_history(self, embeddings: np.ndarray, labels: np.ndarray, now: float) -> None:
+        if len(self.story_ids):
+            self.embeddings = np.vstack([self.embeddings, embeddings])
+        else:
+            self.embeddings = embeddings
+        self.story_ids = np.concatenate([self.story_ids, labels])
+        self.timestamps = np.concatenate([self.timestamps, np.full(len(labels), now)])
+        self._update_centroids(embeddings, labels, sign=1)
+
+    def _prune_history(self, now: float) -> None:
+        keep = self.timestamps >= now - self.history_seconds
+        if keep.all():
+            return
+        self._update_centroids(self.embeddings[~keep], self.story_ids[~keep], sign=-1)
+        self.embeddings = self.embeddings[keep]
+        self.story_ids = self.story_ids[keep]
+        self.timestamps = self.timestamps[keep]
+
+    def _new_story_id(self) -> int:
+        story_id = self.next_story_id
+        self.next_story_id += 1
+        return story_id
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,135 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from src.extracting.utils import News
+
+
+# Fields of `News`, each stored as one column
+COLUMNS = (
+    "title",
+    "summary",
+    "content",
+    "keywords",
+    "category",
+    "entities",
+    "source_video_title",
+    "source_video_url",
+    "source_channel",
+    "duplicate_video_urls",
+    "duplicate_channels",
+    "extracted_at",
+)
+
+Rows = Union[np.ndarray, Sequence[int]]
+
+
+class NewsBatch:
+    """
+    Columnar batch of news items passed from clustering to generation.
+
+    Each field of `News` is kept as one object array, so subsets are taken with
+    NumPy indexing rather than by rebuilding rows. Once cluster labels are set,
+    the rows of every cluster are indexed in a single pass, so per-cluster
+    lookups do not scan the whole batch.
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        embeddings: Optional[np.ndarray] = None,
+        clusters: Optional[np.ndarray] = None,
+        is_new_story: Optional[np.ndarray] = None,
+    ):
+        """
+        :param columns: Array per name in COLUMNS, all of the same length
+        :param embeddings: Embedding of each row
+        :param clusters: Cluster label of each row, -1 for rows in no cluster
+        :param is_new_story: Whether each row's cluster is a story first seen in this run
+        """
+        lengths = {len(columns[name]) for name in COLUMNS}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns of a news batch must have the same length, got {sorted(lengths)}")
+        self.columns = columns
+        self.embeddings = embeddings
+        self.is_new_story = is_new_story
+        self.clusters: Optional[np.ndarray] = None
+        self.cluster_rows: dict[int, np.ndarray] = {}
+        if clusters is not None:
+            self.set_clusters(clusters, is_new_story)
+
+    @classmethod
+    def from_news(cls, news: Sequence[News]) -> "NewsBatch":
+        columns = {}
+        for name in COLUMNS:
+            column = np.empty(len(news), dtype=object)
+            # Assigned one by one, as NumPy would turn list values into extra dimensions
+            for i, item in enumerate(news):
+                column[i] = getattr(item, name)
+            columns[name] = column
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self.columns["title"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def set_clusters(self, clusters: np.ndarray, is_new_story: Optional[np.ndarray] = None) -> None:
+        """
+        Set the cluster label of each row and index the rows of each cluster,
+        in order of the cluster's first row.
+        """
+        clusters = np.asarray(clusters, dtype=np.int64)
+        if len(clusters) != len(self):
+            raise ValueError(f"Expected {len(self)} cluster labels, got {len(clusters)}")
+        self.clusters = clusters
+        if is_new_story is not None:
+            self.is_new_story = np.asarray(is_new_story, dtype=bool)
+
+        # A stable sort keeps rows in batch order within each cluster
+        order = np.argsort(clusters, kind="stable")
+        groups = np.split(order, np.flatnonzero(np.diff(clusters[order])) + 1) if len(order) else []
+        self.cluster_rows = {
+            int(clusters[rows[0]]): rows
+            for rows in sorted(groups, key=lambda rows: rows[0])
+        }
+
+    def take(self, rows: Rows) -> "NewsBatch":
+        """Batch of the given rows, as positions or a boolean mask."""
+        rows = np.asarray(rows)
+        if rows.dtype != bool:
+            rows = rows.astype(np.intp)
+        return NewsBatch(
+            {name: column[rows] for name, column in self.columns.items()},
+            embeddings=self.embeddings[rows] if self.embeddings is not None else None,
+            clusters=self.clusters[rows] if self.clusters is not None else None,
+            is_new_story=self.is_new_story[rows] if self.is_new_story is not None else None,
+        )
+
+    def sources(self, rows: Optional[Rows] = None) -> tuple[list[str], list[str]]:
+        """
+        Unique source video URLs and channels of the given rows, or of all rows,
+        including the near-duplicate copies collapsed before extraction.
+        """
+        if rows is None:
+            rows = slice(None)
+        video_urls = list(self.columns["source_video_url"][rows])
+        channels = list(self.columns["source_channel"][rows])
+        for urls in self.columns["duplicate_video_urls"][rows]:
+            video_urls.extend(urls)
+        for duplicate_channels in self.columns["duplicate_channels"][rows]:
+            channels.extend(duplicate_channels)
+        return list(dict.fromkeys(video_urls)), list(dict.fromkeys(channels))
+
+    def to_records(self, rows: Optional[Rows] = None) -> list[dict]:
+        """Rows as dicts in the format of `News.to_dict`, with their cluster label."""
+        positions = range(len(self)) if rows is None else np.arange(len(self))[rows]
+        records = []
+        for i in positions:
+            record = {name: self.columns[name][i] for name in COLUMNS}
+            record["extracted_at"] = record["extracted_at"].isoformat()
+            if self.clusters is not None:
+                record["cluster"] = int(self.clusters[i])
+            records.append(record)
+        return records
@@ -53,13 +53,13 @@ if __name__ == "__main__":
 
     clustering_engine = NewsClusteringEngine()
     clusters_json_path = repo_root / "src" / "jobs" / "news_clusters.json"
-    clusters_df = clustering_engine.get_clusters(
+    clusters = clustering_engine.get_clusters(
         news,
         json_save_path=str(clusters_json_path),
     )
 
     news_generator = NewsGenerator()
-    news_list = news_generator.generate_from_df(clusters_df)
+    news_list = news_generator.generate_from_batch(clusters)
 
     upload_data = []
     for news in news_list:
@@ -4,6 +4,7 @@ import pandas as pd
 from pathlib import Path
 from src.utils.logger import logger
 from src.utils.path_utils import get_repo_root
+from src.utils.tracing import span
 
 BASE_URL = "https://scribba-sm.getgrist.com/api"
 
@@ -17,26 +18,30 @@ class GristClient:
             "Content-Type": "application/json"
         }
 
-    def upload(self, data: list[dict]):
+    def upload(self, data: list[dict]) -> list[int]:
+        """:return: Row ids of the uploaded records, in order"""
         payload = {"records": [{"fields": row} for row in data]}
-        resp = requests.post(
-            f"{BASE_URL}/docs/{self.document_id}/tables/{self.table_id}/records",
-            headers=self.headers,
-            json=payload,
-        )
+        with span("http.grist.upload", n_records=len(data)):
+            resp = requests.post(
+                f"{BASE_URL}/docs/{self.document_id}/tables/{self.table_id}/records",
+                headers=self.headers,
+                json=payload,
+            )
 
         resp.raise_for_status()
         if resp.status_code != 200:
             logger.error(resp.json())
-        else:
-            logger.info("Successfully uploaded records")
+            return []
+        logger.info("Successfully uploaded records")
+        return [record["id"] for record in resp.json().get("records", [])]
 
     def fetch_table(self, max_rows: int = 100, include_ids: bool = False) -> pd.DataFrame:
-        resp = requests.get(
-            f"{BASE_URL}/docs/{self.document_id}/tables/{self.table_id}/records",
-            headers=self.headers,
-            params={"limit": max_rows}
-        )
+        with span("http.grist.fetch_table"):
+            resp = requests.get(
+                f"{BASE_URL}/docs/{self.document_id}/tables/{self.table_id}/records",
+                headers=self.headers,
+                params={"limit": max_rows}
+            )
         resp.raise_for_status()
         data = resp.json()
         records = data.get("records", [])
@@ -56,11 +61,12 @@ class GristClient:
     def update_rows(self, updates: list[dict]):
         payload = {"records": updates}
 
-        resp = requests.patch(
-            f"{BASE_URL}/docs/{self.document_id}/tables/{self.table_id}/records",
-            headers=self.headers,
-            json=payload,
-        )
+        with span("http.grist.update_rows", n_records=len(updates)):
+            resp = requests.patch(
+                f"{BASE_URL}/docs/{self.document_id}/tables/{self.table_id}/records",
+                headers=self.headers,
+                json=payload,
+            )
 
         resp.raise_for_status()
         logger.info(f"Updated {len(updates)} records in Grist table")
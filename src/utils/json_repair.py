@@ -0,0 +1,110 @@
+import re
+import json
+from typing import Any
+
+
+CODE_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+CLOSERS = {"{": "}", "[": "]"}
+# Earlier cut points are rarely needed, and each attempt re-parses the text
+MAX_CUT_ATTEMPTS = 20
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse JSON emitted by a model, repairing the usual defects.
+
+    Handles markdown code fences, text around the JSON value, trailing commas and
+    output truncated mid-value (e.g. by the token limit). Truncated output keeps
+    every value that was complete before the cut.
+
+    :param text: Raw model output
+    :return: Parsed JSON value
+    :raises ValueError: If no JSON value can be recovered
+    """
+    text = CODE_FENCE_RE.sub("", text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object or array found in model output")
+    text = text[min(starts):]
+
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    text = _remove_trailing_commas(text)
+    for candidate in _truncation_candidates(text):
+        try:
+            value, _ = json.JSONDecoder().raw_decode(candidate)
+            return value
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Model output is not valid JSON and could not be repaired")
+
+
+def _remove_trailing_commas(text: str) -> str:
+    out = []
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char == "," and text[i + 1:].lstrip()[:1] in ("}", "]"):
+            continue
+        out.append(char)
+    return "".join(out)
+
+
+def _truncation_candidates(text: str) -> list[str]:
+    """
+    Ways to close a truncated JSON text, most complete first: close it where it
+    ends, then cut it back to each earlier comma between container elements.
+    """
+    stack: list[str] = []
+    # (position of a comma, open containers at that point), most recent last
+    cut_points: list[tuple[int, tuple[str, ...]]] = []
+    in_string = escaped = False
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in CLOSERS:
+            stack.append(char)
+        elif char in ("}", "]"):
+            if stack:
+                stack.pop()
+            if not stack:
+                # The top-level value is complete, anything after it is ignored
+                return [text[:i + 1]]
+        elif char == ",":
+            cut_points.append((i, tuple(stack)))
+
+    if escaped:
+        text = text[:-1]
+    tail = text + ('"' if in_string else "")
+    tail = tail.rstrip().rstrip(",:").rstrip()
+    candidates = [tail + _closing(stack)]
+    for position, open_containers in reversed(cut_points[-MAX_CUT_ATTEMPTS:]):
+        candidates.append(text[:position] + _closing(open_containers))
+    return candidates
+
+
+def _closing(stack) -> str:
+    return "".join(CLOSERS[char] for char in reversed(stack))
@@ -0,0 +1,59 @@
+import hashlib
+import zlib
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Type, TypeVar, Union
+
+from pydantic import BaseModel, ValidationError
+
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+from src.utils.sqlite_cache import SqliteCache
+
+
+DEFAULT_TTL = timedelta(days=30)
+DEFAULT_MAX_SIZE_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_FILENAME = "llm_responses.sqlite"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of parsed LLM outputs.
+
+    Entries are keyed by a hash of everything that determines the response
+    (prompt template, model, temperature, output schema and inputs), so a rerun
+    over unchanged inputs does not call the model again.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ttl: timedelta = DEFAULT_TTL,
+        max_size_bytes: Optional[int] = DEFAULT_MAX_SIZE_BYTES,
+    ):
+        path = path or get_cache_dir() / DEFAULT_CACHE_FILENAME
+        self._store = SqliteCache(path, ttl_seconds=ttl.total_seconds(), max_size_bytes=max_size_bytes)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str, model_cls: Type[ModelT]) -> Optional[ModelT]:
+        found, value = self._store.lookup(key)
+        if not found or value is None:
+            return None
+        try:
+            return model_cls.model_validate_json(zlib.decompress(value))
+        except (ValidationError, zlib.error) as e:
+            logger.warning(f"Dropping unreadable LLM cache entry {key[:12]}: {e}")
+            self._store.delete(key)
+            return None
+
+    def set(self, key: str, value: BaseModel) -> None:
+        self._store.set(key, zlib.compress(value.model_dump_json().encode("utf-8")))
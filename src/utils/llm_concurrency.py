@@ -0,0 +1,169 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Optional, Union
+from contextlib import asynccontextmanager, contextmanager
+
+from src.utils.rate_limiter import RequestTokenRateLimiter
+from src.utils.tracing import span
+
+
+DEFAULT_LLM_CONCURRENCY = 16
+
+
+class _ConcurrencyBudget:
+    """
+    Counting semaphore shared by threads and event loops, so blocking and async
+    LLM calls draw from one budget. Waiters are served in arrival order, and a
+    released slot is handed directly to the next waiter.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_use = 0
+        self._lock = threading.Lock()
+        # threading.Event of a waiting thread, or the loop and future of a waiting coroutine
+        self._waiters: deque[Union[threading.Event, tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = deque()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._in_use < self.limit and not self._waiters:
+                self._in_use += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_use < self.limit and not self._waiters:
+                self._in_use += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            # A slot handed over before the cancellation is passed on; one still on its way
+            # is passed on by `_hand_over`
+            if not queued and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    # The waiter's loop is closed, try the next waiter
+                    continue
+            self._in_use -= 1
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+_budget = _ConcurrencyBudget(DEFAULT_LLM_CONCURRENCY)
+# OpenAI enforces RPM and TPM limits per model
+_rate_limiters: dict[str, RequestTokenRateLimiter] = {}
+_lock = threading.Lock()
+
+
+def configure_llm_concurrency(limit: int = DEFAULT_LLM_CONCURRENCY) -> None:
+    """
+    Set the process-wide budget of in-flight LLM calls. Call before any calls are made.
+
+    :param limit: Maximum number of concurrent LLM calls across all stages, threads and event loops
+    """
+    global _budget
+    with _lock:
+        _budget = _ConcurrencyBudget(limit)
+
+
+def configure_llm_rate_limit(model: str, requests_per_minute: float, tokens_per_minute: float) -> None:
+    """
+    Enforce the account's request and token per-minute limits for `model` across all threads.
+
+    :param model: Model name the limits apply to
+    :param requests_per_minute: Requests per minute allowed for the model
+    :param tokens_per_minute: Tokens per minute allowed for the model
+    """
+    with _lock:
+        _rate_limiters[model] = RequestTokenRateLimiter(requests_per_minute, tokens_per_minute)
+
+
+def get_llm_rate_limit_stats() -> dict[str, dict]:
+    """Queue-wait metrics of every configured rate limiter, by model."""
+    with _lock:
+        limiters = dict(_rate_limiters)
+    return {model: limiter.stats() for model, limiter in limiters.items()}
+
+
+def _get_rate_limiter(model: Optional[str]) -> Optional[RequestTokenRateLimiter]:
+    if model is None:
+        return None
+    with _lock:
+        return _rate_limiters.get(model)
+
+
+@asynccontextmanager
+async def llm_slot(model: Optional[str] = None, tokens: int = 0):
+    """
+    Hold one slot of the global LLM budget for the duration of an async call.
+
+    :param model: Model being called; its rate limits apply if configured
+    :param tokens: Estimated tokens the call counts against the tokens-per-minute limit
+    """
+    with span(f"llm.{model}", model=model) as llm_span:
+        llm_span.add("estimated_tokens", tokens)
+        queued_at = time.monotonic()
+        limiter = _get_rate_limiter(model)
+        if limiter is not None:
+            await limiter.aacquire(tokens)
+        budget = _budget
+        await budget.aacquire()
+        try:
+            llm_span.add("queue_wait_seconds", time.monotonic() - queued_at)
+            yield
+        finally:
+            budget.release()
+
+
+@contextmanager
+def llm_slot_sync(model: Optional[str] = None, tokens: int = 0):
+    """
+    Hold one slot of the global LLM budget for the duration of a blocking call.
+
+    :param model: Model being called; its rate limits apply if configured
+    :param tokens: Estimated tokens the call counts against the tokens-per-minute limit
+    """
+    with span(f"llm.{model}", model=model) as llm_span:
+        llm_span.add("estimated_tokens", tokens)
+        queued_at = time.monotonic()
+        limiter = _get_rate_limiter(model)
+        if limiter is not None:
+            limiter.acquire(tokens)
+        budget = _budget
+        budget.acquire()
+        try:
+            llm_span.add("queue_wait_seconds", time.monotonic() - queued_at)
+            yield
+        finally:
+            budget.release()
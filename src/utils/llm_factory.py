@@ -0,0 +1,257 @@
+import os
+import threading
+from typing import Optional, TypeVar
+
+import httpx
+from openai import OpenAI, LengthFinishReasonError
+from pydantic import BaseModel, ValidationError
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from src.utils.json_repair import repair_json
+from src.utils.logger import logger
+from src.utils.tracing import add_to_current_span
+
+
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 32
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+_lock = threading.RLock()
+_http_limits = httpx.Limits(
+    max_connections=DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+)
+_http_timeout = httpx.Timeout(DEFAULT_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT)
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_openai_client: Optional[OpenAI] = None
+_chat_models: dict[tuple, ChatOpenAI] = {}
+_prompts: dict[str, PromptTemplate] = {}
+_chains: dict[tuple, Runnable] = {}
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def configure_llm_clients(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> None:
+    """
+    Configure the HTTP connection pool shared by all OpenAI clients.
+    Must be called before the first client is built.
+
+    :param max_connections: Maximum number of open connections to the API
+    :param max_keepalive_connections: Number of idle connections kept for reuse
+    :param timeout: Read timeout of a single request, in seconds
+    """
+    global _http_limits, _http_timeout
+    with _lock:
+        if _http_client is not None or _async_http_client is not None:
+            raise RuntimeError("LLM clients are already in use, configure them before the first call")
+        _http_limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        _http_timeout = httpx.Timeout(timeout, connect=DEFAULT_CONNECT_TIMEOUT)
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide pooled HTTP client used for blocking OpenAI calls."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_http_limits, timeout=_http_timeout)
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide pooled HTTP client used for async OpenAI calls.
+
+    Its connections belong to the event loop that first uses them, so the async
+    pipeline runs all configs on a single loop.
+    """
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(limits=_http_limits, timeout=_http_timeout)
+        return _async_http_client
+
+
+def get_openai_client() -> OpenAI:
+    """Return the process-wide OpenAI client, e.g. for embeddings."""
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            _openai_client = OpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                http_client=get_http_client(),
+            )
+        return _openai_client
+
+
+def get_chat_model(model: str, temperature: float) -> ChatOpenAI:
+    """Return the shared chat model for `model` at `temperature`, building it on first use."""
+    key = (model, temperature)
+    with _lock:
+        if key not in _chat_models:
+            _chat_models[key] = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client(),
+            )
+        return _chat_models[key]
+
+
+def get_prompt(template: str) -> PromptTemplate:
+    """Return the shared prompt for `template`; input variables are inferred from it."""
+    with _lock:
+        if template not in _prompts:
+            _prompts[template] = PromptTemplate.from_template(template)
+        return _prompts[template]
+
+
+def get_chain(template: str, output_model: type[BaseModel], model: str, temperature: float) -> Runnable:
+    """
+    Return the shared `prompt | llm | parser` chain, building it on first use.
+    Chains are stateless, so one instance serves every channel and thread.
+
+    The model is called in JSON-schema structured output mode. If its output
+    still does not parse, or was cut off by the token limit (which the OpenAI
+    client raises as `LengthFinishReasonError`), the raw text is repaired locally
+    instead of discarding the tokens already paid for.
+
+    :param template: Prompt template
+    :param output_model: Pydantic model the response is parsed into
+    :param model: OpenAI model name
+    :param temperature: Sampling temperature
+    """
+    key = (template, output_model, model, temperature)
+    with _lock:
+        if key not in _chains:
+            structured_llm = get_chat_model(model, temperature).with_structured_output(
+                output_model,
+                method="json_schema",
+                include_raw=True,
+            )
+            _chains[key] = (
+                get_prompt(template)
+                | _keep_truncated_output(structured_llm)
+                | RunnableLambda(lambda output: parse_structured_output(output, output_model))
+            )
+        return _chains[key]
+
+
+def _keep_truncated_output(structured_llm: Runnable) -> Runnable:
+    """
+    Return truncated completions as unparsed `include_raw` output instead of raising,
+    so they reach the repair in `parse_structured_output`.
+    """
+    def invoke(prompt_value, config: RunnableConfig):
+        try:
+            return structured_llm.invoke(prompt_value, config)
+        except LengthFinishReasonError as e:
+            return truncated_output(e)
+
+    async def ainvoke(prompt_value, config: RunnableConfig):
+        try:
+            return await structured_llm.ainvoke(prompt_value, config)
+        except LengthFinishReasonError as e:
+            return truncated_output(e)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def truncated_output(error: LengthFinishReasonError) -> dict:
+    """Build the `include_raw` output of a completion cut off by the token limit."""
+    add_to_current_span("truncated_outputs", 1)
+    completion = error.completion
+    usage = completion.usage
+    usage_metadata = None
+    if usage is not None:
+        usage_metadata = {
+            "input_tokens": usage.prompt_tokens,
+            "output_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        }
+    raw = AIMessage(content=completion.choices[0].message.content or "", usage_metadata=usage_metadata)
+    return {"raw": raw, "parsed": None, "parsing_error": error}
+
+
+def parse_structured_output(output: dict, output_model: type[ModelT]) -> ModelT:
+    """
+    Turn a `with_structured_output(include_raw=True)` result into `output_model`.
+
+    :param output: Dict with the "raw" message, the "parsed" object and the "parsing_error"
+    :param output_model: Pydantic model of the response
+    :return: Parsed, or failing that repaired, response; see `is_repaired`
+    :raises ValueError: If the raw output cannot be repaired into the model
+    """
+    raw = output.get("raw")
+    usage = getattr(raw, "usage_metadata", None)
+    if usage:
+        add_to_current_span("prompt_tokens", usage.get("input_tokens", 0))
+        add_to_current_span("completion_tokens", usage.get("output_tokens", 0))
+
+    parsed = output.get("parsed")
+    if isinstance(parsed, output_model):
+        return parsed
+
+    add_to_current_span("repaired_outputs", 1)
+    raw_text = raw.content if raw is not None else ""
+    if not isinstance(raw_text, str) or not raw_text:
+        raise ValueError(f"Model returned no content to parse: {output.get('parsing_error')}")
+    logger.warning(f"Repairing unparsable {output_model.__name__} output: {output.get('parsing_error')}")
+    repaired = validate_partial(output_model, repair_json(raw_text))
+    repaired._repaired = True
+    return repaired
+
+
+def is_repaired(response: BaseModel) -> bool:
+    """
+    Whether `response` was rebuilt from unparsable or truncated output, which may have
+    lost items; such responses should not be cached, so a rerun calls the model again.
+    """
+    return getattr(response, "_repaired", False)
+
+
+def validate_partial(output_model: type[ModelT], data) -> ModelT:
+    """
+    Validate `data`, dropping list items that do not validate, such as the last
+    item of a truncated response, rather than rejecting the whole response.
+    """
+    try:
+        return output_model.model_validate(data)
+    except ValidationError:
+        if not isinstance(data, dict):
+            raise
+
+    salvaged = dict(data)
+    for name, model_field in output_model.model_fields.items():
+        item_model = _list_item_model(model_field.annotation)
+        if item_model is None or not isinstance(salvaged.get(name), list):
+            continue
+        items = []
+        for item in salvaged[name]:
+            try:
+                items.append(item_model.model_validate(item))
+            except ValidationError:
+                logger.warning(f"Dropping invalid {item_model.__name__} from repaired output")
+        salvaged[name] = items
+    return output_model.model_validate(salvaged)
+
+
+def _list_item_model(annotation) -> Optional[type[BaseModel]]:
+    args = getattr(annotation, "__args__", ())
+    if getattr(annotation, "__origin__", None) is list and args:
+        item = args[0]
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            return item
+    return None
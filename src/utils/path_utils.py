@@ -13,3 +13,9 @@ def get_repo_root(start_path: Optional[Path] = None) -> Path:
             return parent
 
     return start_path
+
+
+def get_cache_dir(start_path: Optional[Path] = None) -> Path:
+    cache_dir = get_repo_root(start_path) / ".cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+
+# Both buckets hold this many seconds of their per-minute budget, so an idle limiter lets
+# a short burst through without spending a whole minute's quota in the first second
+BURST_SECONDS = 5
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how often an operation may start.
+
+    Callers that find the bucket empty reserve a future token and sleep until
+    it becomes available, so waiting callers are served roughly in order.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Take `tokens` from the bucket without blocking, going into debt if needed.
+
+        :param tokens: Number of tokens the operation costs
+        :return: Number of seconds the caller has to wait before starting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._last_refill) * self.rate_per_second,
+            )
+            self._last_refill = now
+            self._tokens -= tokens
+            return -self._tokens / self.rate_per_second if self._tokens < 0 else 0.0
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until the operation may start.
+
+        :param tokens: Number of tokens the operation costs
+        :return: Number of seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RequestTokenRateLimiter:
+    """
+    Enforces a requests-per-minute and a tokens-per-minute budget at the same time,
+    as OpenAI does. Both buckets are charged together when a call is admitted, so
+    calls are queued in arrival order until the tighter of the two budgets allows them.
+
+    Token counts are estimates made before the call. The buckets only hold
+    `burst_seconds` of budget, so calls are spread over the minute rather than
+    front-loaded; a call estimated above that puts the bucket in debt and later
+    calls wait for it to be repaid.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst_seconds: float = BURST_SECONDS):
+        self.requests = RateLimiter(
+            requests_per_minute / 60, burst=max(1, int(requests_per_minute * burst_seconds / 60))
+        )
+        self.tokens = RateLimiter(tokens_per_minute / 60, burst=max(1, int(tokens_per_minute * burst_seconds / 60)))
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._throttled_calls = 0
+        self._waiting = 0
+        self._max_waiting = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_tokens = 0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+            self._calls += 1
+            self._total_tokens += tokens
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            if wait > 0:
+                self._throttled_calls += 1
+                self._waiting += 1
+                self._max_waiting = max(self._max_waiting, self._waiting)
+            return wait
+
+    def _done_waiting(self) -> None:
+        with self._lock:
+            self._waiting -= 1
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until a call estimated at `tokens` tokens fits in both budgets.
+
+        :return: Number of seconds spent queued
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done_waiting()
+        return wait
+
+    async def aacquire(self, tokens: int) -> float:
+        """Async variant of `acquire` that yields to the event loop while queued."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._done_waiting()
+        return wait
+
+    def stats(self) -> dict:
+        """Queue-wait metrics since the limiter was created."""
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "throttled_calls": self._throttled_calls,
+                "estimated_tokens": self._total_tokens,
+                "total_wait_seconds": round(self._total_wait, 3),
+                "mean_wait_seconds": round(self._total_wait / self._calls, 3) if self._calls else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+                "queued_now": self._waiting,
+                "max_queued": self._max_waiting,
+            }
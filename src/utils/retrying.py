@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+from collections import deque
+
+from src.utils.logger import logger
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    :param attempt: Zero-based number of the attempt that just failed
+    :param base_delay: Delay cap for the first retry, in seconds
+    :param max_delay: Upper bound for the delay cap, in seconds
+    :return: Seconds to sleep before the next attempt
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Pauses calls to a host once its recent failure rate gets too high.
+
+    The breaker tracks the outcomes of the last `window_size` calls. When at
+    least `min_calls` were seen and the failure ratio reaches
+    `failure_threshold` it opens, and callers of `wait_until_closed` block for
+    the cooldown. Afterwards a single probe call is let through: a success
+    closes the breaker, a failure reopens it with a doubled cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 8,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = self.CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._cooldown = cooldown
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._condition = threading.Condition()
+
+    def wait_until_closed(self) -> float:
+        """
+        Block while the breaker is open or another probe call is in flight.
+
+        :return: Number of seconds spent waiting
+        """
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                if self.state == self.CLOSED:
+                    break
+                if self.state == self.OPEN:
+                    remaining = self._open_until - time.monotonic()
+                    if remaining > 0:
+                        self._condition.wait(remaining)
+                        continue
+                    self.state = self.HALF_OPEN
+                    self._probe_in_flight = False
+                if not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    break
+                self._condition.wait()
+        return time.monotonic() - started
+
+    def record_success(self) -> None:
+        with self._condition:
+            if self.state == self.HALF_OPEN:
+                logger.info(f"Circuit breaker {self.name} closed")
+                self.state = self.CLOSED
+                self._cooldown = self.base_cooldown
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append(False)
+            self._condition.notify_all()
+
+    def record_failure(self) -> None:
+        with self._condition:
+            if self.state == self.HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == self.CLOSED:
+                self._outcomes.append(True)
+                failures = sum(self._outcomes)
+                if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_threshold:
+                    self._open()
+            self._condition.notify_all()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._open_until = time.monotonic() + self._cooldown
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        logger.warning(f"Circuit breaker {self.name} opened for {self._cooldown:.0f}s after repeated failures")
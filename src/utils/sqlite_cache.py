@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from src.utils.logger import logger
+
+
+EVICTION_CHECK_INTERVAL = 50
+
+
+class SqliteCache:
+    """
+    Persistent key-value store backed by a single SQLite table.
+
+    Values are opaque blobs (``None`` is a valid value, e.g. for negative
+    entries). Every entry carries its own expiry time, and once the total
+    payload grows past ``max_size_bytes`` the least recently accessed entries
+    are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl_seconds: Optional[float] = None,
+        max_size_bytes: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+
+        with self._lock:
+            self._purge_expired()
+            self._evict_oversize()
+
+    def lookup(self, key: str) -> tuple[bool, Optional[bytes]]:
+        """
+        Look up a key.
+
+        :param key: Cache key
+        :return: Tuple of (found, value); expired entries count as not found
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return False, None
+
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return True, value
+
+    def set(self, key: str, value: Optional[bytes], ttl_seconds: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        :param key: Cache key
+        :param value: Blob to store, or None for a negative entry
+        :param ttl_seconds: Overrides the default TTL for this entry
+        """
+        now = time.time()
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = now + ttl if ttl is not None else None
+        size = len(key) + (len(value) if value is not None else 0)
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, value, size, now, now, expires_at),
+            )
+            self._conn.commit()
+
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+                self._purge_expired()
+                self._evict_oversize()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _purge_expired(self) -> None:
+        cursor = self._conn.execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        self._conn.commit()
+        if cursor.rowcount:
+            logger.debug("Purged %s expired entries from %s", cursor.rowcount, self.path.name)
+
+    def _evict_oversize(self) -> None:
+        self._writes_since_eviction = 0
+        if self.max_size_bytes is None:
+            return
+
+        total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+
+        evicted = 0
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total_size <= self.max_size_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_size -= size
+            evicted += 1
+        self._conn.commit()
+        logger.debug("Evicted %s entries from %s to stay under size limit", evicted, self.path.name)
@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+import tiktoken
+
+
+DEFAULT_ENCODING = "o200k_base"
+# Rough completion size assumed when budgeting a chat call before it is made
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count the tokens `text` takes up in prompts for `model`."""
+    if not text:
+        return 0
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut `text` to at most `max_tokens` tokens of `model`."""
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def estimate_call_tokens(
+    prompt_text: str,
+    model: str = "gpt-4o-mini",
+    completion_tokens: int = DEFAULT_COMPLETION_TOKENS,
+) -> int:
+    """Estimate the tokens a call counts against the tokens-per-minute limit."""
+    return count_tokens(prompt_text, model) + completion_tokens
@@ -0,0 +1,168 @@
+import json
+import math
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from src.utils.logger import logger
+from src.utils.path_utils import get_cache_dir
+
+
+# USD per 1M tokens as (prompt, completion)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+PERCENTILES = (50, 90, 99)
+
+
+class Span:
+    """
+    One timed operation with numeric counters and descriptive attributes.
+    """
+    __slots__ = ("name", "attributes", "counters", "start", "duration", "error")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.counters: dict[str, float] = {}
+        self.start = time.monotonic()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def add(self, counter: str, value: float) -> None:
+        """Add to a counter, e.g. tokens, retries or seconds spent queued."""
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def set(self, attribute: str, value) -> None:
+        self.attributes[attribute] = value
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_finished_spans: list[Span] = []
+_spans_lock = threading.Lock()
+_run_started_at = datetime.now()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Time the enclosed block as a span named `name`.
+
+    Spans of the same name are aggregated in the run report, so names identify
+    kinds of operations (e.g. "stage.extract", "llm.gpt-4o-mini"), and details
+    go in attributes and counters.
+    """
+    current = Span(name, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.monotonic() - current.start
+        _current_span.reset(token)
+        with _spans_lock:
+            _finished_spans.append(current)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of the calling thread or task, if any."""
+    return _current_span.get()
+
+
+def add_to_current_span(counter: str, value: float) -> None:
+    current = _current_span.get()
+    if current is not None:
+        current.add(counter, value)
+
+
+def reset_tracing() -> None:
+    """Drop all finished spans, e.g. before a new run in the same process."""
+    global _run_started_at
+    with _spans_lock:
+        _finished_spans.clear()
+        _run_started_at = datetime.now()
+
+
+def build_run_report() -> dict:
+    """
+    Aggregate finished spans by name: call counts, errors, wall time percentiles,
+    summed counters and the estimated cost of the tokens used.
+    """
+    with _spans_lock:
+        spans = list(_finished_spans)
+        started_at = _run_started_at
+
+    by_name: dict[str, list[Span]] = {}
+    for finished in spans:
+        by_name.setdefault(finished.name, []).append(finished)
+
+    operations = {}
+    total_cost = 0.0
+    for name, group in sorted(by_name.items()):
+        durations = sorted(s.duration for s in group)
+        counters: dict[str, float] = {}
+        for finished in group:
+            for counter, value in finished.counters.items():
+                counters[counter] = counters.get(counter, 0) + value
+
+        operation = {
+            "count": len(group),
+            "errors": sum(s.error is not None for s in group),
+            "wall_seconds": {
+                "total": round(sum(durations), 3),
+                **{f"p{p}": round(_percentile(durations, p), 3) for p in PERCENTILES},
+                "max": round(durations[-1], 3),
+            },
+            "counters": {counter: round(value, 3) for counter, value in sorted(counters.items())},
+        }
+
+        model = group[0].attributes.get("model")
+        if model in MODEL_PRICES:
+            prompt_price, completion_price = MODEL_PRICES[model]
+            cost = (
+                counters.get("prompt_tokens", 0) * prompt_price
+                + counters.get("completion_tokens", 0) * completion_price
+            ) / 1_000_000
+            operation["cost_usd"] = round(cost, 6)
+            total_cost += cost
+        operations[name] = operation
+
+    return {
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now().isoformat(),
+        "total_cost_usd": round(total_cost, 6),
+        "operations": operations,
+    }
+
+
+def write_run_report(path: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Write the run report as JSON.
+
+    :param path: Output file, defaults to .cache/run_reports/<start time>.json
+    :return: Path of the written report
+    """
+    report = build_run_report()
+    if path is None:
+        started_at = datetime.fromisoformat(report["started_at"])
+        path = get_cache_dir() / "run_reports" / f"{started_at:%Y%m%d-%H%M%S}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Wrote run report to {path} (estimated cost ${report['total_cost_usd']:.4f})")
+    return path
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    # Nearest-rank percentile
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
@@ -0,0 +1,41 @@
+import pytest
+
+from src.extracting import boilerplate
+from src.extracting.boilerplate import BoilerplateStripper
+from src.extracting.utils import Transcript
+
+
+@pytest.fixture(autouse=True)
+def word_token_counts(monkeypatch):
+    # Token counts only feed the report, so the tokenizer download is not needed here
+    monkeypatch.setattr(boilerplate, "count_tokens", lambda text, model: len(text.split()))
+
+
+def test_sponsor_sentence_is_removed_from_single_segment_transcript(tmp_path):
+    stripper = BoilerplateStripper(tmp_path / "phrases.json")
+    transcript = Transcript(
+        video_id="video",
+        title="Title",
+        text=(
+            "The central bank raised rates by half a point. "
+            "Get ten percent off with the link in the description. "
+            "Analysts expect another hike in March."
+        ),
+    )
+
+    stripped, _ = stripper.strip(transcript)
+
+    assert stripped.text == "The central bank raised rates by half a point. Analysts expect another hike in March."
+
+
+def test_only_words_around_sponsor_phrase_are_removed_from_unpunctuated_captions(tmp_path):
+    stripper = BoilerplateStripper(tmp_path / "phrases.json")
+    before = " ".join(f"before{i}" for i in range(30))
+    after = " ".join(f"after{i}" for i in range(30))
+    transcript = Transcript(video_id="video", title="Title", text=f"{before} like and subscribe {after}")
+
+    stripped, _ = stripper.strip(transcript)
+
+    assert "subscribe" not in stripped.text
+    assert stripped.text.startswith("before0 ")
+    assert stripped.text.endswith(" after29")
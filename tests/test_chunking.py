@@ -0,0 +1,25 @@
+import pytest
+
+from src.extracting import chunking
+from src.extracting.chunking import split_transcript
+from src.extracting.utils import Transcript
+
+
+@pytest.fixture(autouse=True)
+def word_token_counts(monkeypatch):
+    monkeypatch.setattr(chunking, "count_tokens", lambda text, model: len(text.split()))
+
+
+def _words(n: int, end: str = "") -> str:
+    return " ".join(f"w{i}" for i in range(n)) + end
+
+
+def test_chunks_stay_within_budget_after_sentence_end_cut():
+    # Cutting at the sentence end carries the second segment over, which leaves no room for the third
+    segments = [(_words(6, "."), 0.0), (_words(3), 1.0), (_words(8), 2.0)]
+    transcript = Transcript.from_segments("video", "Title", segments)
+
+    chunks = split_transcript(transcript, max_tokens=11)
+
+    assert [len(chunk.split()) for chunk in chunks] == [6, 3, 8]
+    assert " ".join(chunks) == transcript.text
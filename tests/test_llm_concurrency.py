@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+
+from src.utils import llm_concurrency
+
+
+def test_sync_and_async_calls_share_one_budget():
+    llm_concurrency.configure_llm_concurrency(3)
+    active = peak = 0
+    lock = threading.Lock()
+
+    def enter():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+
+    def leave():
+        nonlocal active
+        with lock:
+            active -= 1
+
+    def call():
+        with llm_concurrency.llm_slot_sync():
+            enter()
+            time.sleep(0.02)
+            leave()
+
+    async def acall():
+        async with llm_concurrency.llm_slot():
+            enter()
+            await asyncio.sleep(0.02)
+            leave()
+
+    async def run():
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        await asyncio.gather(*(acall() for _ in range(8)))
+        await asyncio.to_thread(lambda: [thread.join() for thread in threads])
+
+    try:
+        asyncio.run(run())
+    finally:
+        llm_concurrency.configure_llm_concurrency()
+
+    assert peak == 3
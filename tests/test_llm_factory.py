@@ -0,0 +1,76 @@
+import json
+import asyncio
+
+import httpx
+import pydantic
+import pytest
+from pydantic import BaseModel
+
+from src.utils import llm_factory
+
+
+class Item(BaseModel):
+    name: str = pydantic.Field(description="Name of the item")
+
+
+class Items(BaseModel):
+    items: list[Item] = pydantic.Field(description="Items")
+
+
+TRUNCATED_CONTENT = '{"items": [{"name": "first"}, {"name": "second"}, {"na'
+
+
+def _completion(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "length",
+            "message": {"role": "assistant", "content": TRUNCATED_CONTENT},
+        }],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 20, "total_tokens": 32},
+    })
+
+
+@pytest.fixture
+def mocked_openai(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    transport = httpx.MockTransport(_completion)
+    monkeypatch.setattr(llm_factory, "_http_client", httpx.Client(transport=transport))
+    monkeypatch.setattr(llm_factory, "_async_http_client", httpx.AsyncClient(transport=transport))
+    monkeypatch.setattr(llm_factory, "_chat_models", {})
+    monkeypatch.setattr(llm_factory, "_chains", {})
+
+
+def test_truncated_completion_is_repaired(mocked_openai):
+    chain = llm_factory.get_chain("List items about {topic}", Items, "gpt-4o-mini", 0.0)
+
+    result = chain.invoke({"topic": "tests"})
+
+    assert [item.name for item in result.items] == ["first", "second"]
+    assert llm_factory.is_repaired(result)
+
+
+def test_truncated_completion_is_repaired_async(mocked_openai):
+    chain = llm_factory.get_chain("List items about {topic}", Items, "gpt-4o-mini", 0.0)
+
+    result = asyncio.run(chain.ainvoke({"topic": "tests"}))
+
+    assert [item.name for item in result.items] == ["first", "second"]
+
+
+def test_repair_keeps_complete_values_of_truncated_json():
+    assert json.loads(json.dumps(llm_factory.repair_json(TRUNCATED_CONTENT))) == {
+        "items": [{"name": "first"}, {"name": "second"}],
+    }
+
+
+def test_parsed_output_is_not_repaired():
+    parsed = Items(items=[Item(name="first")])
+
+    result = llm_factory.parse_structured_output({"raw": None, "parsed": parsed, "parsing_error": None}, Items)
+
+    assert not llm_factory.is_repaired(result)
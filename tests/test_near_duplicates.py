@@ -0,0 +1,55 @@
+from src.extracting.near_duplicates import NearDuplicateIndex
+from src.extracting.utils import Transcript
+
+
+def _transcript(video_id: str, topic: str) -> Transcript:
+    text = " ".join(f"{topic} word{i}" for i in range(200))
+    return Transcript(video_id=video_id, title=video_id, text=text, channel_name="channel")
+
+
+def test_only_extracted_survivors_are_committed(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite")
+    index.collapse([_transcript("extracted", "rates"), _transcript("failed", "elections")])
+    index.commit(extracted_video_ids={"extracted"})
+
+    result = index.collapse([_transcript("extracted-copy", "rates"), _transcript("failed-copy", "elections")])
+
+    assert [t.video_id for t in result.already_extracted] == ["extracted-copy"]
+    assert [t.video_id for t in result.survivors] == ["failed-copy"]
+
+
+def _words(start: int, stop: int) -> str:
+    return " ".join(f"w{i}" for i in range(start, stop))
+
+
+def test_clip_collapses_into_talk_of_the_same_run(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite")
+    clip = Transcript(video_id="clip", title="clip", text=_words(1000, 1300), channel_name="shorts")
+    talk = Transcript(video_id="talk", title="talk", text=_words(0, 3000), channel_name="channel")
+
+    result = index.collapse([clip, talk])
+
+    assert [t.video_id for t in result.survivors] == ["talk"]
+    assert [t.video_id for t in result.duplicates["talk"]] == ["clip"]
+
+
+def test_clip_of_indexed_talk_is_already_extracted(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite")
+    index.collapse([Transcript(video_id="talk", title="talk", text=_words(0, 3000), channel_name="channel")])
+    index.commit()
+
+    result = index.collapse([Transcript(video_id="clip", title="clip", text=_words(1000, 1300), channel_name="shorts")])
+
+    assert [t.video_id for t in result.already_extracted] == ["clip"]
+    assert result.survivors == []
+
+
+def test_talk_containing_indexed_clip_survives(tmp_path):
+    index = NearDuplicateIndex(tmp_path / "index.sqlite")
+    index.collapse([Transcript(video_id="clip", title="clip", text=_words(1000, 1300), channel_name="shorts")])
+    index.commit()
+
+    result = index.collapse([Transcript(video_id="talk", title="talk", text=_words(0, 3000), channel_name="channel")])
+
+    assert [t.video_id for t in result.survivors] == ["talk"]
+    assert result.already_extracted == []
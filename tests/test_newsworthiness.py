@@ -0,0 +1,37 @@
+import json
+
+from src.extracting.newsworthiness import NewsworthinessFilter
+from src.extracting.utils import Transcript
+
+
+def _filter(tmp_path) -> NewsworthinessFilter:
+    return NewsworthinessFilter(
+        model_path=tmp_path / "model.json",
+        outcomes_path=tmp_path / "outcomes.jsonl",
+        mode="shadow",
+    )
+
+
+def test_transcript_is_trained_on_once_across_runs(tmp_path):
+    transcript = Transcript(video_id="video", title="Rates", text="The central bank raised rates", channel_name="c")
+    newsworthiness = _filter(tmp_path)
+    newsworthiness.record(transcript, None, 2)
+    newsworthiness.record(transcript, None, 2)
+    newsworthiness.save()
+
+    # A rerun served from the caches extracts the same transcript again
+    rerun = _filter(tmp_path)
+    rerun.record(transcript, None, 2)
+    rerun.save()
+
+    assert rerun.model.doc_counts == [0, 1]
+    with open(tmp_path / "outcomes.jsonl", "r", encoding="utf-8") as f:
+        assert [json.loads(line)["video_id"] for line in f] == ["video"]
+
+
+def test_outcomes_are_written_only_when_saved(tmp_path):
+    transcript = Transcript(video_id="video", title="Rates", text="The central bank raised rates", channel_name="c")
+    newsworthiness = _filter(tmp_path)
+    newsworthiness.record(transcript, None, 0)
+
+    assert not (tmp_path / "outcomes.jsonl").exists()
@@ -0,0 +1,10 @@
+from src.utils.rate_limiter import BURST_SECONDS, RequestTokenRateLimiter
+
+
+def test_idle_limiter_admits_only_a_few_seconds_of_budget():
+    limiter = RequestTokenRateLimiter(requests_per_minute=600, tokens_per_minute=60_000)
+    # 1000 tokens per second, so BURST_SECONDS calls of 1000 tokens fit in the bucket
+    waits = [limiter.acquire(1000) for _ in range(BURST_SECONDS)]
+
+    assert waits == [0.0] * BURST_SECONDS
+    assert limiter._reserve(1000) > 0.9
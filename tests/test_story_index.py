@@ -0,0 +1,38 @@
+import time
+
+import numpy as np
+
+from src.generating.story_index import PublishedStory, StoryIndex
+
+
+def _story(row_id: int, story_id=None) -> PublishedStory:
+    return PublishedStory(
+        row_id=row_id,
+        title=f"Story {row_id}",
+        source_video_urls=[],
+        source_channels=[],
+        created_at=time.time(),
+        story_id=story_id,
+    )
+
+
+def test_continuing_story_is_matched_by_story_id(tmp_path):
+    index = StoryIndex(tmp_path)
+    index.add(_story(1, story_id=7), np.array([1.0, 0.0], dtype=np.float32))
+    index.save()
+
+    reloaded = StoryIndex(tmp_path)
+    # The story drifted away from its first centroid, but keeps its persistent id
+    matches = reloaded.match(np.array([[0.0, 1.0], [0.0, 1.0]], dtype=np.float32), story_ids=[7, None])
+
+    assert matches[0].row_id == 1
+    assert matches[1] is None
+
+
+def test_similar_centroid_matches_without_story_id(tmp_path):
+    index = StoryIndex(tmp_path)
+    index.add(_story(1), np.array([1.0, 0.0], dtype=np.float32))
+
+    matches = index.match(np.array([[0.99, 0.05]], dtype=np.float32))
+
+    assert matches[0].row_id == 1
@@ -0,0 +1,21 @@
+from src.extracting.transcript_cache import TranscriptCache
+from src.extracting.utils import Transcript
+
+
+def test_cached_transcript_keeps_its_segments(tmp_path):
+    cache = TranscriptCache(tmp_path / "transcripts.sqlite")
+    transcript = Transcript.from_segments("video", "Title", [("Żółw wins.", 0.0), ("Markets rally", 2.5)])
+    cache.set(transcript, ["en"])
+
+    found, cached = cache.get("video", ["en"])
+
+    assert found
+    assert cached.text == transcript.text
+    assert list(cached.iter_segments()) == [("Żółw wins.", 0.0), ("Markets rally", 2.5)]
+
+
+def test_unavailable_transcript_is_cached_as_negative_entry(tmp_path):
+    cache = TranscriptCache(tmp_path / "transcripts.sqlite")
+    cache.set_unavailable("video", ["en"])
+
+    assert cache.get("video", ["en"]) == (True, None)
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.extracting.channel_watermarks import ChannelWatermarkStore
+from src.extracting.transcripts_fetcher import ChannelTranscriptsFetcher
+from src.extracting.utils import Transcript
+
+
+CHANNEL_URL = "https://www.youtube.com/@channel"
+NOW = datetime(2026, 10, 18, 12)
+
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    fetcher = ChannelTranscriptsFetcher(CHANNEL_URL, watermarks=ChannelWatermarkStore(tmp_path / "watermarks.json"))
+    # Newest first
+    videos = [
+        {"video_id": f"v{i}", "title": f"Video {i}", "published_at": NOW - timedelta(hours=i)}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(fetcher, "_iter_video_metadata", lambda limit=None: (video for video in videos))
+    monkeypatch.setattr(
+        fetcher,
+        "_get_transcript",
+        lambda video: (False, Transcript(video_id=video["video_id"], title="", text="text")),
+    )
+    return fetcher
+
+
+def test_watermark_is_held_until_extraction(fetcher):
+    fetcher.fetch_transcripts(n_videos=3)
+
+    assert fetcher.watermarks.get(CHANNEL_URL) is None
+
+
+def test_watermark_stops_short_of_failed_extraction(fetcher):
+    fetcher.fetch_transcripts(n_videos=3)
+    # v1 failed to extract, so it and everything newer is fetched again
+    fetcher.advance_watermark({"v0", "v2"})
+
+    assert fetcher.watermarks.get(CHANNEL_URL).video_id == "v2"
+
+
+def test_watermark_moves_to_newest_settled_video(fetcher):
+    fetcher.fetch_transcripts(n_videos=3)
+    fetcher.advance_watermark({"v0", "v1", "v2"})
+
+    assert fetcher.watermarks.get(CHANNEL_URL).video_id == "v0"